@@ -0,0 +1,164 @@
+"""Benchmark ``render_webm_bytes`` over the local fixture corpus.
+
+Every conversion runs in a fresh worker process so CPU time and peak RSS of
+its ffmpeg children can be read from ``RUSAGE_CHILDREN`` without interference
+from other runs. Results can be saved as a baseline and compared later:
+
+    python benchmarks/bench_conversion.py --save results/before.json
+    python benchmarks/bench_conversion.py --compare results/before.json
+
+The corpus lives in ``benchmarks/corpus`` (see ``make_corpus.py``), so the
+benchmark needs no network access.
+"""
+
+import argparse
+import json
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+DEFAULT_LIMITS = "253952,131072,none"
+METRICS = ("encodes", "wall_s", "cpu_s", "peak_rss_kb", "output_bytes")
+
+
+def _parse_limit(value: str) -> int | None:
+    return None if value.strip().lower() == "none" else int(value)
+
+
+def _run_once(source: str, max_output_bytes: int | None, profile: str) -> dict[str, object]:
+    from o7tv.exceptions.ffmpeg_exceptions import FfmpegError
+    from o7tv.services.conversion import EncoderOptions, render_webm_bytes
+    from o7tv.services.metrics import conversion_encodes
+
+    start = time.perf_counter()
+    error = None
+    size = 0
+    try:
+        options = EncoderOptions(profile=profile)
+        size = len(render_webm_bytes(source, max_output_bytes=max_output_bytes, options=options))
+    except FfmpegError as exc:
+        error = f"{type(exc).__name__}: {exc}"
+    wall = time.perf_counter() - start
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    _, encodes = conversion_encodes.snapshot()
+    return {
+        "encodes": encodes,
+        "wall_s": wall,
+        "cpu_s": usage.ru_utime + usage.ru_stime,
+        "peak_rss_kb": usage.ru_maxrss,
+        "output_bytes": size,
+        "error": error,
+    }
+
+
+def run_benchmark(
+    fixtures: list[Path], limits: list[int | None], repeat: int, profile: str
+) -> dict[str, dict[str, object]]:
+    """Convert every fixture at every size limit and collect median measurements.
+
+    Args:
+        fixtures (list[Path]): Source files to convert.
+        limits (list[int | None]): Size limits to apply; None disables the limit.
+        repeat (int): Runs per fixture and limit; medians are reported.
+        profile (str): Encoder profile to convert with.
+
+    Returns:
+        dict[str, dict[str, object]]: Measurements keyed by ``fixture@limit``.
+    """
+    results: dict[str, dict[str, object]] = {}
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as executor:
+        for fixture in fixtures:
+            for limit in limits:
+                runs = [
+                    executor.submit(_run_once, str(fixture), limit, profile).result()
+                    for _ in range(repeat)
+                ]
+                summary: dict[str, object] = {
+                    metric: statistics.median(_number(run[metric]) for run in runs)
+                    for metric in METRICS
+                }
+                summary["error"] = next((run["error"] for run in runs if run["error"]), None)
+                results[f"{fixture.name}@{limit if limit is not None else 'none'}"] = summary
+    return results
+
+
+def _number(value: object) -> float:
+    return float(value) if isinstance(value, int | float) else 0.0
+
+
+def _format_delta(current: float, previous: float) -> str:
+    if not previous:
+        return ""
+    return f" ({(current - previous) / previous * 100:+.0f}%)"
+
+
+def print_report(
+    results: dict[str, dict[str, object]], baseline: dict[str, dict[str, object]] | None
+) -> None:
+    """Print a table of results, with relative change against a baseline if given.
+
+    Args:
+        results (dict[str, dict[str, object]]): Current measurements.
+        baseline (dict[str, dict[str, object]] | None): Previous measurements.
+    """
+    header = f"{'case':<32}" + "".join(f"{metric:>22}" for metric in METRICS)
+    print(header)
+    print("-" * len(header))
+    for case, summary in results.items():
+        previous = (baseline or {}).get(case, {})
+        cells = []
+        for metric in METRICS:
+            value = _number(summary[metric])
+            delta = _format_delta(value, _number(previous.get(metric, 0)))
+            cells.append(f"{value:.3f}{delta}" if metric.endswith("_s") else f"{value:.0f}{delta}")
+        print(f"{case:<32}" + "".join(f"{cell:>22}" for cell in cells))
+        if summary["error"]:
+            print(f"  ! {summary['error']}")
+
+
+def main() -> int:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=CORPUS_DIR)
+    parser.add_argument(
+        "--limits",
+        default=DEFAULT_LIMITS,
+        help="Comma-separated size limits in bytes; 'none' disables the limit.",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case; medians are used.")
+    parser.add_argument(
+        "--profile",
+        default="balanced",
+        choices=("quality", "balanced", "fast"),
+        help="Encoder profile to benchmark.",
+    )
+    parser.add_argument("--only", help="Substring filter on fixture file names.")
+    parser.add_argument("--save", type=Path, help="Write results as JSON to this path.")
+    parser.add_argument("--compare", type=Path, help="Compare against a saved JSON baseline.")
+    args = parser.parse_args()
+
+    fixtures = sorted(path for path in args.corpus.iterdir() if path.is_file())
+    if args.only:
+        fixtures = [path for path in fixtures if args.only in path.name]
+    if not fixtures:
+        print(f"No fixtures found in {args.corpus}", file=sys.stderr)
+        return 1
+
+    limits = [_parse_limit(value) for value in args.limits.split(",")]
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    results = run_benchmark(fixtures, limits, max(args.repeat, 1), args.profile)
+    print_report(results, baseline)
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(results, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
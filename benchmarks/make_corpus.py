@@ -0,0 +1,48 @@
+"""Regenerate the benchmark fixture corpus in ``benchmarks/corpus``.
+
+The corpus is checked in so benchmarks run offline and compare like with like;
+only rerun this when deliberately changing the fixtures.
+"""
+
+from pathlib import Path
+
+import ffmpeg
+
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+
+ALPHA_MASK = "if(lt(hypot(X-W/2,Y-H/2),min(W,H)*0.4*(1+0.2*sin(T*6))),255,0)"
+
+FIXTURES: dict[str, tuple[str, float, dict[str, object]]] = {
+    # name: (lavfi source, duration in seconds, output options)
+    "small.gif": ("testsrc2=size=112x112:rate=20", 1.0, {}),
+    "large.gif": ("testsrc2=size=480x480:rate=15", 2.0, {}),
+    "long.gif": ("testsrc2=size=160x160:rate=15", 10.0, {}),
+    "many_frames.gif": ("testsrc2=size=160x160:rate=50", 4.0, {}),
+    "wide.gif": ("testsrc2=size=640x96:rate=20", 2.0, {}),
+    # Animated WebP would be the natural fixture, but ffmpeg cannot decode animated WebP;
+    # APNG keeps a full 8-bit alpha channel and decodes everywhere.
+    "transparent.apng": (
+        f"testsrc2=size=200x200:rate=20,format=rgba,"
+        f"geq=r='r(X,Y)':g='g(X,Y)':b='b(X,Y)':a='{ALPHA_MASK}'",
+        2.0,
+        {"format": "apng", "plays": 0},
+    ),
+}
+
+
+def main() -> None:
+    """Write every fixture to the corpus directory."""
+    CORPUS_DIR.mkdir(parents=True, exist_ok=True)
+    for name, (source, duration, options) in FIXTURES.items():
+        dest = CORPUS_DIR / name
+        (
+            ffmpeg.input(source, f="lavfi", t=duration)
+            .output(str(dest), **options)
+            .overwrite_output()
+            .run(quiet=True)
+        )
+        print(f"{name}: {dest.stat().st_size} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,264 @@
+from collections.abc import AsyncGenerator, AsyncIterator
+from functools import cache
 from pathlib import Path
+from typing import TYPE_CHECKING
 from urllib.parse import unquote, urlparse
 
 import requests
 from fastapi import APIRouter, Form, HTTPException, Request
 from fastapi.responses import JSONResponse, Response, StreamingResponse
-from fastapi.templating import Jinja2Templates
 
 from o7tv.config.config import settings
-from o7tv.services.conversion import render_webm_bytes
-from o7tv.services.seventv import search_emotes
+from o7tv.exceptions.conversion_exceptions import ConversionQueueFullError
+from o7tv.models.batch import BatchConvertRequest
+from o7tv.services.batch import iter_batch_zip, zip_files
+from o7tv.services.cache import (
+    conversion_cache,
+    conversion_cache_key,
+    convert_variants_and_cache,
+)
+from o7tv.services.conversion import (
+    MAX_SIDE,
+    EncoderOptions,
+    OutputVariant,
+    encoder_options,
+    iter_webm_chunks,
+)
+from o7tv.services.image_proxy import StreamedImage, fetch_image
+from o7tv.services.jobs import cached_payload, job_store
+from o7tv.services.pool import Priority, conversion_pool
+from o7tv.services.prefetch import prefetch_search_page
+from o7tv.services.seventv import DEFAULT_PER_PAGE, search_emotes
+from o7tv.services.singleflight import conversion_flights, conversion_streams
 from o7tv.utils.http import (
     content_disposition,
     ensure_allowed_image_url,
+    etag_matches,
+    if_range_matches,
+    parse_byte_range,
+    queue_full_error,
     resolve_emote_url,
     safe_filename,
 )
 
+if TYPE_CHECKING:
+    from fastapi.templating import Jinja2Templates
+
+TEMPLATE_NAMES = ("base.html", "home.html", "results.html")
+MAX_VARIANTS = 6
+MIN_VARIANT_SIDE = 16
+MIN_VARIANT_BYTES = 4 * 1024
+
 router = APIRouter()
-templates = Jinja2Templates(directory=str(settings.templates_dir))
 
 
-def _stream_response(emote_url: str, disposition: str) -> Response:
+@cache
+def get_templates() -> "Jinja2Templates":
+    """Return the template renderer, importing Jinja2 on first use.
+
+    Returns:
+        Jinja2Templates: The shared template renderer.
+    """
+    from fastapi.templating import Jinja2Templates
+
+    return Jinja2Templates(directory=str(settings.templates_dir))
+
+
+def load_templates() -> None:
+    """Compile the page templates ahead of the first request."""
+    environment = get_templates().env
+    for name in TEMPLATE_NAMES:
+        environment.get_template(name)
+
+
+async def _stream_uncapped(emote_url: str, options: EncoderOptions) -> AsyncGenerator[bytes, None]:
+    writer = None
+    if settings.conversion_cache_enabled:
+        writer = conversion_cache.open_writer(
+            conversion_cache_key(emote_url, None, options.profile)
+        )
+    complete = False
+    try:
+        async for chunk in conversion_pool.stream(iter_webm_chunks, emote_url, options):
+            if writer is not None:
+                writer.write(chunk)
+            yield chunk
+        complete = True
+    finally:
+        if writer is not None:
+            if complete:
+                writer.commit()
+            else:
+                writer.abort()
+
+
+async def _convert_payload(emote_url: str) -> bytes:
     emote_url = ensure_allowed_image_url(emote_url)
-    payload = render_webm_bytes(emote_url, max_output_bytes=settings.max_webm_size_bytes)
+    # Bulk work waits for queue capacity instead of failing the item.
+    job = await job_store.submit_when_ready(emote_url, priority=Priority.BULK)
+    return await job_store.wait(job)
+
+
+def _parse_variants(spec: str) -> list[OutputVariant]:
+    variants = []
+    for item in spec.split(","):
+        side_text, _, bytes_text = item.strip().partition(":")
+        try:
+            side = int(side_text)
+            max_output_bytes = int(bytes_text) if bytes_text else settings.max_webm_size_bytes
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Invalid variant {item!r}; expected SIDE or SIDE:MAX_BYTES",
+            ) from exc
+        if side % 2 or not MIN_VARIANT_SIDE <= side <= MAX_SIDE:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Variant sides must be even numbers from {MIN_VARIANT_SIDE} to {MAX_SIDE}",
+            )
+        if max_output_bytes is not None and max_output_bytes < MIN_VARIANT_BYTES:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Variant size limits must be at least {MIN_VARIANT_BYTES} bytes",
+            )
+        variants.append(OutputVariant(side, max_output_bytes))
+
+    variants = list(dict.fromkeys(variants))
+    if len(variants) > MAX_VARIANTS:
+        raise HTTPException(
+            status_code=422, detail=f"At most {MAX_VARIANTS} variants can be requested"
+        )
+    return variants
+
+
+def _variant_filename(filename: str, variant: OutputVariant) -> str:
+    stem = filename.removesuffix(".webm")
+    if variant.max_output_bytes != settings.max_webm_size_bytes:
+        return f"{stem}-{variant.max_side}px-{variant.max_output_bytes}b.webm"
+    return f"{stem}-{variant.max_side}px.webm"
 
+
+async def _variants_response(
+    emote_url: str, variants: list[OutputVariant], filename: str
+) -> Response:
+    emote_url = ensure_allowed_image_url(emote_url)
+    options = encoder_options(queue_depth=conversion_pool.queue_depth)
+    flight_key = "|".join(
+        conversion_cache_key(emote_url, variant.max_output_bytes, max_side=variant.max_side)
+        for variant in variants
+    )
+    try:
+        payloads = await conversion_flights.do(
+            flight_key,
+            lambda: conversion_pool.run(convert_variants_and_cache, emote_url, variants, options),
+        )
+    except ConversionQueueFullError as exc:
+        raise queue_full_error(exc) from exc
+
+    archive = zip_files(
+        [
+            (_variant_filename(filename, variant), payload)
+            for variant, payload in zip(variants, payloads, strict=True)
+        ]
+    )
+    stem = filename.removesuffix(".webm")
     return Response(
-        content=payload,
-        media_type="video/webm",
+        content=archive,
+        media_type="application/zip",
         headers={
-            "Content-Disposition": disposition,
-            "Content-Length": str(len(payload)),
+            "Content-Disposition": f'attachment; filename="{stem}.zip"',
+            "Content-Length": str(len(archive)),
         },
     )
 
 
+def _cache_headers(etag: str) -> dict[str, str]:
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.conversion_http_max_age_seconds}",
+    }
+
+
+def _conversion_etag(emote_url: str, max_output_bytes: int | None) -> str:
+    # The tag names the conversion rather than its bytes, so it is known before converting.
+    # ffmpeg output is not byte-for-byte reproducible and downshifted profiles serve the
+    # same emote, so the validator is weak.
+    return f'W/"{conversion_cache_key(emote_url, max_output_bytes)[:32]}"'
+
+
+def _payload_response(
+    request: Request, payload: bytes, headers: dict[str, str], etag: str
+) -> Response:
+    byte_range = None
+    if request.method == "GET":
+        headers = headers | {"Accept-Ranges": "bytes"}
+        # If-Range only accepts strong validators, so a conditional range gets the full body.
+        if if_range_matches(request.headers.get("If-Range"), etag):
+            byte_range = parse_byte_range(request.headers.get("Range"), len(payload))
+
+    if byte_range is None:
+        headers["Content-Length"] = str(len(payload))
+        return Response(content=payload, media_type="video/webm", headers=headers)
+
+    first, last = byte_range
+    headers["Content-Range"] = f"bytes {first}-{last}/{len(payload)}"
+    headers["Content-Length"] = str(last - first + 1)
+    return Response(
+        content=payload[first : last + 1],
+        status_code=206,
+        media_type="video/webm",
+        headers=headers,
+    )
+
+
+async def _stream_response(request: Request, emote_url: str, disposition: str) -> Response:
+    emote_url = ensure_allowed_image_url(emote_url)
+    max_output_bytes = settings.max_webm_size_bytes
+    etag = _conversion_etag(emote_url, max_output_bytes)
+    headers = {"Content-Disposition": disposition}
+    if request.method == "GET":
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            # Answered from the request alone: nothing is converted or read from the cache.
+            return Response(status_code=304, headers=_cache_headers(etag))
+        headers |= _cache_headers(etag)
+
+    if max_output_bytes is None:
+        cached = cached_payload(emote_url, None)
+        payload = cached[0] if cached is not None else None
+    else:
+        # The synchronous endpoint is an interactive job awaited in place.
+        try:
+            job = job_store.submit(emote_url, track=False)
+        except ConversionQueueFullError as exc:
+            raise queue_full_error(exc) from exc
+        payload = await job_store.wait(job)
+
+    if payload is None:
+        # Without a size cap nothing needs to be checked, so forward ffmpeg output
+        # as it is produced instead of buffering the whole payload.
+        # Identical requests arriving meanwhile follow the same encode instead of starting another.
+        options = encoder_options(queue_depth=conversion_pool.queue_depth)
+        chunks = conversion_streams.subscribe(
+            conversion_cache_key(emote_url, None), lambda: _stream_uncapped(emote_url, options)
+        )
+        try:
+            first_chunk = await anext(chunks)
+        except ConversionQueueFullError as exc:
+            raise queue_full_error(exc) from exc
+
+        async def body() -> AsyncIterator[bytes]:
+            try:
+                yield first_chunk
+                async for chunk in chunks:
+                    yield chunk
+            finally:
+                await chunks.aclose()
+
+        return StreamingResponse(body(), media_type="video/webm", headers=headers)
+
+    return _payload_response(request, payload, headers, etag)
+
+
 @router.get("/")
 async def index(request: Request, sort: str = "TOP_ALL_TIME") -> Response:
     """Render the main page with the form to submit an emote URL.
@@ -54,15 +279,17 @@ async def index(request: Request, sort: str = "TOP_ALL_TIME") -> Response:
         sort = "TOP_ALL_TIME"
 
     try:
-        trending = search_emotes(
+        results = await search_emotes(
             None,
             per_page=9,
             sort_by=sort,
-        ).items
+            with_counts=False,
+        )
+        trending = results.items
     except (ValueError, requests.RequestException):
         error_message = "Unable to load emotes"
 
-    return templates.TemplateResponse(
+    return get_templates().TemplateResponse(
         "home.html",
         {
             "request": request,
@@ -77,27 +304,64 @@ async def index(request: Request, sort: str = "TOP_ALL_TIME") -> Response:
 
 @router.api_route("/convert/download", methods=["GET", "POST"])
 async def convert_download(
+    request: Request,
     emote_url: str | None = None,
     emote_url_form: str | None = Form(None, alias="emote_url"),
     emote_name: str | None = None,
     emote_name_form: str | None = Form(None, alias="emote_name"),
+    variants: str | None = None,
 ) -> Response:
     """Handle the form submission to convert an emote URL to a webm file.
 
+    GET responses carry a weak ``ETag`` derived from the conversion cache key, so a
+    matching ``If-None-Match`` is answered with HTTP 304 before anything is
+    converted. Responses with a known length also serve single byte ranges.
+
     Args:
+        request (Request): The incoming HTTP request.
         emote_url (str | None): The URL from query parameters.
         emote_url_form (str | None): The URL from form data.
         emote_name (str | None): The emote name from query parameters.
         emote_name_form (str | None): The emote name from form data.
+        variants (str | None): Comma-separated ``SIDE[:MAX_BYTES]`` renditions, for
+            example ``512,256,128``. When set, every variant is rendered in a single
+            ffmpeg run and returned in a ZIP archive.
 
     Returns:
-        Response: The response containing the converted webm file.
+        Response: The response containing the converted webm file, or a ZIP
+        archive of the requested variants.
     """
     resolved = resolve_emote_url(emote_url, emote_url_form)
     original = emote_name or emote_name_form
     filename = safe_filename(original)
+    if variants:
+        return await _variants_response(resolved, _parse_variants(variants), filename)
     disposition = content_disposition(filename, original)
-    return _stream_response(resolved, disposition)
+    return await _stream_response(request, resolved, disposition)
+
+
+@router.post("/convert/batch")
+async def convert_batch(batch: BatchConvertRequest) -> StreamingResponse:
+    """Convert several emotes and stream them back as a ZIP archive.
+
+    Args:
+        batch (BatchConvertRequest): The emotes to convert.
+
+    Returns:
+        StreamingResponse: ZIP archive with one WebM per converted emote and a
+        ``manifest.json`` describing every item's outcome.
+    """
+    if len(batch.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=422,
+            detail=f"A batch may contain at most {settings.batch_max_items} emotes",
+        )
+
+    return StreamingResponse(
+        iter_batch_zip(batch.items, _convert_payload, settings.batch_concurrency),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="emotes.zip"'},
+    )
 
 
 @router.get("/search")
@@ -115,9 +379,11 @@ async def search(request: Request, emote_name: str | None = None) -> Response:
         return await index(request)
 
     try:
-        results = search_emotes(emote_name)
+        results = await search_emotes(emote_name, with_counts=False)
+        if len(results.items) >= DEFAULT_PER_PAGE:
+            prefetch_search_page(emote_name, 2)
     except (ValueError, requests.RequestException):
-        return templates.TemplateResponse(
+        return get_templates().TemplateResponse(
             "results.html",
             {
                 "request": request,
@@ -130,7 +396,7 @@ async def search(request: Request, emote_name: str | None = None) -> Response:
             },
         )
 
-    return templates.TemplateResponse(
+    return get_templates().TemplateResponse(
         "results.html",
         {
             "request": request,
@@ -151,14 +417,25 @@ async def search_page(emote_name: str, page: int = 1) -> JSONResponse:
         emote_name (str): The emote name query.
         page (int): Page number to fetch.
 
+    The next page is prefetched into the search cache in the background, so the
+    following scroll request is usually served without waiting on 7TV.
+
     Returns:
-        JSONResponse: JSON payload with items and paging info.
+        JSONResponse: JSON payload with items and paging info. ``next_page`` is
+        null on the last page.
     """
     try:
-        results = search_emotes(emote_name, page=page)
+        results = await search_emotes(emote_name, page=page)
     except (ValueError, requests.RequestException) as exc:
         raise HTTPException(status_code=502, detail="Error querying 7TV") from exc
 
+    if results.page_count:
+        has_next = page < results.page_count
+    else:
+        has_next = len(results.items) >= DEFAULT_PER_PAGE
+    if has_next:
+        prefetch_search_page(emote_name, page + 1)
+
     return JSONResponse(
         {
             "animated_items": [
@@ -181,6 +458,7 @@ async def search_page(emote_name: str, page: int = 1) -> JSONResponse:
                 if not item.is_animated
             ],
             "page": page,
+            "next_page": page + 1 if has_next else None,
             "page_count": results.page_count,
             "total_count": results.total_count,
         }
@@ -188,28 +466,33 @@ async def search_page(emote_name: str, page: int = 1) -> JSONResponse:
 
 
 @router.get("/download-image")
-async def download_image(url: str) -> Response:
+async def download_image(request: Request, url: str) -> Response:
     """Proxy-download an external image so the browser forces download.
 
     Args:
+        request (Request): The incoming HTTP request.
         url (str): The image URL to download.
 
     Returns:
-        Response: The response containing the image content.
+        Response: The image content, streamed from the upstream on a cache miss,
+        or 304 when the client's ``If-None-Match`` matches a cached image.
     """
     image_url = ensure_allowed_image_url(url)
     try:
-        response = requests.get(image_url, stream=True, timeout=15)
-        response.raise_for_status()
+        image = await fetch_image(image_url)
     except requests.RequestException as exc:
         raise HTTPException(status_code=502, detail="Error downloading image") from exc
 
-    content_type = response.headers.get("Content-Type", "application/octet-stream")
     filename = Path(urlparse(image_url).path).name or "emote"
     filename = unquote(filename)
-    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
-    return StreamingResponse(
-        response.iter_content(chunk_size=64 * 1024),
-        media_type=content_type,
-        headers=headers,
-    )
+    headers = {"Cache-Control": f"public, max-age={image.max_age}"}
+    if isinstance(image, StreamedImage):
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return StreamingResponse(image.chunks, media_type=image.content_type, headers=headers)
+
+    headers["ETag"] = image.etag
+    if etag_matches(request.headers.get("If-None-Match"), image.etag):
+        return Response(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return Response(content=image.content, media_type=image.content_type, headers=headers)
@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from o7tv.services.warmup import warmup_state
+
+router = APIRouter()
+
+
+@router.get("/health/live")
+async def live() -> JSONResponse:
+    """Report that the process is up and serving requests.
+
+    Returns:
+        JSONResponse: Always ``{"status": "ok"}``.
+    """
+    return JSONResponse({"status": "ok"})
+
+
+@router.get("/health/ready")
+async def ready() -> JSONResponse:
+    """Report whether start-up warm-up has finished.
+
+    Returns:
+        JSONResponse: HTTP 200 once templates, the HTTP client and ffmpeg are
+        warmed up; HTTP 503 with the per-step status while starting or after a
+        failed step.
+    """
+    if warmup_state.ready:
+        status, code = "ready", 200
+    elif warmup_state.failed:
+        status, code = "failed", 503
+    else:
+        status, code = "starting", 503
+    return JSONResponse({"status": status, "steps": warmup_state.steps}, status_code=code)
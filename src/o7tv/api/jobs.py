@@ -0,0 +1,132 @@
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from o7tv.config.config import settings
+from o7tv.exceptions.conversion_exceptions import ConversionQueueFullError
+from o7tv.models.jobs import JobRequest
+from o7tv.services.jobs import ConversionJob, JobStatus, job_store
+from o7tv.services.pool import Priority
+from o7tv.utils.http import (
+    content_disposition,
+    ensure_allowed_image_url,
+    queue_full_error,
+    safe_filename,
+)
+
+router = APIRouter()
+
+
+def _job_body(job: ConversionJob) -> dict[str, Any]:
+    path = f"/jobs/{job.job_id}"
+    return job.to_dict() | {
+        "links": {"self": path, "events": f"{path}/events", "result": f"{path}/result"}
+    }
+
+
+async def _get_job(job_id: str) -> ConversionJob:
+    job = await job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+
+@router.post("/jobs", status_code=202)
+async def create_job(request: JobRequest) -> JSONResponse:
+    """Queue an emote conversion and return its job without waiting.
+
+    Args:
+        request (JobRequest): The emote to convert and its priority.
+
+    Returns:
+        JSONResponse: HTTP 202 with the job status and links, and a ``Location``
+        header pointing at the job.
+    """
+    emote_url = ensure_allowed_image_url(request.emote_url)
+    try:
+        job = job_store.submit(emote_url, request.emote_name, Priority[request.priority.upper()])
+    except ConversionQueueFullError as exc:
+        raise queue_full_error(exc) from exc
+    return JSONResponse(
+        _job_body(job), status_code=202, headers={"Location": f"/jobs/{job.job_id}"}
+    )
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> JSONResponse:
+    """Report a job's status.
+
+    Args:
+        job_id (str): The job id.
+
+    Returns:
+        JSONResponse: The job status and links.
+    """
+    return JSONResponse(_job_body(await _get_job(job_id)))
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str) -> StreamingResponse:
+    """Stream a job's status changes as server-sent events.
+
+    Every status change is sent as an event named after the status, with the job
+    as JSON data; the stream ends after ``done`` or ``failed``.
+
+    Args:
+        job_id (str): The job id.
+
+    Returns:
+        StreamingResponse: A ``text/event-stream`` response.
+    """
+    await _get_job(job_id)
+
+    async def events() -> AsyncIterator[bytes]:
+        async for job in job_store.watch(job_id, settings.job_events_keepalive_seconds):
+            if job is None:
+                yield b": keepalive\n\n"
+                continue
+            data = json.dumps(_job_body(job), separators=(",", ":"))
+            yield f"event: {job.status}\ndata: {data}\n\n".encode()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/jobs/{job_id}/result")
+async def job_result(job_id: str) -> Response:
+    """Download the WebM produced by a finished job.
+
+    Args:
+        job_id (str): The job id.
+
+    Returns:
+        Response: The converted WebM file.
+    """
+    job = await _get_job(job_id)
+    if job.status is JobStatus.FAILED:
+        raise HTTPException(status_code=422, detail=job.error)
+    if job.status is not JobStatus.DONE:
+        raise HTTPException(
+            status_code=409,
+            detail=f"The job is {job.status}",
+            headers={"Retry-After": str(settings.conversion_retry_after_seconds)},
+        )
+
+    payload = job_store.payload(job)
+    if payload is None:
+        raise HTTPException(status_code=410, detail="The job result is no longer available")
+    filename = safe_filename(job.emote_name)
+    return Response(
+        content=payload,
+        media_type="video/webm",
+        headers={
+            "Content-Disposition": content_disposition(filename, job.emote_name),
+            "Content-Length": str(len(payload)),
+        },
+    )
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from o7tv.services.metrics import registry
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def metrics() -> PlainTextResponse:
+    """Expose conversion pipeline metrics in the Prometheus text format.
+
+    Returns:
+        PlainTextResponse: The metrics exposition payload.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -8,12 +9,58 @@ PROJECT_ROOT = SRC_DIR.parent
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
-        env_file=".env", env_nested_delimiter="__", env_prefix="APP__"
+        env_file=".env",
+        env_nested_delimiter="__",
+        env_prefix="APP__",
+        env_parse_none_str="none",
     )
 
     templates_dir: Path = PROJECT_ROOT / "templates"
     seventv_gql_url: str = "https://api.7tv.app/v4/gql"
-    max_webm_size_bytes: int = 248 * 1024
+    seventv_persisted_queries: bool = False
+    max_webm_size_bytes: int | None = 248 * 1024
+    static_dir: Path = PROJECT_ROOT / "static"
+    conversion_cache_enabled: bool = True
+    conversion_cache_max_bytes: int = 512 * 1024 * 1024
+    conversion_workers: int = 2
+    conversion_queue_size: int = 8
+    conversion_retry_after_seconds: int = 5
+    conversion_http_max_age_seconds: int = 24 * 60 * 60
+    encoder_profile: Literal["quality", "balanced", "fast"] = "balanced"
+    encoder_threads: int = 0
+    encoder_downshift_queue_depth: int = 2
+    max_frame_rate: float | None = None
+    drop_duplicate_frames: bool = False
+    duplicate_frame_hi: int = 64 * 12
+    duplicate_frame_lo: int = 64 * 5
+    duplicate_frame_frac: float = 0.33
+    batch_max_items: int = 50
+    batch_concurrency: int = 2
+    job_retention_seconds: float = 10 * 60
+    job_max_jobs: int = 256
+    job_events_keepalive_seconds: float = 15.0
+    prewarm_enabled: bool = False
+    prewarm_interval_seconds: float = 15 * 60
+    prewarm_top_n: int = 24
+    prewarm_max_per_cycle: int = 24
+    prewarm_nice: int = 19
+    metrics_enabled: bool = True
+    server_timing_enabled: bool = False
+    http_pool_size: int = 20
+    http_connect_timeout_seconds: float = 5.0
+    http_read_timeout_seconds: float = 15.0
+    search_cache_enabled: bool = True
+    search_cache_ttl_seconds: float = 60.0
+    search_cache_stale_seconds: float = 600.0
+    search_cache_max_entries: int = 1024
+    search_prefetch_enabled: bool = True
+    search_prefetch_max_concurrent: int = 4
+    search_prefetch_idle_seconds: float = 10.0
+    image_cache_enabled: bool = True
+    image_cache_max_bytes: int = 256 * 1024 * 1024
+    image_cache_default_ttl_seconds: int = 24 * 60 * 60
+    shared_state_enabled: bool = False
+    ffmpeg_max_processes: int = 0
 
 
 settings = Settings()
@@ -1,3 +1,4 @@
+from o7tv.exceptions.conversion_exceptions import ConversionQueueFullError
 from o7tv.exceptions.ffmpeg_exceptions import (
     FfmpegConversionError,
     FfmpegError,
@@ -14,4 +15,5 @@ __all__ = [
     "FfmpegUnsupportedFormatError",
     "FfmpegConversionError",
     "FfmpegStreamError",
+    "ConversionQueueFullError",
 ]
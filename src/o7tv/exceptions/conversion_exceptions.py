@@ -0,0 +1,5 @@
+from o7tv.exceptions.ffmpeg_exceptions import O7tvError
+
+
+class ConversionQueueFullError(O7tvError):
+    pass
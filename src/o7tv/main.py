@@ -1,14 +1,50 @@
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.staticfiles import StaticFiles
 
-from o7tv.api.emotes import router as emotes_router
+from o7tv.api.emotes import load_templates, router as emotes_router
+from o7tv.api.health import router as health_router
+from o7tv.api.jobs import router as jobs_router
+from o7tv.api.metrics import router as metrics_router
+from o7tv.config.config import settings
+from o7tv.services.metrics import collect_request_timings, server_timing_header
+from o7tv.services.pool import conversion_pool
+from o7tv.services.prefetch import search_prefetcher
+from o7tv.services.prewarm import run_prewarm_loop
+from o7tv.services.warmup import warm_up, warmup_state
+from o7tv.utils.http_client import http_client
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """Warm up, start background pre-warming and release shared resources on shutdown.
+
+    Warm-up runs in the background so the server accepts connections immediately;
+    ``/health/ready`` reports when it has finished.
+    """
+    tasks = [asyncio.create_task(warm_up(warmup_state, load_templates))]
+    if settings.prewarm_enabled and settings.conversion_cache_enabled:
+        tasks.append(asyncio.create_task(run_prewarm_loop()))
+
+    yield
+
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await search_prefetcher.cancel_all()
+    # Running conversions still download sources, so let them finish before closing the client.
+    conversion_pool.shutdown()
+    http_client.close()
 
 
 def get_app() -> FastAPI:
     """Creates and configures the FastAPI application."""
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     # Mount assets directory
     assets_dir = Path(__file__).parent.parent.parent / "assets"
@@ -16,6 +52,22 @@ def get_app() -> FastAPI:
         app.mount("/assets", StaticFiles(directory=str(assets_dir)), name="assets")
 
     app.include_router(emotes_router)
+    app.include_router(jobs_router)
+    app.include_router(health_router)
+    if settings.metrics_enabled:
+        app.include_router(metrics_router)
+
+    if settings.server_timing_enabled:
+
+        @app.middleware("http")
+        async def add_server_timing(
+            request: Request, call_next: Callable[[Request], Awaitable[Response]]
+        ) -> Response:
+            with collect_request_timings() as timings:
+                response = await call_next(request)
+            if timings:
+                response.headers["Server-Timing"] = server_timing_header(timings)
+            return response
 
     return app
 
@@ -1,3 +1,12 @@
+from .batch import BatchConvertRequest, BatchItem
 from .emotes import EmoteImage, EmoteResult, EmoteSearchResponse
+from .jobs import JobRequest
 
-__all__ = ["EmoteImage", "EmoteResult", "EmoteSearchResponse"]
+__all__ = [
+    "BatchConvertRequest",
+    "BatchItem",
+    "EmoteImage",
+    "EmoteResult",
+    "EmoteSearchResponse",
+    "JobRequest",
+]
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+
+
+class BatchItem(BaseModel):
+    """Represents one emote in a batch conversion request.
+
+    Args:
+        emote_url (str): Direct URL to the emote image.
+        emote_name (str | None): Emote display name used for the file name.
+    """
+
+    emote_url: str
+    emote_name: str | None = None
+
+
+class BatchConvertRequest(BaseModel):
+    """Represents a batch conversion request.
+
+    Args:
+        items (list[BatchItem]): Emotes to convert.
+    """
+
+    items: list[BatchItem] = Field(min_length=1)
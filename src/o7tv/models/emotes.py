@@ -1,7 +1,10 @@
-from pydantic import BaseModel
+import json
+from dataclasses import asdict, dataclass
+from typing import Any
 
 
-class EmoteImage(BaseModel):
+@dataclass(frozen=True, slots=True)
+class EmoteImage:
     """Represents a 7TV emote image.
 
     Args:
@@ -21,7 +24,8 @@ class EmoteImage(BaseModel):
     scale: int | None
 
 
-class EmoteResult(BaseModel):
+@dataclass(frozen=True, slots=True)
+class EmoteResult:
     """Represents a 7TV emote search result.
 
     Args:
@@ -38,8 +42,21 @@ class EmoteResult(BaseModel):
     static_image: EmoteImage | None
     is_animated: bool
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "EmoteResult":
+        """Rebuild a result from the output of ``dataclasses.asdict``."""
+        image, static_image = data["image"], data["static_image"]
+        return cls(
+            emote_id=data["emote_id"],
+            name=data["name"],
+            image=EmoteImage(**image) if image else None,
+            static_image=EmoteImage(**static_image) if static_image else None,
+            is_animated=data["is_animated"],
+        )
 
-class EmoteSearchResponse(BaseModel):
+
+@dataclass(frozen=True, slots=True)
+class EmoteSearchResponse:
     """Represents a paginated emote search response.
 
     Args:
@@ -51,3 +68,24 @@ class EmoteSearchResponse(BaseModel):
     items: list[EmoteResult]
     page_count: int
     total_count: int
+
+    def to_bytes(self) -> bytes:
+        """Serialize the response as JSON."""
+        return json.dumps(asdict(self), separators=(",", ":")).encode()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "EmoteSearchResponse":
+        """Deserialize a response produced by :meth:`to_bytes`.
+
+        Raises:
+            ValueError: If the data is not a serialized response.
+        """
+        try:
+            payload = json.loads(data)
+            return cls(
+                items=[EmoteResult.from_dict(item) for item in payload["items"]],
+                page_count=payload["page_count"],
+                total_count=payload["total_count"],
+            )
+        except (KeyError, TypeError) as exc:
+            raise ValueError(f"Malformed search response: {exc}") from exc
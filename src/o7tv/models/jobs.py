@@ -0,0 +1,18 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class JobRequest(BaseModel):
+    """Represents a request to convert an emote asynchronously.
+
+    Args:
+        emote_url (str): Direct URL to the emote image.
+        emote_name (str | None): Emote display name used for the file name.
+        priority (str): Scheduling priority; interactive jobs run before bulk
+            and background ones.
+    """
+
+    emote_url: str
+    emote_name: str | None = None
+    priority: Literal["interactive", "bulk", "background"] = "interactive"
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import logging
+import time
+import zipfile
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from fastapi import HTTPException
+
+from o7tv.exceptions.ffmpeg_exceptions import O7tvError
+from o7tv.models.batch import BatchItem
+from o7tv.utils.http import safe_filename
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+
+class _ZipStreamBuffer:
+    """Write-only sink that lets ``zipfile`` produce a non-seekable stream."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _unique_filenames(items: list[BatchItem]) -> list[str]:
+    seen: dict[str, int] = {}
+    names = []
+    for item in items:
+        name = safe_filename(item.emote_name)
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        if count:
+            stem = name.removesuffix(".webm")
+            name = f"{stem}-{count + 1}.webm"
+        names.append(name)
+    return names
+
+
+def _error_message(exc: Exception) -> str:
+    if isinstance(exc, HTTPException):
+        return str(exc.detail)
+    if isinstance(exc, O7tvError):
+        return str(exc)
+    logger.error(f"Unexpected error during batch conversion: {exc}")
+    return "Unexpected error during conversion."
+
+
+def zip_files(files: list[tuple[str, bytes]]) -> bytes:
+    """Build an uncompressed ZIP archive in memory.
+
+    Args:
+        files (list[tuple[str, bytes]]): ``(name, content)`` pairs, in archive order.
+
+    Returns:
+        bytes: The ZIP archive.
+    """
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for name, content in files:
+            archive.writestr(zipfile.ZipInfo(name, time.localtime()[:6]), content)
+    return buffer.drain()
+
+
+async def iter_batch_zip(
+    items: list[BatchItem],
+    convert: Callable[[str], Awaitable[bytes]],
+    concurrency: int,
+) -> AsyncIterator[bytes]:
+    """Convert emotes in parallel and stream a ZIP archive as entries complete.
+
+    Entries are written in completion order. Failed conversions do not abort
+    the archive; every item's outcome is recorded in ``manifest.json``, which is
+    written last.
+
+    Args:
+        items (list[BatchItem]): Emotes to convert.
+        convert (Callable[[str], Awaitable[bytes]]): Converts one emote URL to WebM bytes.
+        concurrency (int): Maximum number of conversions in flight for this batch.
+
+    Yields:
+        bytes: Consecutive chunks of the ZIP archive.
+    """
+    filenames = _unique_filenames(items)
+    limiter = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run(index: int) -> tuple[int, bytes | None, str | None]:
+        async with limiter:
+            try:
+                return index, await convert(items[index].emote_url), None
+            except Exception as exc:
+                return index, None, _error_message(exc)
+
+    buffer = _ZipStreamBuffer()
+    manifest: list[dict[str, str | None]] = [{} for _ in items]
+    tasks = [asyncio.ensure_future(run(index)) for index in range(len(items))]
+    try:
+        with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+            for next_done in asyncio.as_completed(tasks):
+                index, payload, error = await next_done
+                item = items[index]
+                manifest[index] = {
+                    "emote_url": item.emote_url,
+                    "emote_name": item.emote_name,
+                    "file": filenames[index] if payload is not None else None,
+                    "error": error,
+                }
+                if payload is not None:
+                    info = zipfile.ZipInfo(filenames[index], time.localtime()[:6])
+                    archive.writestr(info, payload)
+                    yield buffer.drain()
+
+            archive.writestr(
+                MANIFEST_NAME,
+                json.dumps({"items": manifest}, indent=2),
+                compress_type=zipfile.ZIP_DEFLATED,
+            )
+        yield buffer.drain()
+    finally:
+        for task in tasks:
+            task.cancel()
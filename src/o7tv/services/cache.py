@@ -0,0 +1,370 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from o7tv.config.config import settings
+from o7tv.services.conversion import (
+    EncoderOptions,
+    OutputVariant,
+    encoder_fingerprint,
+    fallback_profiles,
+    render_webm_bytes,
+    render_webm_variants,
+)
+from o7tv.services.shared_state import SharedStore, file_lock, inflight_lock, shared_store
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """Content-addressed, size-bounded byte cache stored on the local filesystem.
+
+    Entries are written atomically (temporary file + rename) and evicted in
+    least-recently-used order once the total size exceeds ``max_bytes``. Reads
+    refresh the entry modification time, which is used as the recency marker.
+
+    When the directory is shared with other processes, the total size is kept in a
+    counter of the shared store; the directory is only rescanned, under a file
+    lock, to evict entries or to initialize the counter.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int,
+        suffix: str = ".bin",
+        shared: SharedStore | None = None,
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+            directory (Path): Directory where cache entries are stored.
+            max_bytes (int): Maximum total size of the cache in bytes.
+            suffix (str): File suffix used for cache entries.
+            shared (SharedStore | None): Store holding the size counter when other
+                processes write to the same directory.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._size: int | None = None
+
+    @staticmethod
+    def make_key(**parts: object) -> str:
+        """Build a stable cache key from the given parts.
+
+        Args:
+            **parts (object): JSON-serializable values identifying the entry.
+
+        Returns:
+            str: Hex-encoded SHA-256 digest of the parts.
+        """
+        encoded = json.dumps(parts, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _path_for(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{self.suffix}"
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self.directory.glob(f"*/*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        return self._size
+
+    def __contains__(self, key: str) -> bool:
+        """Return whether an entry exists for a key without refreshing its recency."""
+        return self._path_for(key).exists()
+
+    def get(self, key: str) -> bytes | None:
+        """Return the cached payload for a key.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            bytes | None: The cached payload, or None on a miss.
+        """
+        path = self._path_for(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except OSError as exc:
+            logger.warning(f"Unable to read cache entry {path}: {exc}")
+            return None
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store a payload atomically and evict old entries if needed.
+
+        Args:
+            key (str): The cache key.
+            data (bytes): The payload to store.
+        """
+        writer = self.open_writer(key)
+        writer.write(data)
+        writer.commit()
+
+    def open_writer(self, key: str) -> "CacheWriter":
+        """Start an incremental write for a key.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            CacheWriter: Writer that publishes the entry atomically on commit.
+        """
+        if self.shared is None:
+            with self._lock:
+                self._current_size()
+        return CacheWriter(self, key)
+
+    def _account(self, added: int, previous: int) -> None:
+        if self.shared is not None:
+            counter = f"disk_cache:{self.directory}"
+            total = self.shared.add(counter, added - previous)
+            if total is None or total > self.max_bytes:
+                with self._lock, file_lock(self.directory / ".evict.lock"):
+                    self._size = None
+                    if self._current_size() > self.max_bytes:
+                        self._evict()
+                    # The rescan also corrects drift from concurrent writes and deletions.
+                    self.shared.reset(counter, self._current_size())
+            return
+
+        with self._lock:
+            self._size = (self._size or 0) + added - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._size = total
+
+
+class CacheWriter:
+    """Incremental, atomic writer for a single :class:`DiskCache` entry.
+
+    Chunks are appended to a temporary file next to the final path. ``commit``
+    renames it into place; ``abort`` (or any write error) discards it. Entries
+    growing beyond the cache size limit are dropped.
+    """
+
+    def __init__(self, cache: DiskCache, key: str) -> None:
+        """Open a temporary file for the entry.
+
+        Args:
+            cache (DiskCache): The owning cache.
+            key (str): The cache key being written.
+        """
+        self._cache = cache
+        self._path = cache._path_for(key)
+        self._size = 0
+        self._tmp_name: str | None = None
+        self._file = None
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            fd, self._tmp_name = tempfile.mkstemp(dir=self._path.parent, suffix=".tmp")
+            self._file = os.fdopen(fd, "wb")
+        except OSError as exc:
+            logger.warning(f"Unable to write cache entry {self._path}: {exc}")
+            self.abort()
+
+    def write(self, chunk: bytes) -> None:
+        """Append a chunk to the entry.
+
+        Args:
+            chunk (bytes): The bytes to append.
+        """
+        if self._file is None:
+            return
+        if self._size + len(chunk) > self._cache.max_bytes:
+            self.abort()
+            return
+        try:
+            self._file.write(chunk)
+        except OSError as exc:
+            logger.warning(f"Unable to write cache entry {self._path}: {exc}")
+            self.abort()
+            return
+        self._size += len(chunk)
+
+    def commit(self) -> None:
+        """Publish the entry and evict old entries if needed."""
+        if self._file is None or self._tmp_name is None:
+            return
+        try:
+            self._file.close()
+            self._file = None
+            previous = self._path.stat().st_size if self._path.exists() else 0
+            os.replace(self._tmp_name, self._path)
+        except OSError as exc:
+            logger.warning(f"Unable to write cache entry {self._path}: {exc}")
+            self.abort()
+            return
+        self._tmp_name = None
+        self._cache._account(self._size, previous)
+
+    def abort(self) -> None:
+        """Discard the partially written entry."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._tmp_name is not None:
+            Path(self._tmp_name).unlink(missing_ok=True)
+            self._tmp_name = None
+
+
+conversion_cache = DiskCache(
+    settings.static_dir / "cache" / "webm",
+    max_bytes=settings.conversion_cache_max_bytes,
+    suffix=".webm",
+    shared=shared_store,
+)
+
+image_cache = DiskCache(
+    settings.static_dir / "cache" / "images",
+    max_bytes=settings.image_cache_max_bytes,
+    suffix=".img",
+    shared=shared_store,
+)
+
+
+def conversion_cache_key(
+    emote_url: str,
+    max_output_bytes: int | None,
+    profile: str | None = None,
+    max_side: int | None = None,
+) -> str:
+    """Build the conversion cache key for an emote.
+
+    Args:
+        emote_url (str): The source emote URL.
+        max_output_bytes (int | None): The WebM size limit applied to the output.
+        profile (str | None): The encoder profile; defaults to ``APP__ENCODER_PROFILE``.
+        max_side (int | None): The output bounding box of a variant, in pixels, or
+            None for the regular conversion.
+
+    Returns:
+        str: The cache key for the converted WebM.
+    """
+    # Variants are encoded through a different filter graph, so even a full-size
+    # variant gets its own key. Regular conversions keep the key they always had.
+    extra = {} if max_side is None else {"max_side": max_side}
+    return DiskCache.make_key(
+        source=emote_url,
+        encoder=encoder_fingerprint(profile or settings.encoder_profile),
+        max_output_bytes=max_output_bytes,
+        **extra,
+    )
+
+
+def cached_profile(emote_url: str, max_output_bytes: int | None) -> str | None:
+    """Return the profile of a cached conversion of an emote, if any.
+
+    Entries of the configured profile are preferred over downshifted ones. The
+    lookup does not refresh the entries' recency.
+
+    Args:
+        emote_url (str): The source emote URL.
+        max_output_bytes (int | None): The WebM size limit applied to the output.
+
+    Returns:
+        str | None: The profile of the first cached entry, or None if there is none.
+    """
+    if not settings.conversion_cache_enabled:
+        return None
+    for profile in fallback_profiles():
+        if conversion_cache_key(emote_url, max_output_bytes, profile) in conversion_cache:
+            return profile
+    return None
+
+
+def convert_and_cache(
+    emote_url: str, max_output_bytes: int | None, options: EncoderOptions
+) -> bytes:
+    """Convert an emote and store the result in the conversion cache.
+
+    The entry is keyed on the profile actually used, so output produced by a
+    downshifted profile is not served in place of the configured one. With shared
+    state enabled, a conversion of the same entry running in another worker is
+    waited for and its cached result returned instead of encoding again.
+
+    Args:
+        emote_url (str): The source emote URL.
+        max_output_bytes (int | None): The WebM size limit applied to the output.
+        options (EncoderOptions): Encoder settings for the conversion.
+
+    Returns:
+        bytes: The converted WebM payload.
+    """
+    cache_key = conversion_cache_key(emote_url, max_output_bytes, options.profile)
+    with inflight_lock(cache_key):
+        if settings.conversion_cache_enabled and cache_key in conversion_cache:
+            cached = conversion_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        payload = render_webm_bytes(emote_url, max_output_bytes=max_output_bytes, options=options)
+        if settings.conversion_cache_enabled:
+            conversion_cache.put(cache_key, payload)
+    return payload
+
+
+def convert_variants_and_cache(
+    emote_url: str, variants: list[OutputVariant], options: EncoderOptions
+) -> list[bytes]:
+    """Convert an emote to several variants and store each in the conversion cache.
+
+    Cached variants are reused; the missing ones are rendered together in a
+    single ffmpeg run.
+
+    Args:
+        emote_url (str): The source emote URL.
+        variants (list[OutputVariant]): The renditions to produce.
+        options (EncoderOptions): Encoder settings for the conversion.
+
+    Returns:
+        list[bytes]: The WebM payloads, in the order of ``variants``.
+    """
+    keys = [
+        conversion_cache_key(emote_url, variant.max_output_bytes, options.profile, variant.max_side)
+        for variant in variants
+    ]
+    with inflight_lock(DiskCache.make_key(variants=keys)):
+        payloads: list[bytes | None] = [None] * len(variants)
+        if settings.conversion_cache_enabled:
+            payloads = [conversion_cache.get(key) for key in keys]
+
+        missing = [index for index, payload in enumerate(payloads) if payload is None]
+        if missing:
+            rendered = render_webm_variants(
+                emote_url, [variants[index] for index in missing], options=options
+            )
+            for index, payload in zip(missing, rendered, strict=True):
+                payloads[index] = payload
+                if settings.conversion_cache_enabled:
+                    conversion_cache.put(keys[index], payload)
+    return [payload for payload in payloads if payload is not None]
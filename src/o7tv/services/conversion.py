@@ -1,7 +1,24 @@
+import json
 import logging
+import math
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections.abc import Generator, Iterator, Sequence
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from functools import partial
+from io import BufferedReader
+from pathlib import Path
+from typing import cast
+from urllib.parse import urlparse
 
 import ffmpeg
 
+from o7tv.config.config import settings
 from o7tv.exceptions.ffmpeg_exceptions import (
     FfmpegConversionError,
     FfmpegError,
@@ -9,9 +26,144 @@ from o7tv.exceptions.ffmpeg_exceptions import (
     FfmpegStreamError,
     FfmpegUnsupportedFormatError,
 )
+from o7tv.services.metrics import (
+    conversion_encodes,
+    conversion_errors,
+    conversion_seconds,
+    ffmpeg_cpu_seconds,
+    ffmpeg_wall_seconds,
+    output_bytes,
+    output_size_ratio,
+    source_fetch_seconds,
+    source_probe_seconds,
+    timed,
+)
+from o7tv.services.probe import SourceProbe, probe_source
+from o7tv.services.shared_state import ffmpeg_slots
+from o7tv.utils.http import download_to_path
 
 logger = logging.getLogger(__name__)
 
+NICE_BIN = shutil.which("nice")
+BENCH_RE = re.compile(rb"bench: utime=([\d.]+)s stime=([\d.]+)s")
+
+MAX_SIDE = 512
+OUTPUT_DURATION_SECONDS = 3
+INITIAL_CRF = 32
+MAX_CRF = 63
+# Aim slightly below the cap so a predicted CRF that is a little optimistic still fits.
+SIZE_TARGET_RATIO = 0.9
+# VP9 output size roughly halves every ~6 CRF steps in the 30-63 range.
+CRF_HALVING_STEP = 6.0
+# Output bytes per megapixel-frame at INITIAL_CRF, measured on the benchmark corpus.
+BYTES_PER_MEGAPIXEL_FRAME = 16_000
+# Start probe-seeded encodes a couple of steps below the estimate; overshooting costs a re-encode
+# while undershooting only costs quality.
+SEED_CRF_MARGIN = 2
+# Floor for the bitrate of size-targeted encodes, in bits per second.
+MIN_TARGET_BITRATE = 24_000
+# Second passes allowed per corrected encode; a miss re-runs it from the same first-pass stats.
+TWO_PASS_ATTEMPTS = 2
+# Container durations are rounded; allow a little slack before treating a source as too long.
+DURATION_TOLERANCE_SECONDS = 0.05
+BASE_OUTPUT_OPTIONS: dict[str, int | str] = {
+    "vcodec": "libvpx-vp9",
+    "pix_fmt": "yuva420p",
+    "auto-alt-ref": 0,
+    "format": "webm",
+    "t": OUTPUT_DURATION_SECONDS,
+}
+# Slack when comparing frame intervals against the frame-rate cap, so a 60fps source capped at
+# 30fps keeps every other frame despite rounded timestamps.
+FRAME_INTERVAL_TOLERANCE = 0.001
+# Frames within this many source frame intervals of the output end bypass duplicate dropping,
+# so a trailing hold still has its last frame and the output keeps its full duration.
+FINAL_FRAMES_WINDOW = 1.5
+ENCODER_PROFILES: dict[str, dict[str, int | str]] = {
+    "quality": {"deadline": "good", "cpu-used": 1, "row-mt": 1, "tile-columns": 1},
+    "balanced": {"deadline": "good", "cpu-used": 4, "row-mt": 1, "tile-columns": 1},
+    "fast": {"deadline": "realtime", "cpu-used": 8, "row-mt": 1, "tile-columns": 1},
+}
+# Profiles from slowest to fastest, used when downshifting under load.
+PROFILE_ORDER = ("quality", "balanced", "fast")
+
+
+@dataclass(frozen=True, slots=True)
+class EncoderOptions:
+    """Per-conversion encoder settings.
+
+    Args:
+        profile (str): Name of the entry in ``ENCODER_PROFILES`` to encode with.
+        threads (int): ffmpeg thread count; 0 lets ffmpeg decide.
+        nice (int): Scheduling niceness for ffmpeg; positive values run it at
+            lower CPU priority where ``nice`` is available.
+    """
+
+    profile: str = "balanced"
+    threads: int = 0
+    nice: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class OutputVariant:
+    """One rendition produced by :func:`render_webm_variants`.
+
+    Args:
+        max_side (int): Bounding box the output is scaled to fit, in pixels.
+        max_output_bytes (int | None): Maximum allowed WebM output size in bytes.
+    """
+
+    max_side: int = MAX_SIDE
+    max_output_bytes: int | None = None
+
+
+def select_encoder_profile(queue_depth: int = 0) -> str:
+    """Pick the encoder profile for a conversion given the current load.
+
+    Starting from ``APP__ENCODER_PROFILE``, the profile moves one step faster for
+    every ``APP__ENCODER_DOWNSHIFT_QUEUE_DEPTH`` conversions waiting in the queue.
+
+    Args:
+        queue_depth (int): Number of conversions waiting for a worker.
+
+    Returns:
+        str: The selected profile name.
+    """
+    index = PROFILE_ORDER.index(settings.encoder_profile)
+    threshold = settings.encoder_downshift_queue_depth
+    if threshold > 0:
+        index += queue_depth // threshold
+    return PROFILE_ORDER[min(index, len(PROFILE_ORDER) - 1)]
+
+
+def fallback_profiles() -> tuple[str, ...]:
+    """Return the profiles whose output can be served in place of the configured one.
+
+    Conversions may have been downshifted under load, so output of the configured
+    profile and of every faster profile is a valid rendition.
+
+    Returns:
+        tuple[str, ...]: Profile names from ``APP__ENCODER_PROFILE`` to the fastest.
+    """
+    return PROFILE_ORDER[PROFILE_ORDER.index(settings.encoder_profile) :]
+
+
+def encoder_options(queue_depth: int = 0, nice: int = 0) -> EncoderOptions:
+    """Build encoder options from the settings and the current load.
+
+    Args:
+        queue_depth (int): Number of conversions waiting for a worker.
+        nice (int): Scheduling niceness for ffmpeg.
+
+    Returns:
+        EncoderOptions: Options for a single conversion.
+    """
+    return EncoderOptions(
+        profile=select_encoder_profile(queue_depth),
+        threads=settings.encoder_threads,
+        nice=nice,
+    )
+
 
 def _raise_ffmpeg_error(stderr_msg: str) -> None:
     if (
@@ -29,60 +181,545 @@ def _raise_ffmpeg_error(stderr_msg: str) -> None:
     raise FfmpegConversionError(f"Unable to convert the emote: {stderr_msg[:200]}")
 
 
-def _build_scaled_stream(input_source: str, max_side: int) -> ffmpeg.nodes.FilterableStream:
+@contextmanager
+def _local_source(input_source: str) -> Iterator[str]:
+    parsed = urlparse(input_source)
+    if parsed.scheme not in {"http", "https"}:
+        yield input_source
+        return
+
+    with tempfile.TemporaryDirectory(prefix="o7tv-") as tmp_dir:
+        dest = Path(tmp_dir) / f"source{Path(parsed.path).suffix}"
+        with timed("fetch", source_fetch_seconds):
+            downloaded = download_to_path(input_source, dest)
+        if downloaded is None:
+            raise FfmpegInvalidInputError(
+                "Unable to download the emote source. Try another emote URL."
+            )
+        yield str(dest)
+
+
+def preprocessing_enabled() -> bool:
+    """Return whether frames are capped or de-duplicated before encoding."""
+    return bool(settings.max_frame_rate) or settings.drop_duplicate_frames
+
+
+def _final_frames_start(probe: SourceProbe | None) -> float | None:
+    """Return the time from which frames bypass duplicate dropping, or None when unknown."""
+    if probe is None or probe.duration <= 0 or probe.frame_rate <= 0:
+        return None
+    start = _output_duration(probe) - FINAL_FRAMES_WINDOW / probe.frame_rate
+    return start if start > 0 else None
+
+
+def _preprocess(
+    stream: ffmpeg.nodes.FilterableStream, probe: SourceProbe | None = None
+) -> ffmpeg.nodes.FilterableStream:
+    """Drop frames the encoder does not need while keeping the source timing.
+
+    Frames closer than ``1 / APP__MAX_FRAME_RATE`` to the previously kept frame are
+    dropped, and ``mpdecimate`` removes frames nearly identical to the previous one.
+    Kept frames retain their timestamps, so each is shown until the next one and
+    the output plays at the original speed.
+
+    ``mpdecimate`` cannot look ahead, so it would drop a trailing hold entirely and
+    end the output when the motion stops. The final frames are therefore split off
+    before it and merged back by timestamp, which needs the probed duration and
+    frame rate: without them, duplicate frames are kept.
+
+    Args:
+        stream (ffmpeg.nodes.FilterableStream): The decoded source.
+        probe (SourceProbe | None): The probed source properties.
+
+    Returns:
+        ffmpeg.nodes.FilterableStream: The stream with the unneeded frames dropped.
+    """
+    if settings.max_frame_rate:
+        interval = 1 / settings.max_frame_rate - FRAME_INTERVAL_TOLERANCE
+        stream = stream.filter(
+            "select", f"isnan(prev_selected_t)+gte(t-prev_selected_t,{interval:.6f})"
+        )
+    final_start = _final_frames_start(probe)
+    if settings.drop_duplicate_frames and final_start is not None:
+        # Pin the encoder's pixel format first so format negotiation cannot drop alpha.
+        branches = stream.filter("format", BASE_OUTPUT_OPTIONS["pix_fmt"]).split()
+        body = (
+            branches[0]
+            .filter("trim", end=f"{final_start:.6f}")
+            .filter(
+                "mpdecimate",
+                hi=settings.duplicate_frame_hi,
+                lo=settings.duplicate_frame_lo,
+                frac=settings.duplicate_frame_frac,
+            )
+        )
+        final = branches[1].filter("trim", start=f"{final_start:.6f}")
+        stream = ffmpeg.filter([body, final], "interleave")
+    return stream
+
+
+def _frame_timing_options() -> dict[str, int | str]:
+    # Preprocessing leaves gaps between frames; keep them instead of padding to a constant rate.
+    return {"fps_mode": "vfr"} if preprocessing_enabled() else {}
+
+
+def _scale(stream: ffmpeg.nodes.FilterableStream, max_side: int) -> ffmpeg.nodes.FilterableStream:
     scale_w = f"if(gt(iw,ih),{max_side},trunc({max_side}*iw/ih/2)*2)"
     scale_h = f"if(gt(ih,iw),{max_side},trunc({max_side}*ih/iw/2)*2)"
-    return ffmpeg.input(input_source).filter("scale", scale_w, scale_h)
+    return stream.filter("scale", scale_w, scale_h)
+
+
+def _build_scaled_stream(
+    input_source: str, max_side: int, probe: SourceProbe | None
+) -> ffmpeg.nodes.FilterableStream:
+    return _scale(_preprocess(ffmpeg.input(input_source), probe), max_side)
+
 
+def _ffmpeg_cmd(nice: int) -> str | list[str]:
+    if nice and NICE_BIN is not None:
+        return [NICE_BIN, "-n", str(nice), "ffmpeg"]
+    return "ffmpeg"
 
-def _encode_webm_bytes(input_source: str, *, crf: int, fs_limit: int | None) -> bytes:
-    stream = _build_scaled_stream(input_source, 512)
 
+def _output_options(
+    *,
+    crf: int,
+    options: EncoderOptions,
+    bitrate: int | None = None,
+    rc_pass: tuple[int, str] | None = None,
+) -> dict[str, int | str]:
     out_kwargs: dict[str, int | str] = {
-        "vcodec": "libvpx-vp9",
-        "pix_fmt": "yuva420p",
+        **BASE_OUTPUT_OPTIONS,
+        **_frame_timing_options(),
+        **ENCODER_PROFILES[options.profile],
         "b:v": "0",
         "crf": crf,
-        "auto-alt-ref": 0,
-        "format": "webm",
-        "t": 3,
     }
+    if options.threads > 0:
+        out_kwargs["threads"] = options.threads
 
-    if fs_limit is not None:
-        duration_seconds = 3
-        target_bitrate_bps = max(int((fs_limit * 8) / duration_seconds * 0.92), 24_000)
-        out_kwargs["b:v"] = target_bitrate_bps
-        out_kwargs["maxrate"] = target_bitrate_bps
-        out_kwargs["bufsize"] = target_bitrate_bps * 2
-        out_kwargs["fs"] = fs_limit
+    if bitrate is not None:
+        # Constrained quality: the CRF caps quality while the bitrate holds the average size.
+        out_kwargs["b:v"] = bitrate
+    if rc_pass is not None:
+        out_kwargs["pass"], out_kwargs["passlogfile"] = rc_pass
+        if out_kwargs.get("deadline") == "realtime":
+            # libvpx rejects two-pass encoding at the realtime deadline.
+            out_kwargs["deadline"] = "good"
+        if rc_pass[0] == 1:
+            # The first pass only collects statistics.
+            out_kwargs["format"] = "null"
+    return out_kwargs
 
-    process = (
-        ffmpeg.output(stream, "pipe:", **out_kwargs)
+
+def _run_outputs(
+    outputs: Sequence[ffmpeg.nodes.OutputStream], options: EncoderOptions
+) -> subprocess.Popen[bytes]:
+    process: subprocess.Popen[bytes] = (
+        ffmpeg.merge_outputs(*outputs)
         .overwrite_output()
-        .run_async(pipe_stdout=True, pipe_stderr=True)
+        .global_args("-benchmark")
+        .run_async(cmd=_ffmpeg_cmd(options.nice), pipe_stdout=True, pipe_stderr=True)
     )
+    return process
+
+
+def _start_encoder(
+    input_source: str,
+    *,
+    crf: int,
+    options: EncoderOptions,
+    max_side: int = MAX_SIDE,
+    bitrate: int | None = None,
+    rc_pass: tuple[int, str] | None = None,
+    probe: SourceProbe | None = None,
+) -> subprocess.Popen[bytes]:
+    stream = _build_scaled_stream(input_source, max_side, probe)
+    out_kwargs = _output_options(crf=crf, options=options, bitrate=bitrate, rc_pass=rc_pass)
+    return _run_outputs([ffmpeg.output(stream, "pipe:", **out_kwargs)], options)
+
+
+def _close_process(process: subprocess.Popen[bytes]) -> None:
+    if process.poll() is None:
+        process.kill()
+        process.wait()
+    if process.stdout:
+        process.stdout.close()
+    if process.stderr:
+        process.stderr.close()
+
+
+def _observe_ffmpeg_cpu(stderr: bytes | None) -> None:
+    match = BENCH_RE.search(stderr or b"")
+    if match:
+        ffmpeg_cpu_seconds.observe(float(match.group(1)) + float(match.group(2)))
+
+
+def _communicate(process: subprocess.Popen[bytes], input_source: str) -> bytes:
     try:
-        output, stderr = process.communicate()
+        with timed("encode", ffmpeg_wall_seconds):
+            output, stderr = process.communicate()
+        _observe_ffmpeg_cpu(stderr)
         if process.returncode != 0:
             stderr_msg = stderr.decode() if stderr else "unknown error"
             logger.error(f"FFmpeg conversion failed for {input_source}: {stderr_msg}")
             _raise_ffmpeg_error(stderr_msg)
         return bytes(output or b"")
     finally:
-        if process.poll() is None:
-            process.kill()
-        if process.stdout:
-            process.stdout.close()
-        if process.stderr:
-            process.stderr.close()
+        _close_process(process)
+
+
+def _encode_webm_bytes(
+    input_source: str,
+    *,
+    crf: int,
+    options: EncoderOptions,
+    max_side: int = MAX_SIDE,
+    bitrate: int | None = None,
+    rc_pass: tuple[int, str] | None = None,
+    probe: SourceProbe | None = None,
+) -> bytes:
+    with ffmpeg_slots.acquire():
+        process = _start_encoder(
+            input_source,
+            crf=crf,
+            options=options,
+            max_side=max_side,
+            bitrate=bitrate,
+            rc_pass=rc_pass,
+            probe=probe,
+        )
+        return _communicate(process, input_source)
+
+
+def _encode_variants(
+    input_source: str,
+    targets: Sequence[tuple[OutputVariant, int]],
+    options: EncoderOptions,
+    output_dir: Path,
+    probe: SourceProbe | None = None,
+) -> list[bytes]:
+    """Encode several variants from one decode of the source in a single ffmpeg run.
+
+    Args:
+        input_source (str): Path to the local source.
+        targets (Sequence[tuple[OutputVariant, int]]): Each variant with its CRF.
+        options (EncoderOptions): Encoder settings shared by every variant.
+        output_dir (Path): Directory receiving the encoded files.
+        probe (SourceProbe | None): The probed source properties.
+
+    Returns:
+        list[bytes]: The WebM payloads, in the order of ``targets``.
+    """
+    source = _preprocess(ffmpeg.input(input_source), probe)
+    branches = source.split() if len(targets) > 1 else None
+    paths = [output_dir / f"variant-{index}.webm" for index in range(len(targets))]
+    outputs = [
+        ffmpeg.output(
+            _scale(branches[index] if branches is not None else source, variant.max_side),
+            str(path),
+            **_output_options(crf=crf, options=options),
+        )
+        for index, ((variant, crf), path) in enumerate(zip(targets, paths, strict=True))
+    ]
+    with ffmpeg_slots.acquire():
+        _communicate(_run_outputs(outputs, options), input_source)
+    return [path.read_bytes() if path.exists() else b"" for path in paths]
+
+
+def encoder_fingerprint(profile: str) -> str:
+    """Describe the encoder configuration used to produce WebM output.
+
+    The fingerprint changes whenever the output options, encoder profile, scaling box,
+    frame preprocessing or rate control parameters change, so cached conversions
+    produced by an older pipeline are not reused. Frame preprocessing only enters it
+    when enabled, so switching it off restores the keys of output encoded without it.
+
+    Args:
+        profile (str): The encoder profile name.
+
+    Returns:
+        str: A stable string representation of the encoder parameters.
+    """
+    fingerprint: dict[str, object] = {
+        "max_side": MAX_SIDE,
+        "initial_crf": INITIAL_CRF,
+        "max_crf": MAX_CRF,
+        "size_target_ratio": SIZE_TARGET_RATIO,
+        "bytes_per_megapixel_frame": BYTES_PER_MEGAPIXEL_FRAME,
+        "seed_crf_margin": SEED_CRF_MARGIN,
+        # Corrected encodes used to be cut short with -fs; keep their output out of the cache.
+        "rate_control": "two-pass",
+        "min_target_bitrate": MIN_TARGET_BITRATE,
+        "output": BASE_OUTPUT_OPTIONS,
+        "profile": ENCODER_PROFILES[profile],
+    }
+    if settings.max_frame_rate:
+        fingerprint["max_frame_rate"] = settings.max_frame_rate
+    if settings.drop_duplicate_frames:
+        fingerprint["duplicate_frames"] = [
+            settings.duplicate_frame_hi,
+            settings.duplicate_frame_lo,
+            settings.duplicate_frame_frac,
+            FINAL_FRAMES_WINDOW,
+        ]
+    return json.dumps(fingerprint, sort_keys=True)
+
+
+def _predict_crf(samples: list[tuple[int, int]], target_bytes: int) -> int:
+    """Predict the CRF that brings the output down to the target size.
+
+    Output size is modelled as log-linear in CRF. The slope is measured from the
+    last two encodes when available and falls back to ``CRF_HALVING_STEP``.
+
+    Args:
+        samples (list[tuple[int, int]]): ``(crf, size)`` pairs of oversized encodes.
+        target_bytes (int): The desired output size in bytes.
+
+    Returns:
+        int: The next CRF to try, always higher than the last one.
+    """
+    crf, size = samples[-1]
+    slope = -math.log(2) / CRF_HALVING_STEP
+    if len(samples) >= 2:
+        prev_crf, prev_size = samples[-2]
+        if prev_crf != crf:
+            measured = (math.log(size) - math.log(prev_size)) / (crf - prev_crf)
+            if measured < 0:
+                slope = measured
 
+    predicted = crf + (math.log(target_bytes) - math.log(size)) / slope
+    return min(MAX_CRF, max(crf + 1, math.ceil(predicted)))
 
-def render_webm_bytes(input_source: str, max_output_bytes: int | None = None) -> bytes:
+
+def _scaled_dimensions(width: int, height: int, max_side: int = MAX_SIDE) -> tuple[int, int]:
+    # Mirrors the scale expressions in _scale.
+    if width > height:
+        return max_side, math.trunc(max_side * height / width / 2) * 2
+    if height > width:
+        return math.trunc(max_side * width / height / 2) * 2, max_side
+    return max_side, max_side
+
+
+def is_compliant(
+    probe: SourceProbe, max_output_bytes: int | None, max_side: int = MAX_SIDE
+) -> bool:
+    """Return whether a source can be served as-is instead of being re-encoded.
+
+    Args:
+        probe (SourceProbe): The probed source properties.
+        max_output_bytes (int | None): Maximum allowed WebM output size in bytes.
+        max_side (int): Bounding box the output must fit, in pixels.
+
+    Returns:
+        bool: True for VP9 WebM sources that already fit the output box, duration
+        and size limit.
+    """
+    return (
+        probe.codec == "vp9"
+        and "webm" in probe.format_name.split(",")
+        and 0 < max(probe.width, probe.height) <= max_side
+        and 0 < probe.duration <= OUTPUT_DURATION_SECONDS + DURATION_TOLERANCE_SECONDS
+        and (max_output_bytes is None or probe.size_bytes <= max_output_bytes)
+    )
+
+
+def _seed_crf(
+    probe: SourceProbe | None, max_output_bytes: int | None, max_side: int = MAX_SIDE
+) -> int:
+    """Estimate the starting CRF for a source from its probed properties.
+
+    The output size at ``INITIAL_CRF`` is estimated from the scaled frame area and
+    the number of frames kept, then ``_predict_crf``'s log-linear model is applied
+    to skip encodes that are certain to be oversized.
+
+    Args:
+        probe (SourceProbe | None): The probed source properties.
+        max_output_bytes (int | None): Maximum allowed WebM output size in bytes.
+        max_side (int): Bounding box the output is scaled to fit, in pixels.
+
+    Returns:
+        int: The CRF for the first encode, never below ``INITIAL_CRF``.
+    """
+    if probe is None or max_output_bytes is None or not probe.width or not probe.height:
+        return INITIAL_CRF
+
+    width, height = _scaled_dimensions(probe.width, probe.height, max_side)
+    frames = float(probe.frame_count)
+    frame_rate = probe.frame_rate
+    if settings.max_frame_rate:
+        frame_rate = min(frame_rate or math.inf, settings.max_frame_rate)
+    if frame_rate:
+        frames = min(frames or math.inf, frame_rate * OUTPUT_DURATION_SECONDS)
+    if not frames:
+        return INITIAL_CRF
+
+    estimated = BYTES_PER_MEGAPIXEL_FRAME * width * height / 1_000_000 * frames
+    target_bytes = max(max_output_bytes * SIZE_TARGET_RATIO, 1)
+    if estimated <= target_bytes:
+        return INITIAL_CRF
+    steps = math.log2(estimated / target_bytes) * CRF_HALVING_STEP - SEED_CRF_MARGIN
+    return min(MAX_CRF, max(INITIAL_CRF, INITIAL_CRF + math.ceil(steps)))
+
+
+def _output_duration(probe: SourceProbe | None) -> float:
+    """Return the expected output duration, assuming the full trim length when unknown."""
+    if probe is None or probe.duration <= 0:
+        return OUTPUT_DURATION_SECONDS
+    return min(probe.duration, OUTPUT_DURATION_SECONDS)
+
+
+def _encode_corrected(
+    input_source: str,
+    max_output_bytes: int,
+    oversized: tuple[int, int],
+    options: EncoderOptions,
+    max_side: int = MAX_SIDE,
+    probe: SourceProbe | None = None,
+) -> tuple[bytes, int]:
+    """Re-encode an oversized output so that it fits the size limit.
+
+    A two-pass VP9 encode runs at the bitrate that spreads the target size over
+    the output duration, with the CRF predicted from the oversized attempt as
+    its quality ceiling. If the result still misses the limit, the second pass
+    runs once more from the same statistics with the overshoot taken off the
+    bitrate. Every frame is kept: the output is never cut short to fit.
+
+    Args:
+        input_source (str): Path to the local source.
+        max_output_bytes (int): Maximum allowed WebM output size in bytes.
+        oversized (tuple[int, int]): ``(crf, size)`` of the attempt that missed the limit.
+        options (EncoderOptions): Encoder settings.
+        max_side (int): Bounding box the output is scaled to fit, in pixels.
+        probe (SourceProbe | None): The probed source properties.
+
+    Returns:
+        tuple[bytes, int]: The WebM payload and the number of ffmpeg runs.
+
+    Raises:
+        FfmpegConversionError: If the output still exceeds the size limit.
+    """
+    target_bytes = max(int(max_output_bytes * SIZE_TARGET_RATIO), 1)
+    crf = _predict_crf([oversized], target_bytes)
+    duration = _output_duration(probe)
+    bitrate = max(int(target_bytes * 8 / duration), MIN_TARGET_BITRATE)
+    # Each pass decodes the source again: that is a few percent of the encode's CPU time, and a
+    # scaled intermediate copy costs about as much to write as it saves.
+    encode = partial(
+        _encode_webm_bytes, input_source, crf=crf, options=options, max_side=max_side, probe=probe
+    )
+    smallest = oversized[1]
+    with tempfile.TemporaryDirectory(prefix="o7tv-") as tmp_dir:
+        passlog = str(Path(tmp_dir) / "pass")
+        encode(bitrate=bitrate, rc_pass=(1, passlog))
+        runs = 1
+        while runs < 1 + TWO_PASS_ATTEMPTS:
+            payload = encode(bitrate=bitrate, rc_pass=(2, passlog))
+            runs += 1
+            if not payload:
+                raise FfmpegStreamError("Unable to stream the conversion output.")
+            if len(payload) <= max_output_bytes:
+                return payload, runs
+            smallest = min(smallest, len(payload))
+            # The overshoot is mostly a fixed cost (key frame, alpha plane, container),
+            # so it is taken off the bitrate as a whole rather than scaled.
+            overshoot_bps = int((len(payload) - target_bytes) * 8 / duration)
+            bitrate = max(bitrate - overshoot_bps, MIN_TARGET_BITRATE)
+
+    raise FfmpegConversionError(
+        f"Unable to fit output within {max_output_bytes} bytes after quality reduction. "
+        f"Smallest result was {smallest} bytes."
+    )
+
+
+def _render_local_source(
+    input_source: str,
+    max_output_bytes: int | None,
+    options: EncoderOptions,
+    initial_crf: int = INITIAL_CRF,
+    max_side: int = MAX_SIDE,
+    probe: SourceProbe | None = None,
+) -> tuple[bytes, int]:
+    encode = partial(
+        _encode_webm_bytes, input_source, options=options, max_side=max_side, probe=probe
+    )
+    if max_output_bytes is None:
+        return encode(crf=INITIAL_CRF), 1
+
+    payload = encode(crf=initial_crf)
+    if not payload:
+        raise FfmpegStreamError("Unable to stream the conversion output.")
+    if len(payload) <= max_output_bytes:
+        return payload, 1
+    payload, runs = _encode_corrected(
+        input_source, max_output_bytes, (initial_crf, len(payload)), options, max_side, probe
+    )
+    return payload, 1 + runs
+
+
+def _observe_success(outputs: Sequence[tuple[int, int | None]], encodes: int, start: float) -> None:
+    conversion_seconds.observe(time.perf_counter() - start, outcome="success")
+    conversion_encodes.observe(encodes)
+    for size, max_output_bytes in outputs:
+        output_bytes.observe(size)
+        if max_output_bytes:
+            output_size_ratio.observe(size / max_output_bytes)
+
+
+def _observe_failure(error: Exception, start: float) -> None:
+    conversion_seconds.observe(time.perf_counter() - start, outcome="error")
+    conversion_errors.inc(error=type(error).__name__)
+
+
+def check_ffmpeg() -> None:
+    """Run a tiny VP9 encode to verify ffmpeg and load it ahead of the first conversion.
+
+    The first ffmpeg run after start-up pays for loading the binary and codec
+    libraries from disk; running it during warm-up keeps that cost off user
+    requests.
+
+    Raises:
+        FfmpegError: If ffmpeg is missing or cannot encode VP9.
+    """
+    try:
+        (
+            ffmpeg.input("color=c=black:s=16x16:d=0.1", f="lavfi")
+            .output("pipe:", vcodec="libvpx-vp9", pix_fmt="yuva420p", format="webm")
+            .run(capture_stdout=True, capture_stderr=True)
+        )
+    except FileNotFoundError as e:
+        raise FfmpegConversionError("ffmpeg is not installed.") from e
+    except ffmpeg.Error as e:
+        _raise_ffmpeg_error(e.stderr.decode(errors="replace") if e.stderr else "unknown error")
+    if shutil.which("ffprobe") is None:
+        logger.warning("ffprobe is not installed; sources will be converted without probing")
+
+
+def _probe_local_source(local_source: str) -> SourceProbe | None:
+    with timed("probe", source_probe_seconds):
+        probe = probe_source(local_source)
+    if probe is not None:
+        logger.debug(f"Probed {local_source}: {probe}")
+    return probe
+
+
+def render_webm_bytes(
+    input_source: str,
+    max_output_bytes: int | None = None,
+    options: EncoderOptions | None = None,
+) -> bytes:
     """Converts a media file to WebM format and returns the output as bytes.
 
+    Remote sources are downloaded once to a temporary file, so every encode
+    attempt reads the same local copy instead of re-fetching it from the CDN.
+    The source is probed first: compliant VP9 WebM sources are returned without
+    re-encoding, and the probe seeds the starting CRF for everything else.
+
     Args:
         input_source (str): Path or URL to the input media file.
         max_output_bytes (int | None): Maximum allowed WebM output size in bytes.
+        options (EncoderOptions | None): Encoder settings; defaults to
+            ``encoder_options()``.
 
     Returns:
         bytes: The converted WebM payload.
@@ -90,32 +727,202 @@ def render_webm_bytes(input_source: str, max_output_bytes: int | None = None) ->
     Raises:
         FfmpegError: If ffmpeg conversion fails or the size limit cannot be met.
     """
+    options = options or encoder_options()
+    start = time.perf_counter()
     try:
-        if max_output_bytes is None:
-            return _encode_webm_bytes(input_source, crf=32, fs_limit=None)
-
-        attempts = [32, 36, 40, 44, 48, 52, 56, 60, 63]
-        last_payload = b""
-
-        for crf in attempts:
-            fs_limit = max(max_output_bytes - 1024, 1024)
-            payload = _encode_webm_bytes(
-                input_source,
-                crf=crf,
-                fs_limit=fs_limit,
-            )
-            last_payload = payload
-            if len(payload) <= max_output_bytes:
-                return payload
+        with _local_source(input_source) as local_source:
+            probe = _probe_local_source(local_source)
+            if probe is not None and is_compliant(probe, max_output_bytes):
+                payload, encodes = Path(local_source).read_bytes(), 0
+            else:
+                payload, encodes = _render_local_source(
+                    local_source,
+                    max_output_bytes,
+                    options,
+                    _seed_crf(probe, max_output_bytes),
+                    probe=probe,
+                )
+    except FfmpegError as e:
+        _observe_failure(e, start)
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error during streaming conversion of {input_source}: {e}")
+        _observe_failure(e, start)
+        raise FfmpegConversionError("Unexpected error during conversion.") from e
 
-        if not last_payload:
-            raise FfmpegStreamError("Unable to stream the conversion output.")
-        raise FfmpegConversionError(
-            f"Unable to fit output within {max_output_bytes} bytes after quality reduction. "
-            f"Smallest result was {len(last_payload)} bytes."
-        )
-    except FfmpegError:
+    _observe_success([(len(payload), max_output_bytes)], encodes, start)
+    return payload
+
+
+def render_webm_variants(
+    input_source: str,
+    variants: Sequence[OutputVariant],
+    options: EncoderOptions | None = None,
+) -> list[bytes]:
+    """Converts a media file to several WebM variants in one ffmpeg run.
+
+    The source is downloaded, probed and decoded once; ffmpeg's ``split`` filter
+    feeds a separate scale and encode branch per variant, each starting at its
+    probe-seeded CRF. Variants that still exceed their size limit go through the
+    regular rate control individually.
+
+    Args:
+        input_source (str): Path or URL to the input media file.
+        variants (Sequence[OutputVariant]): The renditions to produce.
+        options (EncoderOptions | None): Encoder settings; defaults to
+            ``encoder_options()``.
+
+    Returns:
+        list[bytes]: The WebM payloads, in the order of ``variants``.
+
+    Raises:
+        FfmpegError: If ffmpeg conversion fails or a size limit cannot be met.
+    """
+    options = options or encoder_options()
+    start = time.perf_counter()
+    payloads: list[bytes] = [b""] * len(variants)
+    encodes = 0
+    try:
+        with (
+            _local_source(input_source) as local_source,
+            tempfile.TemporaryDirectory(prefix="o7tv-") as tmp_dir,
+        ):
+            probe = _probe_local_source(local_source)
+            targets: dict[int, int] = {}
+            for index, variant in enumerate(variants):
+                if probe is not None and is_compliant(
+                    probe, variant.max_output_bytes, variant.max_side
+                ):
+                    payloads[index] = Path(local_source).read_bytes()
+                else:
+                    targets[index] = _seed_crf(probe, variant.max_output_bytes, variant.max_side)
+
+            if targets:
+                encoded = _encode_variants(
+                    local_source,
+                    [(variants[index], crf) for index, crf in targets.items()],
+                    options,
+                    Path(tmp_dir),
+                    probe,
+                )
+                encodes += 1
+                for (index, crf), payload in zip(targets.items(), encoded, strict=True):
+                    if not payload:
+                        raise FfmpegStreamError("Unable to stream the conversion output.")
+                    variant = variants[index]
+                    cap = variant.max_output_bytes
+                    if cap is not None and len(payload) > cap:
+                        payload, runs = _encode_corrected(
+                            local_source,
+                            cap,
+                            (crf, len(payload)),
+                            options,
+                            variant.max_side,
+                            probe,
+                        )
+                        encodes += runs
+                    payloads[index] = payload
+    except FfmpegError as e:
+        _observe_failure(e, start)
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error during variant conversion of {input_source}: {e}")
+        _observe_failure(e, start)
+        raise FfmpegConversionError("Unexpected error during conversion.") from e
+
+    sizes = [
+        (len(payload), variant.max_output_bytes)
+        for payload, variant in zip(payloads, variants, strict=True)
+    ]
+    _observe_success(sizes, encodes, start)
+    return payloads
+
+
+def _iter_encoder_output(
+    input_source: str, options: EncoderOptions, chunk_size: int, probe: SourceProbe | None
+) -> Generator[bytes, None, None]:
+    with ffmpeg_slots.acquire():
+        process = _start_encoder(input_source, crf=INITIAL_CRF, options=options, probe=probe)
+        start = time.perf_counter()
+        stdout = cast(BufferedReader, process.stdout)
+        stderr = cast(BufferedReader, process.stderr)
+        stderr_chunks: list[bytes] = []
+        # Drain stderr concurrently so a chatty ffmpeg never blocks on a full pipe.
+        drain = threading.Thread(target=lambda: stderr_chunks.append(stderr.read()), daemon=True)
+        drain.start()
+        try:
+            while chunk := stdout.read1(chunk_size):
+                yield chunk
+            process.wait()
+            drain.join()
+            ffmpeg_wall_seconds.observe(time.perf_counter() - start)
+            _observe_ffmpeg_cpu(b"".join(stderr_chunks))
+            if process.returncode != 0:
+                stderr_msg = b"".join(stderr_chunks).decode(errors="replace")
+                logger.error(f"FFmpeg conversion failed for {input_source}: {stderr_msg}")
+                _raise_ffmpeg_error(stderr_msg or "unknown error")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            drain.join(timeout=1)
+            _close_process(process)
+
+
+def _iter_file(path: str, chunk_size: int) -> Generator[bytes, None, None]:
+    with open(path, "rb") as source:
+        while chunk := source.read(chunk_size):
+            yield chunk
+
+
+def iter_webm_chunks(
+    input_source: str,
+    options: EncoderOptions | None = None,
+    chunk_size: int = 64 * 1024,
+) -> Generator[bytes, None, None]:
+    """Converts a media file to WebM format and yields the output as it is produced.
+
+    The output is not size limited, so a single encode runs and ffmpeg stdout is
+    forwarded chunk by chunk instead of being buffered. Compliant VP9 WebM sources
+    are forwarded as-is. Closing the iterator early kills ffmpeg and removes the
+    downloaded source.
+
+    Args:
+        input_source (str): Path or URL to the input media file.
+        options (EncoderOptions | None): Encoder settings; defaults to
+            ``encoder_options()``.
+        chunk_size (int): Maximum number of bytes per yielded chunk.
+
+    Yields:
+        bytes: Consecutive chunks of the WebM payload.
+
+    Raises:
+        FfmpegError: If ffmpeg conversion fails.
+    """
+    options = options or encoder_options()
+    start = time.perf_counter()
+    size = 0
+    encodes = 1
+    try:
+        with _local_source(input_source) as local_source:
+            probe = _probe_local_source(local_source)
+            if probe is not None and is_compliant(probe, None):
+                chunks = _iter_file(local_source, chunk_size)
+                encodes = 0
+            else:
+                chunks = _iter_encoder_output(local_source, options, chunk_size, probe)
+            with closing(chunks):
+                for chunk in chunks:
+                    size += len(chunk)
+                    yield chunk
+            if not size:
+                raise FfmpegStreamError("Unable to stream the conversion output.")
+    except FfmpegError as e:
+        _observe_failure(e, start)
         raise
     except Exception as e:
         logger.error(f"Unexpected error during streaming conversion of {input_source}: {e}")
+        _observe_failure(e, start)
         raise FfmpegConversionError("Unexpected error during conversion.") from e
+
+    _observe_success([(size, None)], encodes, start)
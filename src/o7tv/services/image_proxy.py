@@ -0,0 +1,196 @@
+import hashlib
+import json
+import re
+import time
+from collections.abc import AsyncGenerator, AsyncIterator
+from dataclasses import asdict, dataclass
+
+import requests
+from anyio import to_thread
+
+from o7tv.config.config import settings
+from o7tv.services.cache import DiskCache, image_cache
+from o7tv.utils.http_client import http_client
+
+MAX_AGE_RE = re.compile(r"(?:^|,)\s*(?:s-)?max-age\s*=\s*\"?(\d+)")
+CACHE_FORMAT_VERSION = 2
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(slots=True)
+class ProxiedImage:
+    """An upstream image together with the validators used to serve and revalidate it.
+
+    Args:
+        content (bytes): The image bytes.
+        content_type (str): The upstream MIME type.
+        etag (str): Strong ETag derived from the content, sent to clients.
+        upstream_etag (str | None): The upstream ETag used for revalidation.
+        expires_at (float): Unix time after which the upstream must be revalidated.
+    """
+
+    content: bytes
+    content_type: str
+    etag: str
+    upstream_etag: str | None
+    expires_at: float
+
+    @property
+    def max_age(self) -> int:
+        """int: Remaining freshness lifetime in seconds."""
+        return max(int(self.expires_at - time.time()), 0)
+
+    def trailer(self) -> bytes:
+        """Serialize everything but the content as the line that follows it in the cache."""
+        header = asdict(self)
+        del header["content"]
+        return b"\n" + json.dumps(header).encode()
+
+    def to_bytes(self) -> bytes:
+        """Serialize the image as its content followed by :meth:`trailer`."""
+        return self.content + self.trailer()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ProxiedImage | None":
+        """Deserialize an image written by :meth:`to_bytes`.
+
+        Args:
+            data (bytes): The serialized entry.
+
+        Returns:
+            ProxiedImage | None: The image, or None if the entry is malformed.
+        """
+        content, sep, header = data.rpartition(b"\n")
+        if not sep:
+            return None
+        try:
+            return cls(content=content, **json.loads(header))
+        except (TypeError, ValueError):
+            return None
+
+
+@dataclass(slots=True)
+class StreamedImage:
+    """An upstream image whose body is sent to the client as it downloads.
+
+    The body is written to the proxy cache on the way through, so no ETag is
+    known until the last chunk has passed.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The image body.
+        content_type (str): The upstream MIME type.
+        max_age (int): Freshness lifetime in seconds.
+    """
+
+    chunks: AsyncIterator[bytes]
+    content_type: str
+    max_age: int
+
+
+def _freshness_lifetime(cache_control: str) -> int | None:
+    """Return the cacheable lifetime in seconds, or None if the response must not be cached."""
+    directives = cache_control.lower()
+    if "no-store" in directives or "private" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+    match = MAX_AGE_RE.search(directives)
+    if match:
+        return int(match.group(1))
+    return settings.image_cache_default_ttl_seconds
+
+
+def _store(key: str, image: ProxiedImage) -> None:
+    if settings.image_cache_enabled:
+        image_cache.put(key, image.to_bytes())
+
+
+def _load(key: str) -> ProxiedImage | None:
+    if not settings.image_cache_enabled:
+        return None
+    data = image_cache.get(key)
+    return ProxiedImage.from_bytes(data) if data is not None else None
+
+
+async def _stream_body(
+    response: requests.Response, key: str | None, image: ProxiedImage
+) -> AsyncGenerator[bytes, None]:
+    chunks = response.iter_content(CHUNK_SIZE)
+    writer = image_cache.open_writer(key) if key is not None else None
+    digest = hashlib.sha256()
+    complete = False
+    try:
+        while (chunk := await http_client.run(next, chunks, None)) is not None:
+            digest.update(chunk)
+            if writer is not None:
+                writer.write(chunk)
+            yield chunk
+        complete = True
+    finally:
+        response.close()
+        if writer is not None:
+            if complete:
+                image.etag = f'"{digest.hexdigest()[:32]}"'
+                writer.write(image.trailer())
+                writer.commit()
+            else:
+                writer.abort()
+
+
+async def fetch_image(image_url: str) -> ProxiedImage | StreamedImage:
+    """Fetch an image through the on-disk proxy cache.
+
+    Fresh cache entries are served without contacting the upstream. Expired
+    entries are revalidated with ``If-None-Match`` when the upstream supplied
+    an ETag, so an unchanged image costs a 304 instead of a full download.
+    Anything else is streamed from the upstream and cached as it passes.
+
+    Args:
+        image_url (str): The validated image URL.
+
+    Returns:
+        ProxiedImage | StreamedImage: The cached image and its validators, or
+        the upstream body when it has to be downloaded.
+
+    Raises:
+        requests.RequestException: If the upstream request fails.
+    """
+    key = DiskCache.make_key(url=image_url, version=CACHE_FORMAT_VERSION)
+    cached = await to_thread.run_sync(_load, key)
+    if cached is not None and cached.expires_at > time.time():
+        return cached
+
+    headers = {}
+    if cached is not None and cached.upstream_etag:
+        headers["If-None-Match"] = cached.upstream_etag
+
+    response = await http_client.aget(image_url, headers=headers, stream=True)
+    lifetime = _freshness_lifetime(response.headers.get("Cache-Control", ""))
+
+    if cached is not None and response.status_code == 304:
+        response.close()
+        cached.expires_at = time.time() + (lifetime or 0)
+        if lifetime is not None:
+            await to_thread.run_sync(_store, key, cached)
+        return cached
+
+    try:
+        response.raise_for_status()
+    except requests.HTTPError:
+        response.close()
+        raise
+
+    content_type = response.headers.get("Content-Type", "application/octet-stream")
+    image = ProxiedImage(
+        content=b"",
+        content_type=content_type,
+        etag="",
+        upstream_etag=response.headers.get("ETag"),
+        expires_at=time.time() + (lifetime or 0),
+    )
+    cacheable = lifetime is not None and settings.image_cache_enabled
+    return StreamedImage(
+        chunks=_stream_body(response, key if cacheable else None, image),
+        content_type=content_type,
+        max_age=lifetime or 0,
+    )
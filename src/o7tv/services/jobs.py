@@ -0,0 +1,443 @@
+import asyncio
+import json
+import logging
+import secrets
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from enum import StrEnum
+from functools import partial
+from typing import Any
+
+from o7tv.config.config import settings
+from o7tv.exceptions.conversion_exceptions import ConversionQueueFullError
+from o7tv.exceptions.ffmpeg_exceptions import O7tvError
+from o7tv.services.cache import conversion_cache, conversion_cache_key, convert_and_cache
+from o7tv.services.conversion import encoder_options, fallback_profiles
+from o7tv.services.metrics import conversion_cache_requests
+from o7tv.services.pool import Priority, conversion_pool
+from o7tv.services.shared_state import SharedEntries, shared_store
+from o7tv.services.singleflight import conversion_flights
+
+logger = logging.getLogger(__name__)
+
+SHARED_POLL_SECONDS = 0.5
+
+
+class JobStatus(StrEnum):
+    """Lifecycle state of a conversion job."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    @property
+    def finished(self) -> bool:
+        """bool: Whether the job reached a final state."""
+        return self in (JobStatus.DONE, JobStatus.FAILED)
+
+
+@dataclass(slots=True)
+class ConversionJob:
+    """A conversion submitted through the job API.
+
+    Args:
+        job_id (str): Opaque identifier handed to the client.
+        emote_url (str): The validated source URL.
+        emote_name (str | None): Emote display name used for the file name.
+        priority (Priority): Scheduling priority on the conversion pool.
+        cache_key (str): Conversion cache key of the result.
+        profile (str): Encoder profile the result is encoded with; may be faster
+            than the configured one when the conversion was downshifted.
+        status (JobStatus): Current state.
+        error (str | None): Failure message once the job failed.
+        size_bytes (int | None): WebM size once the job is done.
+        created_at (float): Submission time as a Unix timestamp.
+        finished_at (float | None): Completion time as a Unix timestamp.
+        result (asyncio.Future[bytes] | None): The conversion, on the worker that runs it.
+        changed (asyncio.Event): Set and replaced whenever the status changes.
+    """
+
+    job_id: str
+    emote_url: str
+    emote_name: str | None
+    priority: Priority
+    cache_key: str
+    profile: str = settings.encoder_profile
+    status: JobStatus = JobStatus.QUEUED
+    error: str | None = None
+    size_bytes: int | None = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    result: "asyncio.Future[bytes] | None" = field(default=None, repr=False, compare=False)
+    changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False, compare=False)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the client-facing view of the job."""
+        return {
+            "id": self.job_id,
+            "status": self.status.value,
+            "priority": self.priority.name.lower(),
+            "emote_name": self.emote_name,
+            "error": self.error,
+            "size_bytes": self.size_bytes,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    def to_bytes(self) -> bytes:
+        """Serialize the job record, without its local future, as JSON."""
+        record = self.to_dict() | {
+            "emote_url": self.emote_url,
+            "cache_key": self.cache_key,
+            "profile": self.profile,
+        }
+        return json.dumps(record, separators=(",", ":")).encode()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ConversionJob":
+        """Deserialize a record produced by :meth:`to_bytes`.
+
+        Raises:
+            ValueError: If the data is not a serialized job.
+        """
+        try:
+            record = json.loads(data)
+            return cls(
+                job_id=record["id"],
+                emote_url=record["emote_url"],
+                emote_name=record["emote_name"],
+                priority=Priority[record["priority"].upper()],
+                cache_key=record["cache_key"],
+                profile=record["profile"],
+                status=JobStatus(record["status"]),
+                error=record["error"],
+                size_bytes=record["size_bytes"],
+                created_at=record["created_at"],
+                finished_at=record["finished_at"],
+            )
+        except (KeyError, TypeError, AttributeError) as exc:
+            raise ValueError(f"Malformed job record: {exc}") from exc
+
+
+def cached_payload(emote_url: str, max_output_bytes: int | None) -> tuple[bytes, str] | None:
+    """Return a cached conversion of an emote and count the cache lookup.
+
+    Output of the configured encoder profile is preferred; entries written by a
+    downshifted conversion are served when it is missing.
+
+    Args:
+        emote_url (str): The source emote URL.
+        max_output_bytes (int | None): The WebM size limit applied to the output.
+
+    Returns:
+        tuple[bytes, str] | None: The cached WebM and the profile it was encoded
+        with, or None on a miss or with the cache disabled.
+    """
+    if not settings.conversion_cache_enabled:
+        return None
+    for profile in fallback_profiles():
+        payload = conversion_cache.get(conversion_cache_key(emote_url, max_output_bytes, profile))
+        if payload is not None:
+            conversion_cache_requests.inc(result="hit")
+            return payload, profile
+    conversion_cache_requests.inc(result="miss")
+    return None
+
+
+def _error_message(exc: BaseException) -> str:
+    if isinstance(exc, O7tvError):
+        return str(exc)
+    if isinstance(exc, asyncio.CancelledError):
+        return "The conversion was cancelled."
+    logger.error(f"Unexpected error during conversion job: {exc}")
+    return "Unexpected error during conversion."
+
+
+class JobStore:
+    """Tracks conversion jobs from submission until their results expire.
+
+    Jobs for the same emote share one conversion through ``conversion_flights``.
+    Finished jobs are kept for ``retention_seconds``; beyond ``max_jobs`` the
+    oldest finished jobs are dropped early. With ``shared`` set, job records are
+    mirrored so any worker process can report a job's status; results are then
+    served from the shared conversion cache.
+    """
+
+    def __init__(
+        self,
+        retention_seconds: float,
+        max_jobs: int,
+        shared: SharedEntries[ConversionJob] | None = None,
+    ) -> None:
+        """Initialize an empty store.
+
+        Args:
+            retention_seconds (float): How long finished jobs stay available.
+            max_jobs (int): Number of jobs kept before finished ones are dropped early.
+            shared (SharedEntries[ConversionJob] | None): Cross-process job records.
+        """
+        self.retention_seconds = retention_seconds
+        self.max_jobs = max(max_jobs, 1)
+        self.shared = shared
+        self._jobs: dict[str, ConversionJob] = {}
+        self._running: set[str] = set()
+        self._profiles: dict[str, str] = {}
+        self._writes: set[asyncio.Task[None]] = set()
+
+    def __len__(self) -> int:
+        """Return the number of jobs tracked by this process."""
+        return len(self._jobs)
+
+    def _publish(self, job: ConversionJob) -> None:
+        job.changed.set()
+        job.changed = asyncio.Event()
+        if self.shared is not None:
+            # Mirrored in the background; the shared store applies writes in order.
+            write = asyncio.create_task(
+                self.shared.aput(job.job_id, job, max_age=self.retention_seconds)
+            )
+            self._writes.add(write)
+            write.add_done_callback(self._writes.discard)
+
+    def _started(self, cache_key: str) -> None:
+        self._running.add(cache_key)
+        for job in self._jobs.values():
+            if job.cache_key == cache_key and job.status is JobStatus.QUEUED:
+                job.status = JobStatus.RUNNING
+                self._publish(job)
+
+    def _finish(self, job: ConversionJob, result: "asyncio.Future[bytes]") -> None:
+        job.finished_at = time.time()
+        if result.cancelled():
+            job.status, job.error = JobStatus.FAILED, _error_message(asyncio.CancelledError())
+        elif (exc := result.exception()) is not None:
+            job.status, job.error = JobStatus.FAILED, _error_message(exc)
+        else:
+            job.status, job.size_bytes = JobStatus.DONE, len(result.result())
+        if job.job_id in self._jobs:
+            self._publish(job)
+
+    def _prune(self) -> None:
+        now = time.time()
+        excess = len(self._jobs) + 1 - self.max_jobs
+        for job in [job for job in self._jobs.values() if job.status.finished]:
+            expired = now - (job.finished_at or now) >= self.retention_seconds
+            if expired or excess > 0:
+                del self._jobs[job.job_id]
+                excess -= 1
+
+    def _convert(
+        self, emote_url: str, max_output_bytes: int | None, cache_key: str, priority: Priority
+    ) -> "asyncio.Future[bytes]":
+        loop = asyncio.get_running_loop()
+
+        def convert() -> bytes:
+            loop.call_soon_threadsafe(self._started, cache_key)
+            return convert_and_cache(emote_url, max_output_bytes, options)
+
+        def forget(_: object) -> None:
+            self._running.discard(cache_key)
+            self._profiles.pop(cache_key, None)
+
+        # Downshift to a faster encoder profile when conversions are queueing up.
+        options = encoder_options(queue_depth=conversion_pool.queue_depth)
+        future = conversion_pool.submit(convert, priority=priority)
+        self._profiles[cache_key] = options.profile
+        future.add_done_callback(forget)
+        return future
+
+    def submit(
+        self,
+        emote_url: str,
+        emote_name: str | None = None,
+        priority: Priority = Priority.INTERACTIVE,
+        track: bool = True,
+    ) -> ConversionJob:
+        """Start converting an emote and return its job without waiting.
+
+        Cached conversions finish immediately; an emote already being converted
+        joins the running conversion, raising its priority if it is still queued
+        at a lower one. Otherwise the conversion is queued on the pool, so a full
+        queue is reported before the job is acknowledged.
+
+        Args:
+            emote_url (str): The validated source URL.
+            emote_name (str | None): Emote display name used for the file name.
+            priority (Priority): Scheduling priority on the conversion pool.
+            track (bool): Whether the job can be looked up by id. Untracked jobs
+                back the synchronous endpoints, which await them directly.
+
+        Returns:
+            ConversionJob: The submitted job.
+
+        Raises:
+            ConversionQueueFullError: If all workers are busy and the queue is full.
+        """
+        max_output_bytes = settings.max_webm_size_bytes
+        cache_key = conversion_cache_key(emote_url, max_output_bytes)
+        cached = cached_payload(emote_url, max_output_bytes)
+        if cached is not None:
+            result: asyncio.Future[bytes] = asyncio.get_running_loop().create_future()
+            result.set_result(cached[0])
+            profile: str = cached[1]
+        else:
+            result = conversion_flights.start(
+                cache_key,
+                lambda: self._convert(emote_url, max_output_bytes, cache_key, priority),
+            )
+            # A more urgent caller joining a queued conversion moves it up the queue.
+            conversion_pool.promote(result, priority)
+            profile = self._profiles.get(cache_key, settings.encoder_profile)
+
+        job = ConversionJob(
+            job_id=secrets.token_urlsafe(16),
+            emote_url=emote_url,
+            emote_name=emote_name,
+            priority=priority,
+            cache_key=cache_key,
+            profile=profile,
+            result=result,
+        )
+        if cache_key in self._running:
+            job.status = JobStatus.RUNNING
+        if track:
+            self._prune()
+            self._jobs[job.job_id] = job
+        if result.done():
+            self._finish(job, result)
+        else:
+            if track:
+                self._publish(job)
+            result.add_done_callback(partial(self._finish, job))
+        return job
+
+    async def submit_when_ready(
+        self,
+        emote_url: str,
+        emote_name: str | None = None,
+        priority: Priority = Priority.BULK,
+    ) -> ConversionJob:
+        """Submit an untracked job, waiting for queue capacity instead of failing.
+
+        Bulk work uses this so a busy pool delays it rather than rejecting it.
+
+        Args:
+            emote_url (str): The validated source URL.
+            emote_name (str | None): Emote display name used for the file name.
+            priority (Priority): Scheduling priority on the conversion pool.
+
+        Returns:
+            ConversionJob: The submitted job.
+        """
+        while True:
+            try:
+                return self.submit(emote_url, emote_name, priority, track=False)
+            except ConversionQueueFullError:
+                await conversion_pool.wait_for_capacity()
+
+    async def get(self, job_id: str) -> ConversionJob | None:
+        """Return a job by id, from this process or the shared records.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            ConversionJob | None: The job, or None if it is unknown or expired.
+        """
+        job = self._jobs.get(job_id)
+        if job is None and self.shared is not None:
+            entry = await self.shared.aget(job_id)
+            if entry is not None and entry[0] < self.retention_seconds:
+                job = entry[1]
+        return job
+
+    async def wait(self, job: ConversionJob) -> bytes:
+        """Await a job started in this process.
+
+        Cancelling the caller does not cancel the conversion.
+
+        Args:
+            job (ConversionJob): A job returned by :meth:`submit`.
+
+        Returns:
+            bytes: The WebM payload.
+
+        Raises:
+            O7tvError: If the conversion failed.
+            ValueError: If the job was loaded from another process's record.
+        """
+        if job.result is None:
+            raise ValueError(f"Job {job.job_id} runs in another process")
+        return await asyncio.shield(job.result)
+
+    def payload(self, job: ConversionJob) -> bytes | None:
+        """Return the WebM of a finished job.
+
+        Args:
+            job (ConversionJob): A job with status ``done``.
+
+        Returns:
+            bytes | None: The payload, or None if it is no longer available.
+        """
+        result = job.result
+        if result is not None and result.done() and not result.cancelled():
+            if result.exception() is None:
+                return result.result()
+        if settings.conversion_cache_enabled:
+            max_output_bytes = settings.max_webm_size_bytes
+            return conversion_cache.get(
+                conversion_cache_key(job.emote_url, max_output_bytes, job.profile)
+            )
+        return None
+
+    async def watch(self, job_id: str, keepalive: float) -> AsyncIterator[ConversionJob | None]:
+        """Follow a job's status changes until it finishes.
+
+        Jobs of this process are followed through their change events; jobs of
+        other processes are polled from the shared records.
+
+        Args:
+            job_id (str): The job id.
+            keepalive (float): Seconds without a change after which None is yielded.
+
+        Yields:
+            ConversionJob | None: The job on every status change, starting with
+            its current status, or None after ``keepalive`` idle seconds.
+        """
+        last: JobStatus | None = None
+        idle = 0.0
+        while (job := await self.get(job_id)) is not None:
+            if job.status != last:
+                last, idle = job.status, 0.0
+                yield job
+                if last.finished:
+                    return
+                continue
+            if idle >= keepalive:
+                idle = 0.0
+                yield None
+            start = time.monotonic()
+            if job.result is not None:
+                try:
+                    await asyncio.wait_for(job.changed.wait(), timeout=keepalive - idle)
+                except TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(min(SHARED_POLL_SECONDS, keepalive - idle))
+            idle += time.monotonic() - start
+
+
+job_store = JobStore(
+    retention_seconds=settings.job_retention_seconds,
+    max_jobs=settings.job_max_jobs,
+    shared=None
+    if shared_store is None
+    else SharedEntries(
+        shared_store,
+        "jobs",
+        dumps=ConversionJob.to_bytes,
+        loads=ConversionJob.from_bytes,
+    ),
+)
@@ -0,0 +1,354 @@
+import abc
+import math
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+LabelValues = tuple[str, ...]
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_request_timings: ContextVar[list[tuple[str, float]] | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric(abc.ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, object]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+    @abc.abstractmethod
+    def samples(self) -> list[str]:
+        """Render the metric samples in Prometheus text format."""
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        """Initialize the counter. See :class:`MetricsRegistry` for arguments."""
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        """Increment the counter for the given label values.
+
+        Args:
+            amount (float): Amount to add.
+            **labels (object): Label values keyed by label name.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> list[str]:
+        """Render the counter samples in Prometheus text format."""
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed bucket bounds."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DURATION_BUCKETS,
+    ) -> None:
+        """Initialize the histogram. See :class:`MetricsRegistry` for arguments."""
+        super().__init__(name, documentation, labelnames)
+        self.buckets = (*sorted(buckets), math.inf)
+        self._values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        """Record an observation for the given label values.
+
+        Args:
+            value (float): The observed value.
+            **labels (object): Label values keyed by label name.
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            total[0] += value
+
+    def snapshot(self, **labels: object) -> tuple[int, float]:
+        """Return the observation count and sum for the given label values.
+
+        Args:
+            **labels (object): Label values keyed by label name.
+
+        Returns:
+            tuple[int, float]: ``(count, sum)`` of the recorded observations.
+        """
+        with self._lock:
+            counts, total = self._values.get(self._key(labels), ([0], [0.0]))
+            return counts[-1], total[0]
+
+    def samples(self) -> list[str]:
+        """Render the histogram samples in Prometheus text format."""
+        lines = []
+        with self._lock:
+            items = sorted(
+                (key, (list(counts), total[0])) for key, (counts, total) in self._values.items()
+            )
+        for key, (counts, total) in items:
+            for bound, count in zip(self.buckets, counts, strict=True):
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Gauge whose value is read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]) -> None:
+        """Initialize the gauge. See :class:`MetricsRegistry` for arguments."""
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def samples(self) -> list[str]:
+        """Render the gauge sample in Prometheus text format."""
+        return [f"{self.name} {_format_value(self.callback())}"]
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together for the ``/metrics`` endpoint."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register[M: _Metric](self, metric: M) -> M:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        """Create and register a counter.
+
+        Args:
+            name (str): Metric name without the ``_total`` suffix.
+            documentation (str): Help text.
+            labelnames (tuple[str, ...]): Label names.
+
+        Returns:
+            Counter: The registered counter.
+        """
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DURATION_BUCKETS,
+    ) -> Histogram:
+        """Create and register a histogram.
+
+        Args:
+            name (str): Metric name.
+            documentation (str): Help text.
+            labelnames (tuple[str, ...]): Label names.
+            buckets (tuple[float, ...]): Upper bounds of the buckets.
+
+        Returns:
+            Histogram: The registered histogram.
+        """
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, callback: Callable[[], float]) -> Gauge:
+        """Create and register a callback gauge.
+
+        Args:
+            name (str): Metric name.
+            documentation (str): Help text.
+            callback (Callable[[], float]): Returns the current value.
+
+        Returns:
+            Gauge: The registered gauge.
+        """
+        return self._register(Gauge(name, documentation, callback))
+
+    def render(self) -> str:
+        """Render every registered metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition payload.
+        """
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def collect_request_timings() -> Iterator[list[tuple[str, float]]]:
+    """Collect stage timings recorded while handling the current request.
+
+    Yields:
+        list[tuple[str, float]]: ``(stage, seconds)`` pairs in recording order.
+    """
+    timings: list[tuple[str, float]] = []
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def record_timing(stage: str, seconds: float) -> None:
+    """Attach a stage timing to the current request, if one is being collected.
+
+    Args:
+        stage (str): Stage name used in the ``Server-Timing`` header.
+        seconds (float): Stage duration in seconds.
+    """
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage: str, histogram: Histogram, **labels: object) -> Iterator[None]:
+    """Time a block, observing it in a histogram and the current request timings.
+
+    Args:
+        stage (str): Stage name used in the ``Server-Timing`` header.
+        histogram (Histogram): Histogram receiving the duration.
+        **labels (object): Label values for the histogram.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed, **labels)
+        record_timing(stage, elapsed)
+
+
+def server_timing_header(timings: list[tuple[str, float]]) -> str:
+    """Format stage timings as a ``Server-Timing`` header value.
+
+    Repeated stages (for example several encode attempts) are summed.
+
+    Args:
+        timings (list[tuple[str, float]]): ``(stage, seconds)`` pairs.
+
+    Returns:
+        str: The header value.
+    """
+    totals: dict[str, float] = {}
+    for stage, seconds in timings:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items())
+
+
+registry = MetricsRegistry()
+
+conversion_seconds = registry.histogram(
+    "o7tv_conversion_duration_seconds",
+    "Wall time of a conversion including source download and all encodes.",
+    ("outcome",),
+)
+conversion_encodes = registry.histogram(
+    "o7tv_conversion_encodes",
+    "Number of ffmpeg encodes needed per conversion.",
+    buckets=(1, 2, 3, 4, 5),
+)
+conversion_errors = registry.counter(
+    "o7tv_conversion_errors",
+    "Failed conversions by error class.",
+    ("error",),
+)
+conversion_cache_requests = registry.counter(
+    "o7tv_conversion_cache_requests",
+    "Conversion cache lookups by result.",
+    ("result",),
+)
+source_fetch_seconds = registry.histogram(
+    "o7tv_source_fetch_duration_seconds",
+    "Time spent downloading conversion sources.",
+)
+source_probe_seconds = registry.histogram(
+    "o7tv_source_probe_duration_seconds",
+    "Time spent probing conversion sources with ffprobe.",
+)
+ffmpeg_wall_seconds = registry.histogram(
+    "o7tv_ffmpeg_wall_seconds",
+    "Wall time of individual ffmpeg encodes.",
+)
+ffmpeg_cpu_seconds = registry.histogram(
+    "o7tv_ffmpeg_cpu_seconds",
+    "User plus system CPU time of individual ffmpeg encodes.",
+)
+ffmpeg_slot_wait_seconds = registry.histogram(
+    "o7tv_ffmpeg_slot_wait_seconds",
+    "Time encodes waited for a slot under APP__FFMPEG_MAX_PROCESSES.",
+)
+output_size_ratio = registry.histogram(
+    "o7tv_output_size_ratio",
+    "Converted output size as a fraction of APP__MAX_WEBM_SIZE_BYTES.",
+    buckets=(0.25, 0.5, 0.75, 0.9, 0.95, 1.0),
+)
+output_bytes = registry.histogram(
+    "o7tv_output_bytes",
+    "Converted output size in bytes.",
+    buckets=(16_384, 65_536, 131_072, 262_144, 524_288, 1_048_576, 4_194_304),
+)
+seventv_request_seconds = registry.histogram(
+    "o7tv_seventv_request_duration_seconds",
+    "Latency of upstream 7TV API requests.",
+    ("operation",),
+)
@@ -0,0 +1,320 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import queue
+import threading
+from collections.abc import AsyncIterator, Callable, Generator
+from concurrent.futures import Future
+from contextlib import closing
+from enum import IntEnum
+from functools import partial
+from typing import Any
+
+from o7tv.config.config import settings
+from o7tv.exceptions.conversion_exceptions import ConversionQueueFullError
+from o7tv.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Scheduling priority of pool work; lower values run first."""
+
+    INTERACTIVE = 0
+    BULK = 1
+    BACKGROUND = 2
+
+
+type _WorkItem = tuple[Future[Any], Callable[[], Any]] | None
+
+
+def _wake(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class ConversionPool:
+    """Bounded executor that runs blocking conversions off the event loop.
+
+    At most ``max_workers`` conversions run at once and at most ``max_queue``
+    more wait for a free worker. Submissions beyond that are rejected instead of
+    piling up ffmpeg processes. Waiting work is started in :class:`Priority`
+    order, first come first served within a priority, so interactive requests
+    overtake queued batch and pre-warm conversions.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int) -> None:
+        """Initialize the pool.
+
+        Args:
+            max_workers (int): Number of conversions allowed to run concurrently.
+            max_queue (int): Number of conversions allowed to wait for a worker.
+        """
+        self.max_workers = max(max_workers, 1)
+        self.max_queue = max(max_queue, 0)
+        self._queue: queue.PriorityQueue[tuple[int, int, _WorkItem]] = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._closed = False
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future[None]]] = []
+        self._submitted: dict[asyncio.Future[Any], Future[Any]] = {}
+
+    @property
+    def pending(self) -> int:
+        """int: Number of conversions currently running or waiting."""
+        return self._pending
+
+    @property
+    def queue_depth(self) -> int:
+        """int: Number of conversions waiting for a free worker."""
+        return max(self._pending - self.max_workers, 0)
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            waiters, self._waiters = self._waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+    def _work(self) -> None:
+        while True:
+            _, _, item = self._queue.get()
+            if item is None:
+                return
+            future, call = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = call()
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    def _enqueue[T](
+        self, func: Callable[..., T], args: tuple[object, ...], priority: Priority
+    ) -> Future[T]:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The conversion pool is shut down")
+            if self._pending >= self.max_workers + self.max_queue:
+                raise ConversionQueueFullError("The conversion queue is full. Try again later.")
+            self._pending += 1
+            if len(self._threads) < min(self._pending, self.max_workers):
+                thread = threading.Thread(
+                    target=self._work,
+                    name=f"o7tv-convert_{len(self._threads)}",
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+        future: Future[T] = Future()
+        future.add_done_callback(self._release)
+        # Run in a copy of the caller's context so request-scoped timings propagate.
+        call = partial(contextvars.copy_context().run, func, *args)
+        self._queue.put((priority, next(self._sequence), (future, call)))
+        return future
+
+    def _withdraw(self, future: Future) -> None:
+        # Drop work that has not started yet and take it out of the queue.
+        if not future.cancel():
+            return
+        with self._queue.mutex:
+            entries = self._queue.queue
+            entries[:] = [
+                entry for entry in entries if entry[2] is None or entry[2][0] is not future
+            ]
+            heapq.heapify(entries)
+
+    def promote(self, work: "asyncio.Future[Any]", priority: Priority) -> bool:
+        """Move submitted work that is still waiting up to a higher priority.
+
+        The work keeps its place among work submitted earlier at the new priority.
+
+        Args:
+            work (asyncio.Future[Any]): A future returned by :meth:`submit`.
+            priority (Priority): The new priority.
+
+        Returns:
+            bool: Whether the work was waiting at a lower priority and was moved.
+        """
+        future = self._submitted.get(work)
+        if future is None:
+            return False
+        with self._queue.mutex:
+            entries = self._queue.queue
+            for index, (current, sequence, item) in enumerate(entries):
+                if item is not None and item[0] is future:
+                    if priority >= current:
+                        return False
+                    entries[index] = (priority, sequence, item)
+                    heapq.heapify(entries)
+                    return True
+        return False
+
+    def submit[T](
+        self, func: Callable[..., T], *args: object, priority: Priority = Priority.INTERACTIVE
+    ) -> "asyncio.Future[T]":
+        """Queue a blocking callable without waiting for it.
+
+        Admission is decided immediately, so callers can reject a request before
+        acknowledging it.
+
+        Args:
+            func (Callable[..., T]): The blocking callable to run.
+            *args (object): Positional arguments for the callable.
+            priority (Priority): Where the work is queued relative to other work.
+
+        Returns:
+            asyncio.Future[T]: Resolves with the callable's return value.
+
+        Raises:
+            ConversionQueueFullError: If all workers are busy and the queue is full.
+        """
+        future = self._enqueue(func, args, priority)
+        work = asyncio.wrap_future(future)
+        self._submitted[work] = future
+        work.add_done_callback(self._submitted.pop)
+        return work
+
+    async def wait_for_capacity(self) -> None:
+        """Wait until the pool has room for another submission.
+
+        Returns immediately when a worker or queue slot is free. Other callers may
+        take the slot first, so retry :meth:`submit` until it is accepted.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._closed or self._pending < self.max_workers + self.max_queue:
+                return
+            waiter: asyncio.Future[None] = loop.create_future()
+            self._waiters.append((loop, waiter))
+        await waiter
+
+    async def run[T](
+        self, func: Callable[..., T], *args: object, priority: Priority = Priority.INTERACTIVE
+    ) -> T:
+        """Run a blocking callable on the pool and await its result.
+
+        The slot is held until the callable finishes, even if the awaiting
+        request is cancelled, so the limit always reflects running work. Work
+        that has not started yet is dropped when its caller is cancelled.
+
+        Args:
+            func (Callable[..., T]): The blocking callable to run.
+            *args (object): Positional arguments for the callable.
+            priority (Priority): Where the work is queued relative to other work.
+
+        Returns:
+            T: The callable's return value.
+
+        Raises:
+            ConversionQueueFullError: If all workers are busy and the queue is full.
+        """
+        return await self.submit(func, *args, priority=priority)
+
+    async def stream[T](
+        self,
+        factory: Callable[..., Generator[T, None, None]],
+        *args: object,
+        max_buffered: int = 8,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> AsyncIterator[T]:
+        """Consume a blocking iterator on the pool and yield its items asynchronously.
+
+        The iterator is created, advanced and closed on a single worker, which
+        holds its slot for the whole iteration. At most ``max_buffered`` items
+        wait for the consumer; when the consumer stops early (for example on a
+        client disconnect) the worker closes the iterator, or the work is taken
+        off the queue if it has not started yet.
+
+        Args:
+            factory (Callable[..., Generator[T, None, None]]): Creates the blocking iterator.
+            *args (object): Positional arguments for the factory.
+            max_buffered (int): Maximum number of items handed off but not yet consumed.
+            priority (Priority): Where the work is queued relative to other work.
+
+        Yields:
+            T: The iterator's items.
+
+        Raises:
+            ConversionQueueFullError: If all workers are busy and the queue is full.
+        """
+        loop = asyncio.get_running_loop()
+        buffer: asyncio.Queue[T] = asyncio.Queue(max(max_buffered, 1))
+        stop = threading.Event()
+
+        def hand_off(item: T) -> bool:
+            put = asyncio.run_coroutine_threadsafe(buffer.put(item), loop)
+            while not stop.is_set():
+                try:
+                    put.result(timeout=0.25)
+                    return True
+                except TimeoutError:
+                    continue
+            put.cancel()
+            return False
+
+        def pump() -> None:
+            with closing(factory(*args)) as iterator:
+                for item in iterator:
+                    if not hand_off(item):
+                        return
+
+        future = self._enqueue(pump, (), priority)
+        job = asyncio.wrap_future(future)
+        try:
+            while True:
+                getter = asyncio.ensure_future(buffer.get())
+                waiters: set[asyncio.Future[Any]] = {getter, job}
+                await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                    continue
+                getter.cancel()
+                while not buffer.empty():
+                    yield buffer.get_nowait()
+                job.result()
+                return
+        finally:
+            stop.set()
+            self._withdraw(future)
+
+    def shutdown(self) -> None:
+        """Stop accepting work, drop queued work and wait for running conversions."""
+        with self._lock:
+            self._closed = True
+            threads = list(self._threads)
+        while True:
+            try:
+                _, _, item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[0].cancel()
+        for _ in threads:
+            self._queue.put((len(Priority), next(self._sequence), None))
+        for thread in threads:
+            thread.join()
+
+
+conversion_pool = ConversionPool(
+    max_workers=settings.conversion_workers,
+    max_queue=settings.conversion_queue_size,
+)
+
+registry.gauge(
+    "o7tv_conversion_pool_pending",
+    "Conversions running or waiting for a worker.",
+    lambda: conversion_pool.pending,
+)
+registry.gauge(
+    "o7tv_conversion_pool_queue_depth",
+    "Conversions waiting for a free worker.",
+    lambda: conversion_pool.queue_depth,
+)
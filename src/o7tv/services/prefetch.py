@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+import requests
+
+from o7tv.config.config import settings
+from o7tv.services.seventv import (
+    DEFAULT_PER_PAGE,
+    DEFAULT_SORT_BY,
+    DEFAULT_SORT_ORDER,
+    search_cache,
+    search_cache_key,
+    search_emotes,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """Runs bounded, best-effort background loads keyed by cache key.
+
+    A load is skipped when one for the same key is already running or when
+    ``max_concurrent`` loads are in flight; it is never queued. Loads still
+    running after ``timeout`` seconds are cancelled.
+    """
+
+    def __init__(self, max_concurrent: int, timeout: float) -> None:
+        """Initialize the prefetcher.
+
+        Args:
+            max_concurrent (int): Maximum number of loads in flight.
+            timeout (float): Seconds after which a pending load is cancelled.
+        """
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def __contains__(self, key: str) -> bool:
+        """Return whether a load for a key is in flight."""
+        return key in self._tasks
+
+    async def _run(self, key: str, load: Callable[[], Awaitable[object]]) -> None:
+        try:
+            await asyncio.wait_for(load(), timeout=self.timeout)
+        except TimeoutError:
+            logger.debug(f"Prefetch of {key} cancelled after {self.timeout}s")
+        except (ValueError, requests.RequestException) as exc:
+            logger.debug(f"Prefetch of {key} failed: {exc}")
+
+    def schedule(self, key: str, load: Callable[[], Awaitable[object]]) -> bool:
+        """Start a background load unless it is redundant or the limit is reached.
+
+        Args:
+            key (str): Identifies the load.
+            load (Callable[[], Awaitable[object]]): Factory for the awaitable doing the load.
+
+        Returns:
+            bool: Whether the load was started.
+        """
+        if key in self._tasks or len(self._tasks) >= self.max_concurrent:
+            return False
+        task = asyncio.create_task(self._run(key, load))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return True
+
+    async def cancel_all(self) -> None:
+        """Cancel every load in flight and wait for them to finish."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+search_prefetcher = Prefetcher(
+    max_concurrent=settings.search_prefetch_max_concurrent,
+    timeout=settings.search_prefetch_idle_seconds,
+)
+
+
+def prefetch_search_page(query: str, page: int) -> bool:
+    """Load a search results page into the search cache in the background.
+
+    Prefetching runs one page ahead of the last page a client asked for, so it
+    stops as soon as the user stops scrolling.
+
+    Args:
+        query (str): The emote name query.
+        page (int): The page to prefetch.
+
+    Returns:
+        bool: Whether a prefetch was started.
+    """
+    if not (settings.search_prefetch_enabled and settings.search_cache_enabled):
+        return False
+    key = search_cache_key(query, page, DEFAULT_PER_PAGE, DEFAULT_SORT_BY, DEFAULT_SORT_ORDER)
+    if search_cache.peek(key) is not None:
+        return False
+    return search_prefetcher.schedule(key, lambda: search_emotes(query, page=page))
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from contextlib import nullcontext
+from functools import partial
+from typing import BinaryIO
+
+import requests
+
+from o7tv.config.config import settings
+from o7tv.exceptions.conversion_exceptions import ConversionQueueFullError
+from o7tv.exceptions.ffmpeg_exceptions import O7tvError
+from o7tv.services.cache import cached_profile, conversion_cache_key, convert_and_cache
+from o7tv.services.conversion import encoder_options
+from o7tv.services.pool import Priority, conversion_pool
+from o7tv.services.seventv import search_emotes
+from o7tv.services.shared_state import SHARED_STATE_DIR, try_lock_file
+from o7tv.services.singleflight import conversion_flights
+
+logger = logging.getLogger(__name__)
+
+PREWARM_SORTS = ("TRENDING_DAILY", "TOP_ALL_TIME")
+
+
+async def _trending_urls() -> list[str]:
+    urls: list[str] = []
+    for sort in PREWARM_SORTS:
+        try:
+            results = await search_emotes(
+                None, per_page=settings.prewarm_top_n, sort_by=sort, with_counts=False
+            )
+        except (ValueError, requests.RequestException) as exc:
+            logger.warning(f"Unable to load {sort} emotes for pre-warming: {exc}")
+            continue
+        for item in results.items:
+            if item.is_animated and item.image is not None and item.image.url not in urls:
+                urls.append(item.image.url)
+    return urls
+
+
+async def prewarm_once() -> int:
+    """Convert trending animated emotes that are not cached yet.
+
+    Conversions run one at a time at reduced CPU priority and only while the
+    conversion pool is otherwise idle; the cycle stops as soon as user
+    conversions are pending or ``APP__PREWARM_MAX_PER_CYCLE`` is reached.
+
+    Returns:
+        int: Number of emotes converted in this cycle.
+    """
+    max_output_bytes = settings.max_webm_size_bytes
+    converted = 0
+    for url in await _trending_urls():
+        if converted >= settings.prewarm_max_per_cycle:
+            break
+        cache_key = conversion_cache_key(url, max_output_bytes)
+        if cache_key in conversion_flights or cached_profile(url, max_output_bytes) is not None:
+            continue
+        if conversion_pool.pending:
+            logger.debug("Conversion pool busy; deferring pre-warming")
+            break
+        try:
+            await conversion_flights.do(
+                cache_key,
+                partial(
+                    conversion_pool.run,
+                    convert_and_cache,
+                    url,
+                    max_output_bytes,
+                    encoder_options(nice=settings.prewarm_nice),
+                    priority=Priority.BACKGROUND,
+                ),
+            )
+        except ConversionQueueFullError:
+            break
+        except O7tvError as exc:
+            logger.warning(f"Pre-warming failed for {url}: {exc}")
+            continue
+        converted += 1
+    return converted
+
+
+async def _wait_for_leadership() -> BinaryIO:
+    while (leader := try_lock_file(SHARED_STATE_DIR / "prewarm.lock")) is None:
+        await asyncio.sleep(settings.prewarm_interval_seconds)
+    return leader
+
+
+async def run_prewarm_loop() -> None:
+    """Pre-warm trending conversions every ``APP__PREWARM_INTERVAL_SECONDS``.
+
+    With shared state enabled, only the worker holding the pre-warming lock runs
+    the loop; the others wait to take over if it exits.
+    """
+    leader = await _wait_for_leadership() if settings.shared_state_enabled else None
+    with leader or nullcontext():
+        while True:
+            try:
+                converted = await prewarm_once()
+                logger.info(f"Pre-warmed {converted} trending conversions")
+            except Exception as exc:
+                logger.error(f"Unexpected error while pre-warming conversions: {exc}")
+            await asyncio.sleep(settings.prewarm_interval_seconds)
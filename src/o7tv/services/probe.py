@@ -0,0 +1,98 @@
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+import ffmpeg
+
+logger = logging.getLogger(__name__)
+
+ALPHA_PIX_FMTS = ("yuva", "rgba", "bgra", "argb", "abgr", "pal8", "ya")
+
+
+@dataclass(frozen=True, slots=True)
+class SourceProbe:
+    """Stream properties of a conversion source, as reported by ffprobe.
+
+    Args:
+        format_name (str): Container format names, e.g. ``matroska,webm``.
+        codec (str): Video codec name.
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+        duration (float): Duration in seconds, 0 when unknown.
+        frame_rate (float): Average frames per second, 0 when unknown.
+        frame_count (int): Number of frames, estimated from duration when not reported.
+        has_alpha (bool): Whether the pixel format carries transparency.
+        size_bytes (int): Source file size in bytes.
+    """
+
+    format_name: str
+    codec: str
+    width: int
+    height: int
+    duration: float
+    frame_rate: float
+    frame_count: int
+    has_alpha: bool
+    size_bytes: int
+
+
+def _parse_rate(rate: str | None) -> float:
+    if not rate:
+        return 0.0
+    numerator, _, denominator = rate.partition("/")
+    try:
+        value = float(numerator) / float(denominator or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+    return value
+
+
+def _parse_float(value: object) -> float:
+    try:
+        return float(str(value))
+    except ValueError:
+        return 0.0
+
+
+def probe_source(path: str) -> SourceProbe | None:
+    """Inspect a local media file with ffprobe.
+
+    Args:
+        path (str): Path to the local source file.
+
+    Returns:
+        SourceProbe | None: The probed properties, or None if ffprobe failed or
+        the file has no video stream.
+    """
+    try:
+        info = ffmpeg.probe(path, select_streams="v:0")
+    except (ffmpeg.Error, OSError) as exc:
+        logger.warning(f"Unable to probe {path}: {exc}")
+        return None
+
+    streams = info.get("streams") or []
+    if not streams:
+        return None
+    stream = streams[0]
+    fmt = info.get("format", {})
+
+    duration = _parse_float(stream.get("duration") or fmt.get("duration") or 0)
+    frame_rate = _parse_rate(stream.get("avg_frame_rate")) or _parse_rate(
+        stream.get("r_frame_rate")
+    )
+    frame_count = int(_parse_float(stream.get("nb_frames") or 0)) or round(duration * frame_rate)
+    pix_fmt = stream.get("pix_fmt") or ""
+    # libvpx decoders report yuv420p for VP9 with alpha; the tag marks the alpha plane.
+    alpha_tag = str(stream.get("tags", {}).get("alpha_mode", "")) == "1"
+
+    return SourceProbe(
+        format_name=fmt.get("format_name", ""),
+        codec=stream.get("codec_name", ""),
+        width=int(stream.get("width") or 0),
+        height=int(stream.get("height") or 0),
+        duration=duration,
+        frame_rate=frame_rate,
+        frame_count=frame_count,
+        has_alpha=alpha_tag or pix_fmt.startswith(ALPHA_PIX_FMTS),
+        size_bytes=int(_parse_float(fmt.get("size") or 0)) or Path(path).stat().st_size,
+    )
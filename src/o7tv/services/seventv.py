@@ -1,155 +1,317 @@
-import requests
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any
 
 from o7tv.config.config import settings
+from o7tv.services.conversion import MAX_SIDE
+from o7tv.services.metrics import seventv_request_seconds, timed
+from o7tv.services.shared_state import SharedEntries, shared_store
+from o7tv.services.ttl_cache import TtlCache
+from o7tv.utils.http_client import http_client
 
 from ..models.emotes import EmoteImage, EmoteResult, EmoteSearchResponse
 
+DEFAULT_PER_PAGE = 72
+DEFAULT_SORT_BY = "TOP_ALL_TIME"
+DEFAULT_SORT_ORDER = "DESCENDING"
+# Apollo-style automatic persisted query errors, by message and extension code.
+PERSISTED_QUERY_ERRORS = {
+    "PersistedQueryNotFound": "PERSISTED_QUERY_NOT_FOUND",
+    "PersistedQueryNotSupported": "PERSISTED_QUERY_NOT_SUPPORTED",
+}
+SEARCH_QUERY_TEMPLATE = """
+query EmoteSearch(
+  $query: String,
+  $page: Int,
+  $perPage: Int!,
+  $sort: Sort!,
+  $tags: [String!]!
+) {
+  emotes {
+    search(
+      query: $query
+      page: $page
+      perPage: $perPage
+      sort: $sort
+      tags: { tags: $tags, match: ANY }
+      filters: {}
+    ) {
+      items {
+        id
+        defaultName
+        images {
+          url
+          mime
+          width
+          height
+          frameCount
+          scale
+        }
+      }
+      %s
+    }
+  }
+}
+"""
+
+
+@dataclass(slots=True)
+class GraphQLQuery:
+    """A GraphQL document, minified, with its hash for persisted queries.
+
+    Args:
+        document (str): The GraphQL document; whitespace runs are collapsed.
+        persisted (bool): Whether to send the query by hash. Cleared when the
+            server reports that persisted queries are not supported.
+    """
+
+    document: str
+    persisted: bool = False
+    sha256: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        """Minify the document and compute its hash."""
+        self.document = " ".join(self.document.split())
+        self.sha256 = hashlib.sha256(self.document.encode()).hexdigest()
+
+
+SEARCH_QUERY = GraphQLQuery(
+    SEARCH_QUERY_TEMPLATE % "totalCount pageCount",
+    persisted=settings.seventv_persisted_queries,
+)
+# Views that do not paginate skip the counts, which 7TV has to compute separately.
+SEARCH_ITEMS_QUERY = GraphQLQuery(
+    SEARCH_QUERY_TEMPLATE % "", persisted=settings.seventv_persisted_queries
+)
+
+search_cache: TtlCache[EmoteSearchResponse] = TtlCache(
+    ttl=settings.search_cache_ttl_seconds,
+    stale_ttl=settings.search_cache_stale_seconds,
+    max_entries=settings.search_cache_max_entries,
+    shared=None
+    if shared_store is None
+    else SharedEntries(
+        shared_store,
+        "search",
+        dumps=EmoteSearchResponse.to_bytes,
+        loads=EmoteSearchResponse.from_bytes,
+    ),
+)
+
 
-def _select_best_image(images: list[EmoteImage]) -> EmoteImage | None:
-    """Selects the best image for conversion.
+def _conversion_rank(image: dict[str, Any]) -> tuple[bool, bool, bool, tuple[int, ...]]:
+    """Rank a raw image variant as a conversion source; higher is better.
+
+    Animated variants beat static ones and GIFs beat other formats. Within that,
+    anything larger than the conversion box is decoded only to be scaled down, so
+    the smallest variant that still fills the box wins, otherwise the largest.
 
     Args:
-        images (list[EmoteImage]): Available emote images.
+        image (dict[str, Any]): An image variant from the 7TV response.
 
     Returns:
-        EmoteImage | None: The selected image or None if none available.
+        tuple[bool, bool, bool, tuple[int, ...]]: The comparable rank.
     """
-    if not images:
+    width, height, scale = image["width"], image["height"], image.get("scale") or 0
+    filling = max(width, height) >= MAX_SIDE
+    size = (-(width * height), -scale) if filling else (scale, width, height)
+    return image.get("frameCount", 1) > 1, image["mime"] == "image/gif", filling, size
+
+
+def _to_image(image: dict[str, Any] | None) -> EmoteImage | None:
+    if image is None:
         return None
+    return EmoteImage(
+        url=image["url"],
+        mime=image["mime"],
+        width=image["width"],
+        height=image["height"],
+        frame_count=image.get("frameCount", 1),
+        scale=image.get("scale"),
+    )
 
-    animated = [img for img in images if img.frame_count > 1]
-    candidates = animated or images
-    gif_candidates = [img for img in candidates if img.mime == "image/gif"]
-    if gif_candidates:
-        return max(gif_candidates, key=lambda img: (img.scale or 0, img.width, img.height))
-    return max(candidates, key=lambda img: (img.width, img.height))
 
+def _parse_emote(item: dict[str, Any]) -> EmoteResult:
+    """Build a search result, selecting its images in a single pass.
 
-def _select_png_x4(images: list[EmoteImage]) -> EmoteImage | None:
-    """Select the x4 PNG image when available.
+    The preview is the best-ranked conversion source (see ``_conversion_rank``);
+    the static image is the x4 PNG, or the widest PNG when there is no x4 variant.
 
     Args:
-        images (list[EmoteImage]): Available emote images.
+        item (dict[str, Any]): An emote from the 7TV search response.
 
     Returns:
-        EmoteImage | None: The selected png image.
+        EmoteResult: The parsed result.
     """
-    pngs = [img for img in images if img.mime == "image/png"]
-    if not pngs:
-        return None
-
-    for img in pngs:
-        if img.scale == 4:
-            return img
+    best = png = None
+    best_rank: tuple[bool, bool, bool, tuple[int, ...]] | None = None
+    png_rank: tuple[bool, int] | None = None
+    is_animated = False
+    for image in item.get("images", []):
+        if "url" not in image:
+            continue
+        is_animated = is_animated or image.get("frameCount", 1) > 1
+        rank = _conversion_rank(image)
+        if best_rank is None or rank > best_rank:
+            best, best_rank = image, rank
+        if image["mime"] == "image/png":
+            is_x4 = image.get("scale") == 4
+            candidate = (is_x4, 0 if is_x4 else image["width"])
+            if png_rank is None or candidate > png_rank:
+                png, png_rank = image, candidate
 
-    return max(pngs, key=lambda img: img.width)
+    return EmoteResult(
+        emote_id=item["id"],
+        name=item["defaultName"],
+        image=_to_image(best),
+        static_image=_to_image(png),
+        is_animated=is_animated,
+    )
 
 
-def search_emotes(
+async def search_emotes(
     query: str | None,
     page: int = 1,
-    per_page: int = 72,
-    sort_by: str = "TOP_ALL_TIME",
-    sort_order: str = "DESCENDING",
+    per_page: int = DEFAULT_PER_PAGE,
+    sort_by: str = DEFAULT_SORT_BY,
+    sort_order: str = DEFAULT_SORT_ORDER,
+    with_counts: bool = True,
 ) -> EmoteSearchResponse:
     """Searches 7TV emotes by name.
 
+    Results are cached in-process for ``APP__SEARCH_CACHE_TTL_SECONDS`` and then
+    served stale for up to ``APP__SEARCH_CACHE_STALE_SECONDS`` while a background
+    request refreshes them.
+
     Args:
         query (str | None): The emote name query string.
         page (int): Page number to fetch.
         per_page (int): Number of results to return.
         sort_by (str): Sort field for results.
         sort_order (str): Sort order for results.
+        with_counts (bool): Whether to request the page and result counts. Views
+            that do not paginate skip them, so 7TV does not have to count matches.
 
     Returns:
-        EmoteSearchResponse: Paginated search results.
+        EmoteSearchResponse: Paginated search results. ``page_count`` and
+        ``total_count`` are 0 when ``with_counts`` is False.
 
     Raises:
         requests.RequestException: If the API request fails.
         ValueError: If the API response is malformed.
     """
-    gql_query = """
-    query EmoteSearch(
-      $query: String,
-      $page: Int,
-      $perPage: Int!,
-      $sort: Sort!,
-      $tags: [String!]!
-    ) {
-      emotes {
-        search(
-          query: $query
-          page: $page
-          perPage: $perPage
-          sort: $sort
-          tags: { tags: $tags, match: ANY }
-          filters: {}
-        ) {
-          items {
-            id
-            defaultName
-            images {
-              url
-              mime
-              width
-              height
-              frameCount
-              scale
-            }
-          }
-          totalCount
-          pageCount
-        }
-      }
-    }
+    if not settings.search_cache_enabled:
+        return await _fetch_emotes(query, page, per_page, sort_by, sort_order, with_counts)
+
+    key = search_cache_key(query, page, per_page, sort_by, sort_order, with_counts)
+    return await search_cache.get_or_load(
+        key, lambda: _fetch_emotes(query, page, per_page, sort_by, sort_order, with_counts)
+    )
+
+
+def search_cache_key(
+    query: str | None,
+    page: int,
+    per_page: int,
+    sort_by: str,
+    sort_order: str,
+    with_counts: bool = True,
+) -> str:
+    """Build the search cache key for a query.
+
+    Args:
+        query (str | None): The emote name query string.
+        page (int): Page number.
+        per_page (int): Number of results per page.
+        sort_by (str): Sort field.
+        sort_order (str): Sort order.
+        with_counts (bool): Whether the result includes page and result counts.
+
+    Returns:
+        str: The cache key.
     """
+    normalized = (query or "").strip().lower()
+    counts = "counts" if with_counts else "items"
+    return f"{normalized}|{page}|{per_page}|{sort_by}|{sort_order}|{counts}"
+
 
-    response = requests.post(
-        settings.seventv_gql_url,
-        json={
-            "query": gql_query,
-            "variables": {
-                "query": query,
-                "page": page,
-                "perPage": per_page,
-                "sort": {"sortBy": sort_by, "order": sort_order},
-                "tags": [],
-            },
+async def _post_graphql(
+    query: GraphQLQuery, variables: dict[str, Any], operation: str
+) -> dict[str, Any]:
+    """Send a GraphQL request to 7TV, by hash when persisted queries are enabled.
+
+    With automatic persisted queries the document is only sent when the server
+    does not know its hash yet. A server that does not support them makes the
+    query fall back to sending the full document from then on.
+
+    Args:
+        query (GraphQLQuery): The query to run.
+        variables (dict[str, Any]): The query variables.
+        operation (str): Label for the upstream latency metric.
+
+    Returns:
+        dict[str, Any]: The ``data`` member of the response.
+
+    Raises:
+        requests.RequestException: If the API request fails.
+        ValueError: If the API reports errors.
+    """
+    send_document = not query.persisted
+    while True:
+        body: dict[str, Any] = {"variables": variables}
+        if send_document:
+            body["query"] = query.document
+        if query.persisted:
+            body["extensions"] = {"persistedQuery": {"version": 1, "sha256Hash": query.sha256}}
+
+        with timed("seventv", seventv_request_seconds, operation=operation):
+            response = await http_client.apost(settings.seventv_gql_url, json=body)
+        response.raise_for_status()
+        payload = response.json()
+
+        error = _persisted_query_error(payload.get("errors"))
+        if error is None or send_document:
+            break
+        if error == "PersistedQueryNotSupported":
+            query.persisted = False
+        send_document = True
+
+    if payload.get("errors"):
+        raise ValueError(f"7TV {operation} failed")
+    return payload.get("data") or {}
+
+
+def _persisted_query_error(errors: list[dict[str, Any]] | None) -> str | None:
+    for error in errors or []:
+        code = (error.get("extensions") or {}).get("code")
+        for name, error_code in PERSISTED_QUERY_ERRORS.items():
+            if error.get("message") == name or code == error_code:
+                return name
+    return None
+
+
+async def _fetch_emotes(
+    query: str | None,
+    page: int,
+    per_page: int,
+    sort_by: str,
+    sort_order: str,
+    with_counts: bool,
+) -> EmoteSearchResponse:
+    data = await _post_graphql(
+        SEARCH_QUERY if with_counts else SEARCH_ITEMS_QUERY,
+        {
+            "query": query,
+            "page": page,
+            "perPage": per_page,
+            "sort": {"sortBy": sort_by, "order": sort_order},
+            "tags": [],
         },
-        timeout=15,
+        operation="search",
     )
-    response.raise_for_status()
-    payload = response.json()
-    if payload.get("errors"):
-        raise ValueError("7TV search failed")
-
-    search_payload = payload.get("data", {}).get("emotes", {}).get("search", {})
-    items = search_payload.get("items", [])
-    results: list[EmoteResult] = []
-    for item in items:
-        images = [
-            EmoteImage(
-                url=img["url"],
-                mime=img["mime"],
-                width=img["width"],
-                height=img["height"],
-                frame_count=img.get("frameCount", 1),
-                scale=img.get("scale"),
-            )
-            for img in item.get("images", [])
-            if "url" in img
-        ]
-        best = _select_best_image(images)
-        static_png = _select_png_x4(images)
-        results.append(
-            EmoteResult(
-                emote_id=item["id"],
-                name=item["defaultName"],
-                image=best,
-                static_image=static_png,
-                is_animated=any(img.frame_count > 1 for img in images),
-            )
-        )
+
+    search_payload = data.get("emotes", {}).get("search", {})
+    results = [_parse_emote(item) for item in search_payload.get("items", [])]
 
     return EmoteSearchResponse(
         items=results,
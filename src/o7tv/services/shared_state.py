@@ -0,0 +1,310 @@
+import fcntl
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from functools import partial
+from pathlib import Path
+from typing import BinaryIO
+
+import anyio
+from anyio import to_thread
+
+from o7tv.config.config import settings
+from o7tv.services.metrics import ffmpeg_slot_wait_seconds
+
+logger = logging.getLogger(__name__)
+
+SHARED_STATE_DIR = settings.static_dir / "cache" / "shared"
+# In-flight conversion keys hash onto a fixed set of lock files, so nothing needs cleaning up.
+INFLIGHT_LOCK_STRIPES = 4096
+SLOT_POLL_SECONDS = 0.05
+
+
+def try_lock_file(path: Path) -> BinaryIO | None:
+    """Take an exclusive advisory lock on a file without waiting.
+
+    The lock is held until the returned handle is closed, or until the process
+    exits, so a crashed worker never leaves a stale lock behind.
+
+    Args:
+        path (Path): The lock file, created if missing.
+
+    Returns:
+        BinaryIO | None: The open handle holding the lock, or None if another
+        process or thread holds it.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle = open(path, "a+b")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.close()
+        return None
+    return handle
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive advisory lock on a file, waiting for it if needed.
+
+    Args:
+        path (Path): The lock file, created if missing.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        yield
+
+
+def inflight_lock(key: str) -> AbstractContextManager[None]:
+    """Return a lock serializing work on a key across worker processes.
+
+    Args:
+        key (str): Hex-encoded key identifying the work, e.g. a cache key.
+
+    Returns:
+        AbstractContextManager[None]: The lock, or a no-op context when shared
+        state is disabled.
+    """
+    if not settings.shared_state_enabled:
+        return nullcontext()
+    stripe = int(key[:8], 16) % INFLIGHT_LOCK_STRIPES
+    return file_lock(SHARED_STATE_DIR / "inflight" / f"{stripe:03x}.lock")
+
+
+class ProcessSlots:
+    """Counting semaphore shared by every process using the same directory.
+
+    Each slot is a lock file; holding a slot means holding its lock. Waiters poll
+    until a slot frees up.
+    """
+
+    def __init__(self, directory: Path, count: int) -> None:
+        """Initialize the semaphore.
+
+        Args:
+            directory (Path): Directory holding the slot lock files.
+            count (int): Number of slots; 0 or less disables the limit.
+        """
+        self.directory = directory
+        self.count = count
+
+    @contextmanager
+    def acquire(self) -> Iterator[None]:
+        """Hold one slot for the duration of the block, waiting for it if needed."""
+        if self.count <= 0:
+            yield
+            return
+
+        start = time.perf_counter()
+        while True:
+            for index in range(self.count):
+                handle = try_lock_file(self.directory / f"slot-{index}.lock")
+                if handle is not None:
+                    ffmpeg_slot_wait_seconds.observe(time.perf_counter() - start)
+                    with handle:
+                        yield
+                    return
+            time.sleep(SLOT_POLL_SECONDS)
+
+
+class SharedStore:
+    """Key/value store shared by worker processes through a local SQLite file.
+
+    Each thread uses its own connection. Failures are logged and treated as
+    misses, so the store only ever degrades to per-process caching. Calls block
+    for up to the SQLite busy timeout under write contention, so async callers go
+    through :meth:`run`.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Initialize the store.
+
+        Args:
+            path (Path): Path to the SQLite database, created on first use.
+        """
+        self.path = path
+        self._local = threading.local()
+        self._limiter: anyio.CapacityLimiter | None = None
+
+    def _connection(self) -> sqlite3.Connection:
+        connection: sqlite3.Connection | None = getattr(self._local, "connection", None)
+        if connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, stored_at REAL NOT NULL, "
+                "value BLOB NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS counters ("
+                "name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def get(self, namespace: str, key: str) -> tuple[float, bytes] | None:
+        """Return a stored value and its age.
+
+        Args:
+            namespace (str): Groups keys belonging to the same cache.
+            key (str): The entry key.
+
+        Returns:
+            tuple[float, bytes] | None: Age in seconds and value, or None on a miss.
+        """
+        try:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT stored_at, value FROM entries WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as exc:
+            logger.warning(f"Unable to read shared entry {namespace}/{key}: {exc}")
+            return None
+        if row is None:
+            return None
+        stored_at, value = row
+        return max(time.time() - stored_at, 0.0), bytes(value)
+
+    def put(self, namespace: str, key: str, value: bytes, max_age: float) -> None:
+        """Store a value and drop entries of the namespace older than ``max_age``.
+
+        Args:
+            namespace (str): Groups keys belonging to the same cache.
+            key (str): The entry key.
+            value (bytes): The value to store.
+            max_age (float): Age in seconds after which entries are no longer useful.
+        """
+        now = time.time()
+        try:
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, stored_at, value) "
+                "VALUES (?, ?, ?, ?)",
+                (namespace, key, now, value),
+            )
+            connection.execute(
+                "DELETE FROM entries WHERE namespace = ? AND stored_at < ?",
+                (namespace, now - max_age),
+            )
+        except sqlite3.Error as exc:
+            logger.warning(f"Unable to write shared entry {namespace}/{key}: {exc}")
+
+    def add(self, name: str, delta: int) -> int | None:
+        """Atomically add to a counter.
+
+        Args:
+            name (str): The counter name.
+            delta (int): Amount to add; may be negative.
+
+        Returns:
+            int | None: The new value, or None if the counter was never set with
+            :meth:`reset` or the store is unavailable.
+        """
+        try:
+            row = (
+                self._connection()
+                .execute(
+                    "UPDATE counters SET value = value + ? WHERE name = ? RETURNING value",
+                    (delta, name),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as exc:
+            logger.warning(f"Unable to update shared counter {name}: {exc}")
+            return None
+        return None if row is None else int(row[0])
+
+    def reset(self, name: str, value: int) -> None:
+        """Set a counter to an absolute value.
+
+        Args:
+            name (str): The counter name.
+            value (int): The new value.
+        """
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)", (name, value)
+            )
+        except sqlite3.Error as exc:
+            logger.warning(f"Unable to reset shared counter {name}: {exc}")
+
+    async def run[T](self, func: Callable[..., T], *args: object) -> T:
+        """Run a blocking store call on a worker thread.
+
+        Calls run one at a time in submission order, so writes issued from the
+        event loop are applied in the order they were made.
+
+        Args:
+            func (Callable[..., T]): The blocking callable.
+            *args (object): Positional arguments for the callable.
+
+        Returns:
+            T: The callable's return value.
+        """
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(1)
+        return await to_thread.run_sync(partial(func, *args), limiter=self._limiter)
+
+
+class SharedEntries[T]:
+    """Typed view over one namespace of a :class:`SharedStore`."""
+
+    def __init__(
+        self,
+        store: SharedStore,
+        namespace: str,
+        dumps: Callable[[T], bytes],
+        loads: Callable[[bytes], T],
+    ) -> None:
+        """Initialize the view.
+
+        Args:
+            store (SharedStore): The underlying store.
+            namespace (str): Namespace holding the entries.
+            dumps (Callable[[T], bytes]): Serializes a value.
+            loads (Callable[[bytes], T]): Deserializes a value.
+        """
+        self.store = store
+        self.namespace = namespace
+        self.dumps = dumps
+        self.loads = loads
+
+    def get(self, key: str) -> tuple[float, T] | None:
+        """Return a value and its age in seconds, or None on a miss."""
+        entry = self.store.get(self.namespace, key)
+        if entry is None:
+            return None
+        age, raw = entry
+        try:
+            return age, self.loads(raw)
+        except ValueError as exc:
+            logger.warning(f"Discarding unreadable shared entry {self.namespace}/{key}: {exc}")
+            return None
+
+    def put(self, key: str, value: T, max_age: float) -> None:
+        """Store a value, dropping entries older than ``max_age`` seconds."""
+        self.store.put(self.namespace, key, self.dumps(value), max_age)
+
+    async def aget(self, key: str) -> tuple[float, T] | None:
+        """Look a value up without blocking the event loop. See :meth:`get`."""
+        return await self.store.run(self.get, key)
+
+    async def aput(self, key: str, value: T, max_age: float) -> None:
+        """Store a value without blocking the event loop. See :meth:`put`."""
+        await self.store.run(self.put, key, value, max_age)
+
+
+shared_store = (
+    SharedStore(SHARED_STATE_DIR / "state.sqlite3") if settings.shared_state_enabled else None
+)
+ffmpeg_slots = ProcessSlots(SHARED_STATE_DIR / "ffmpeg-slots", settings.ffmpeg_max_processes)
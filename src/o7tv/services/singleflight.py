@@ -0,0 +1,187 @@
+import asyncio
+from collections import deque
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from contextlib import aclosing
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share the same key.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same task and receive its result or exception.
+    The task is shielded, so a caller disconnecting does not cancel the work
+    for everyone else.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty in-flight table."""
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def __contains__(self, key: str) -> bool:
+        """Return whether work for a key is currently in flight."""
+        return key in self._inflight
+
+    def _forget(self, key: str, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Mark the exception as retrieved when every waiter has gone away.
+        if not future.cancelled():
+            future.exception()
+
+    def start[T](self, key: str, func: Callable[[], Awaitable[T]]) -> "asyncio.Future[T]":
+        """Start ``func`` unless work for the key is already in flight.
+
+        ``func`` is called synchronously, so errors raised while starting the
+        work propagate to the caller and nothing is registered.
+
+        Args:
+            key (str): Identifies equivalent work.
+            func (Callable[[], Awaitable[T]]): Factory for the awaitable doing the work.
+
+        Returns:
+            asyncio.Future[T]: The shared future. Await it through ``asyncio.shield``
+            so a cancelled caller does not cancel the work for everyone else.
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    async def do[T](self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Run ``func`` once per key among concurrent callers.
+
+        Args:
+            key (str): Identifies equivalent work.
+            func (Callable[[], Awaitable[T]]): Factory for the awaitable doing the work.
+
+        Returns:
+            T: The shared result.
+        """
+        return await asyncio.shield(self.start(key, func))
+
+
+class _Broadcast[T]:
+    def __init__(self) -> None:
+        self.items: deque[T] = deque()
+        # Stream index of items[0]; once it moves past 0 the stream cannot be replayed.
+        self.base = 0
+        self.positions: dict[object, int] = {}
+        self.error: BaseException | None = None
+        self.done = False
+        self.changed = asyncio.Event()
+        self.task: asyncio.Task[None] | None = None
+
+    @property
+    def end(self) -> int:
+        return self.base + len(self.items)
+
+    def notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class StreamFlight:
+    """Share one streaming producer among concurrent consumers with the same key.
+
+    The first consumer for a key starts iterating the source; consumers arriving
+    while its first items are still buffered receive them and then follow along
+    live, so each sees the complete stream. At most ``max_buffered`` items are
+    kept: the source waits while the slowest consumer is that far behind, and
+    once the buffer has to drop the first item the stream stops accepting new
+    consumers, which then start a stream of their own. The source is closed once
+    the last consumer goes away.
+    """
+
+    def __init__(self, max_buffered: int = 16) -> None:
+        """Initialize an empty in-flight table.
+
+        Args:
+            max_buffered (int): Maximum number of items kept per stream.
+        """
+        self.max_buffered = max(max_buffered, 1)
+        self._inflight: dict[str, _Broadcast] = {}
+
+    def __contains__(self, key: str) -> bool:
+        """Return whether a stream for a key can currently be joined."""
+        return key in self._inflight
+
+    def _forget(self, key: str, broadcast: _Broadcast) -> None:
+        if self._inflight.get(key) is broadcast:
+            del self._inflight[key]
+
+    async def _pump[T](
+        self, key: str, broadcast: _Broadcast[T], source: AsyncGenerator[T, None]
+    ) -> None:
+        try:
+            async with aclosing(source):
+                async for item in source:
+                    broadcast.items.append(item)
+                    broadcast.notify()
+                    while True:
+                        changed = broadcast.changed
+                        slowest = min(broadcast.positions.values(), default=broadcast.end)
+                        # Drop items every consumer has received once the buffer is full.
+                        while len(broadcast.items) > self.max_buffered and slowest > broadcast.base:
+                            broadcast.items.popleft()
+                            broadcast.base += 1
+                            self._forget(key, broadcast)
+                        if broadcast.end - slowest < self.max_buffered:
+                            break
+                        await changed.wait()
+        except Exception as exc:
+            broadcast.error = exc
+        finally:
+            broadcast.done = True
+            self._forget(key, broadcast)
+            broadcast.notify()
+
+    async def subscribe[T](
+        self, key: str, factory: Callable[[], AsyncGenerator[T, None]]
+    ) -> AsyncGenerator[T, None]:
+        """Iterate the stream for a key, joining it if it can still be replayed.
+
+        Args:
+            key (str): Identifies equivalent streams.
+            factory (Callable[[], AsyncGenerator[T, None]]): Creates the source when no
+                joinable stream for the key is running.
+
+        Yields:
+            T: Every item of the stream, from the first one.
+
+        Raises:
+            Exception: Whatever the source raised, re-raised in every consumer.
+        """
+        broadcast: _Broadcast[T] | None = self._inflight.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._inflight[key] = broadcast
+            broadcast.task = asyncio.create_task(self._pump(key, broadcast, factory()))
+        token = object()
+        position = broadcast.positions[token] = broadcast.base
+        try:
+            while True:
+                changed = broadcast.changed
+                if position < broadcast.end:
+                    item = broadcast.items[position - broadcast.base]
+                    position = broadcast.positions[token] = position + 1
+                    broadcast.notify()
+                    yield item
+                    continue
+                if broadcast.done:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+                await changed.wait()
+        finally:
+            del broadcast.positions[token]
+            broadcast.notify()
+            if not broadcast.positions and not broadcast.done and broadcast.task is not None:
+                # Nobody is listening any more; later consumers start a fresh stream.
+                self._forget(key, broadcast)
+                broadcast.task.cancel()
+
+
+conversion_flights = SingleFlight()
+conversion_streams = StreamFlight()
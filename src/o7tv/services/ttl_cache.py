@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+
+from o7tv.services.shared_state import SharedEntries
+from o7tv.services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class TtlCache[T]:
+    """In-process TTL cache with stale-while-revalidate semantics.
+
+    Entries younger than ``ttl`` are served directly. Entries older than ``ttl``
+    but younger than ``ttl + stale_ttl`` are served immediately while a single
+    background task refreshes them. Older entries are reloaded inline. Concurrent
+    loads for the same key are coalesced.
+
+    With ``shared`` set, loaded values are also written to a store shared with
+    other worker processes, and local misses or stale entries are looked up there
+    before loading.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        stale_ttl: float,
+        max_entries: int,
+        shared: SharedEntries[T] | None = None,
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+            ttl (float): Seconds an entry is considered fresh.
+            stale_ttl (float): Extra seconds a stale entry may be served while refreshing.
+            max_entries (int): Maximum number of entries kept, evicted in LRU order.
+            shared (SharedEntries[T] | None): Store shared with other processes.
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max(max_entries, 1)
+        self.shared = shared
+        self._entries: OrderedDict[str, tuple[float, T]] = OrderedDict()
+        self._flights = SingleFlight()
+        self._background: set[asyncio.Task] = set()
+
+    def _store(self, key: str, value: T, age: float = 0.0) -> None:
+        self._entries[key] = (time.monotonic() - age, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _local(self, key: str) -> tuple[float, T] | None:
+        entry = self._entries.get(key)
+        return None if entry is None else (time.monotonic() - entry[0], entry[1])
+
+    async def _lookup(self, key: str) -> tuple[float, T] | None:
+        local = self._local(key)
+        if self.shared is None or (local is not None and local[0] < self.ttl):
+            return local
+
+        shared = await self.shared.aget(key)
+        if shared is not None and (local is None or shared[0] < local[0]):
+            self._store(key, shared[1], age=shared[0])
+            return shared
+        return local
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[T]]) -> T:
+        async def load_and_store() -> T:
+            value = await loader()
+            self._store(key, value)
+            if self.shared is not None:
+                await self.shared.aput(key, value, max_age=self.ttl + self.stale_ttl)
+            return value
+
+        return await self._flights.do(key, load_and_store)
+
+    async def _refresh(self, key: str, loader: Callable[[], Awaitable[T]]) -> None:
+        try:
+            await self._load(key, loader)
+        except Exception as exc:
+            logger.warning(f"Background refresh failed for {key}: {exc}")
+
+    def peek(self, key: str) -> T | None:
+        """Return a fresh value cached by this process without loading or refreshing it.
+
+        The shared store is not consulted, so the call never blocks.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            T | None: The cached value, or None if missing or stale.
+        """
+        entry = self._local(key)
+        if entry is None or entry[0] >= self.ttl:
+            return None
+        return entry[1]
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[T]]) -> T:
+        """Return the cached value for a key, loading it when missing or expired.
+
+        Args:
+            key (str): The cache key.
+            loader (Callable[[], Awaitable[T]]): Factory for the awaitable producing the value.
+
+        Returns:
+            T: The cached or freshly loaded value.
+        """
+        entry = await self._lookup(key)
+        if entry is not None:
+            age, value = entry
+            if age < self.ttl:
+                self._entries.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale_ttl:
+                if key not in self._flights:
+                    task = asyncio.create_task(self._refresh(key, loader))
+                    self._background.add(task)
+                    task.add_done_callback(self._background.discard)
+                return value
+
+        return await self._load(key, loader)
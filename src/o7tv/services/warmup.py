@@ -0,0 +1,85 @@
+import logging
+import time
+from collections.abc import Callable
+
+import requests
+from anyio import to_thread
+
+from o7tv.config.config import settings
+from o7tv.services.conversion import check_ffmpeg
+from o7tv.services.pool import conversion_pool
+from o7tv.utils.http_client import http_client
+
+logger = logging.getLogger(__name__)
+
+# Upstream hosts whose pooled connections are opened ahead of the first request.
+WARM_UP_URLS = (settings.seventv_gql_url, "https://cdn.7tv.app/")
+
+
+class WarmupState:
+    """Outcome of the start-up warm-up steps, reported by the readiness endpoint."""
+
+    def __init__(self, steps: tuple[str, ...]) -> None:
+        """Initialize every step as pending.
+
+        Args:
+            steps (tuple[str, ...]): Names of the warm-up steps.
+        """
+        self.steps: dict[str, str] = dict.fromkeys(steps, "pending")
+
+    @property
+    def ready(self) -> bool:
+        """bool: Whether every step completed successfully."""
+        return all(status == "ok" for status in self.steps.values())
+
+    @property
+    def failed(self) -> bool:
+        """bool: Whether any step failed."""
+        return any(status == "failed" for status in self.steps.values())
+
+
+async def open_upstream_connections() -> None:
+    """Open pooled connections to the 7TV API and CDN with a ``HEAD`` request each.
+
+    This pays for DNS, TCP and TLS set-up before the first user request. Any
+    HTTP status counts as success; an unreachable host is only logged, because
+    its connections are opened on first use anyway and an upstream outage must
+    not keep the service from becoming ready.
+    """
+    for url in WARM_UP_URLS:
+        try:
+            await http_client.run(http_client.request, "HEAD", url)
+        except requests.RequestException as exc:
+            logger.warning(f"Unable to open a connection to {url} during warm-up: {exc}")
+
+
+async def warm_up(state: WarmupState, load_templates: Callable[[], None]) -> None:
+    """Initialize the heavy application pieces before taking traffic.
+
+    Templates are compiled on a worker thread, connections to 7TV are opened in
+    the HTTP client pool, and ffmpeg is checked on the conversion pool, which
+    also starts its first worker. Each step is recorded in ``state``; a failing
+    step does not stop the others.
+
+    Args:
+        state (WarmupState): Where step outcomes are recorded.
+        load_templates (Callable[[], None]): Compiles the page templates.
+    """
+    steps = {
+        "templates": lambda: to_thread.run_sync(load_templates),
+        "http_client": open_upstream_connections,
+        "ffmpeg": lambda: conversion_pool.run(check_ffmpeg),
+    }
+    for name, step in steps.items():
+        start = time.perf_counter()
+        try:
+            await step()
+        except Exception as exc:
+            state.steps[name] = "failed"
+            logger.error(f"Warm-up step {name} failed: {exc}")
+            continue
+        state.steps[name] = "ok"
+        logger.info(f"Warm-up step {name} done in {time.perf_counter() - start:.3f}s")
+
+
+warmup_state = WarmupState(("templates", "http_client", "ffmpeg"))
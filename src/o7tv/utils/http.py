@@ -2,9 +2,12 @@ import re
 from pathlib import Path
 from urllib.parse import quote, urlparse
 
-import requests
 from fastapi import HTTPException
 
+from o7tv.config.config import settings
+from o7tv.exceptions.conversion_exceptions import ConversionQueueFullError
+from o7tv.utils.http_client import http_client
+
 
 def download_to_path(emote_url: str, dest: Path) -> Path | None:
     """Downloads the emote from the URL to the destination; returns the Path if OK, None if fails.
@@ -20,7 +23,7 @@ def download_to_path(emote_url: str, dest: Path) -> Path | None:
     if parsed.scheme not in {"http", "https"}:
         return None
 
-    response = requests.get(emote_url, timeout=15)
+    response = http_client.get(emote_url)
     if response.status_code != 200:
         return None
 
@@ -87,6 +90,22 @@ def safe_filename(name: str | None) -> str:
     return f"{cleaned}.webm"
 
 
+def queue_full_error(exc: ConversionQueueFullError) -> HTTPException:
+    """Build the HTTP 503 response for a full conversion queue.
+
+    Args:
+        exc (ConversionQueueFullError): The rejection raised by the conversion pool.
+
+    Returns:
+        HTTPException: HTTP 503 with a ``Retry-After`` header.
+    """
+    return HTTPException(
+        status_code=503,
+        detail=str(exc),
+        headers={"Retry-After": str(settings.conversion_retry_after_seconds)},
+    )
+
+
 def content_disposition(filename: str, original_name: str | None) -> str:
     """Build a safe Content-Disposition header value.
 
@@ -101,3 +120,88 @@ def content_disposition(filename: str, original_name: str | None) -> str:
     cleaned = re.sub(r"[\r\n\"]+", "", quoted).strip()
     encoded = quote(cleaned)
     return f"attachment; filename=\"{filename}\"; filename*=UTF-8''{encoded}"
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an ``If-None-Match`` header against an entity tag.
+
+    Args:
+        if_none_match (str | None): The request header value.
+        etag (str): The current entity tag, including quotes.
+
+    Returns:
+        bool: True if the client already holds the current representation.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in candidates
+
+
+def if_range_matches(if_range: str | None, etag: str) -> bool:
+    """Check an ``If-Range`` header against an entity tag.
+
+    ``If-Range`` uses the strong comparison, so weak tags and dates never match.
+
+    Args:
+        if_range (str | None): The request header value.
+        etag (str): The current entity tag, including quotes.
+
+    Returns:
+        bool: True if a ``Range`` header may be honored.
+    """
+    if if_range is None:
+        return True
+    candidate = if_range.strip()
+    return not candidate.startswith("W/") and candidate == etag
+
+
+def parse_byte_range(range_header: str | None, size: int) -> tuple[int, int] | None:
+    """Parse a single-range ``Range`` header against a body of known size.
+
+    Multiple ranges, other units and malformed headers are ignored, so the caller
+    serves the full body as RFC 9110 allows.
+
+    Args:
+        range_header (str | None): The request header value.
+        size (int): Length of the full body in bytes.
+
+    Returns:
+        tuple[int, int] | None: Inclusive ``(first, last)`` byte positions, or None
+        to serve the full body.
+
+    Raises:
+        HTTPException: HTTP 416 if the range starts beyond the end of the body.
+    """
+    if not range_header:
+        return None
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first_text, sep, last_text = spec.strip().partition("-")
+    if not sep or not (first_text + last_text).isdigit():
+        return None
+
+    if not first_text:
+        # Suffix range: the last N bytes.
+        length = int(last_text)
+        if length == 0:
+            raise _range_not_satisfiable(size)
+        return max(size - length, 0), size - 1
+    first = int(first_text)
+    if first >= size:
+        raise _range_not_satisfiable(size)
+    last = int(last_text) if last_text else size - 1
+    if last < first:
+        return None
+    return first, min(last, size - 1)
+
+
+def _range_not_satisfiable(size: int) -> HTTPException:
+    return HTTPException(
+        status_code=416,
+        detail="Requested range not satisfiable",
+        headers={"Content-Range": f"bytes */{size}"},
+    )
@@ -0,0 +1,106 @@
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+
+import anyio
+import requests
+from anyio import to_thread
+from requests.adapters import HTTPAdapter
+
+from o7tv.config.config import settings
+
+
+class HttpClient:
+    """Shared, connection-pooled HTTP client for upstream 7TV requests.
+
+    A single ``requests.Session`` keeps TCP/TLS connections to ``api.7tv.app``
+    and the CDN alive between requests. Blocking callers (conversion workers)
+    use the sync methods; request handlers use the ``a*`` variants, which run
+    the request on a worker thread bounded by the pool size so the event loop
+    is never blocked.
+    """
+
+    def __init__(self, pool_size: int, connect_timeout: float, read_timeout: float) -> None:
+        """Initialize the client.
+
+        Args:
+            pool_size (int): Maximum number of pooled connections per host.
+            connect_timeout (float): Connection timeout in seconds.
+            read_timeout (float): Read timeout in seconds.
+        """
+        self.pool_size = max(pool_size, 1)
+        self.timeout = (connect_timeout, read_timeout)
+        self._session: requests.Session | None = None
+        self._limiter: anyio.CapacityLimiter | None = None
+
+    @property
+    def session(self) -> requests.Session:
+        """requests.Session: The pooled session, created on first use."""
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+        return self._session
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """Send a request on the pooled session.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The request URL.
+            **kwargs (Any): Extra arguments for ``requests.Session.request``.
+
+        Returns:
+            requests.Response: The upstream response.
+
+        Raises:
+            requests.RequestException: If the request fails.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """Send a GET request. See :meth:`request`."""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        """Send a POST request. See :meth:`request`."""
+        return self.request("POST", url, **kwargs)
+
+    async def run[T](self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking call on a worker thread bounded by the pool size.
+
+        Args:
+            func (Callable[..., T]): The blocking callable.
+            *args (Any): Positional arguments for the callable.
+            **kwargs (Any): Keyword arguments for the callable.
+
+        Returns:
+            T: The callable's return value.
+        """
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.pool_size)
+        return await to_thread.run_sync(partial(func, *args, **kwargs), limiter=self._limiter)
+
+    async def aget(self, url: str, **kwargs: Any) -> requests.Response:
+        """Send a GET request without blocking the event loop. See :meth:`request`."""
+        return await self.run(self.request, "GET", url, **kwargs)
+
+    async def apost(self, url: str, **kwargs: Any) -> requests.Response:
+        """Send a POST request without blocking the event loop. See :meth:`request`."""
+        return await self.run(self.request, "POST", url, **kwargs)
+
+    def close(self) -> None:
+        """Close pooled connections. The session is recreated on next use."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+http_client = HttpClient(
+    pool_size=settings.http_pool_size,
+    connect_timeout=settings.http_connect_timeout_seconds,
+    read_timeout=settings.http_read_timeout_seconds,
+)
@@ -0,0 +1,39 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+CORPUS_DIR = Path(__file__).resolve().parents[1] / "benchmarks" / "corpus"
+
+requires_ffmpeg = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None, reason="ffmpeg is not installed"
+)
+
+
+def decoded_frames(data: bytes, tmp_path: Path) -> list[tuple[float, float]]:
+    """Decode a video with ffmpeg and return each frame's ``(pts, duration)`` in seconds."""
+    path = tmp_path / "decoded.webm"
+    path.write_bytes(data)
+    lines = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", str(path), "-map", "0:v", "-f", "framemd5", "-"],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.splitlines()
+    time_base = 1.0
+    frames = []
+    for line in lines:
+        if line.startswith("#tb 0:"):
+            numerator, denominator = line.split(":", 1)[1].strip().split("/")
+            time_base = int(numerator) / int(denominator)
+        elif not line.startswith("#"):
+            _, _, pts, duration, *_ = (field.strip() for field in line.split(","))
+            frames.append((int(pts) * time_base, int(duration) * time_base))
+    return frames
+
+
+def played_seconds(frames: list[tuple[float, float]]) -> float:
+    """Return the time at which the last frame stops being shown."""
+    pts, duration = frames[-1]
+    return pts + duration
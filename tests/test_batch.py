@@ -0,0 +1,90 @@
+import asyncio
+import io
+import json
+import zipfile
+
+from fastapi import HTTPException
+
+from o7tv.exceptions.ffmpeg_exceptions import FfmpegConversionError
+from o7tv.models.batch import BatchItem
+from o7tv.services.batch import MANIFEST_NAME, iter_batch_zip, zip_files
+
+
+async def collect_zip(items: list[BatchItem], convert, concurrency: int = 2) -> zipfile.ZipFile:
+    chunks = [chunk async for chunk in iter_batch_zip(items, convert, concurrency)]
+    return zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+
+
+def test_zip_files():
+    archive = zipfile.ZipFile(io.BytesIO(zip_files([("a.webm", b"a"), ("b.webm", b"bb")])))
+    assert archive.namelist() == ["a.webm", "b.webm"]
+    assert archive.read("b.webm") == b"bb"
+
+
+async def test_batch_zip_contains_every_conversion_and_a_manifest():
+    items = [
+        BatchItem(emote_url="https://cdn.7tv.app/emote/1/4x.gif", emote_name="pog"),
+        BatchItem(emote_url="https://cdn.7tv.app/emote/2/4x.gif", emote_name="pog"),
+        BatchItem(emote_url="https://cdn.7tv.app/emote/3/4x.gif"),
+    ]
+
+    async def convert(url: str) -> bytes:
+        return url.encode()
+
+    archive = await collect_zip(items, convert)
+    assert sorted(archive.namelist()) == sorted(
+        ["pog.webm", "pog-2.webm", "emote.webm", MANIFEST_NAME]
+    )
+    assert archive.namelist()[-1] == MANIFEST_NAME
+    assert archive.read("pog-2.webm") == items[1].emote_url.encode()
+
+    manifest = json.loads(archive.read(MANIFEST_NAME))["items"]
+    assert [entry["file"] for entry in manifest] == ["pog.webm", "pog-2.webm", "emote.webm"]
+    assert all(entry["error"] is None for entry in manifest)
+
+
+async def test_batch_zip_records_failures_without_aborting():
+    items = [
+        BatchItem(emote_url="ok", emote_name="ok"),
+        BatchItem(emote_url="broken", emote_name="broken"),
+        BatchItem(emote_url="blocked", emote_name="blocked"),
+        BatchItem(emote_url="bug", emote_name="bug"),
+    ]
+    errors = {
+        "broken": FfmpegConversionError("Corrupted input."),
+        "blocked": HTTPException(status_code=400, detail="Host not allowed."),
+        "bug": RuntimeError("internal detail"),
+    }
+
+    async def convert(url: str) -> bytes:
+        if url in errors:
+            raise errors[url]
+        return b"webm"
+
+    archive = await collect_zip(items, convert)
+    assert sorted(archive.namelist()) == [MANIFEST_NAME, "ok.webm"]
+    manifest = json.loads(archive.read(MANIFEST_NAME))["items"]
+    assert [(entry["file"], entry["error"]) for entry in manifest] == [
+        ("ok.webm", None),
+        (None, "Corrupted input."),
+        (None, "Host not allowed."),
+        (None, "Unexpected error during conversion."),
+    ]
+
+
+async def test_batch_zip_limits_concurrency():
+    running = 0
+    peak = 0
+
+    async def convert(url: str) -> bytes:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return b"webm"
+
+    items = [BatchItem(emote_url=str(index)) for index in range(6)]
+    archive = await collect_zip(items, convert, concurrency=2)
+    assert len(archive.namelist()) == 7
+    assert peak == 2
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from o7tv.services.cache import DiskCache
+from o7tv.services.shared_state import SharedStore
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DiskCache(tmp_path / "cache", max_bytes=250, suffix=".bin")
+
+
+def put_aged(cache: DiskCache, key: str, size: int, mtime: float) -> None:
+    cache.put(key, b"x" * size)
+    os.utime(cache._path_for(key), (mtime, mtime))
+
+
+def test_round_trip(cache):
+    key = DiskCache.make_key(url="https://example.com/a.gif")
+    cache.put(key, b"payload")
+    assert key in cache
+    assert cache.get(key) == b"payload"
+    assert cache.get(DiskCache.make_key(url="other")) is None
+
+
+def test_evicts_least_recently_used(cache):
+    put_aged(cache, "aa01", 100, 1_000)
+    put_aged(cache, "aa02", 100, 2_000)
+    cache.put("aa03", b"x" * 100)
+    assert "aa01" not in cache
+    assert "aa02" in cache
+    assert "aa03" in cache
+
+
+def test_read_refreshes_recency(cache):
+    put_aged(cache, "aa01", 100, 1_000)
+    put_aged(cache, "aa02", 100, 2_000)
+    cache.get("aa01")
+    cache.put("aa03", b"x" * 100)
+    assert "aa01" in cache
+    assert "aa02" not in cache
+
+
+def test_overwrite_counts_the_size_once(cache):
+    put_aged(cache, "aa01", 100, 1_000)
+    put_aged(cache, "aa01", 120, 1_000)
+    cache.put("aa02", b"x" * 120)
+    assert "aa01" in cache
+    assert "aa02" in cache
+
+
+def test_entry_larger_than_the_cache_is_dropped(cache):
+    cache.put("aa01", b"x" * 100)
+    cache.put("aa02", b"x" * 300)
+    assert "aa02" not in cache
+    assert "aa01" in cache
+
+
+def test_size_is_initialized_from_existing_entries(tmp_path):
+    first = DiskCache(tmp_path, max_bytes=250)
+    put_aged(first, "aa01", 100, 1_000)
+    put_aged(first, "aa02", 100, 2_000)
+
+    second = DiskCache(tmp_path, max_bytes=250)
+    second.put("aa03", b"x" * 100)
+    assert "aa01" not in second
+    assert "aa02" in second
+
+
+def test_shared_counter_triggers_eviction(tmp_path):
+    store = SharedStore(tmp_path / "state.sqlite3")
+    first = DiskCache(tmp_path / "cache", max_bytes=250, shared=store)
+    second = DiskCache(tmp_path / "cache", max_bytes=250, shared=store)
+    put_aged(first, "aa01", 100, 1_000)
+    put_aged(second, "aa02", 100, 2_000)
+    first.put("aa03", b"x" * 100)
+    assert "aa01" not in second
+    assert "aa02" in second
+    assert store.add(f"disk_cache:{first.directory}", 0) == 200
@@ -0,0 +1,205 @@
+from collections.abc import AsyncIterator
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from o7tv.api import emotes
+from o7tv.api.emotes import _conversion_etag, _payload_response, _stream_response
+from o7tv.config.config import settings
+from o7tv.utils.http import etag_matches, if_range_matches, parse_byte_range
+
+PAYLOAD = bytes(range(100))
+EMOTE_URL = "https://cdn.7tv.app/emote/1/4x.gif"
+ETAG = 'W/"0123456789abcdef0123456789abcdef"'
+
+
+def make_request(method: str = "GET", **headers: str) -> Request:
+    raw_headers = [
+        (name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()
+    ]
+    return Request({"type": "http", "method": method, "headers": raw_headers})
+
+
+class TestParseByteRange:
+    def test_missing_header(self):
+        assert parse_byte_range(None, 100) is None
+
+    def test_closed_range(self):
+        assert parse_byte_range("bytes=10-19", 100) == (10, 19)
+
+    def test_open_range(self):
+        assert parse_byte_range("bytes=90-", 100) == (90, 99)
+
+    def test_last_is_clamped(self):
+        assert parse_byte_range("bytes=90-500", 100) == (90, 99)
+
+    def test_suffix_range(self):
+        assert parse_byte_range("bytes=-10", 100) == (90, 99)
+
+    def test_suffix_longer_than_body(self):
+        assert parse_byte_range("bytes=-500", 100) == (0, 99)
+
+    def test_empty_suffix_is_not_satisfiable(self):
+        with pytest.raises(HTTPException) as info:
+            parse_byte_range("bytes=-0", 100)
+        assert info.value.status_code == 416
+
+    @pytest.mark.parametrize("header", ["bytes=100-", "bytes=150-200"])
+    def test_start_past_end(self, header):
+        with pytest.raises(HTTPException) as info:
+            parse_byte_range(header, 100)
+        assert info.value.status_code == 416
+        assert info.value.headers == {"Content-Range": "bytes */100"}
+
+    def test_multi_range_is_ignored(self):
+        assert parse_byte_range("bytes=0-9,20-29", 100) is None
+
+    @pytest.mark.parametrize(
+        "header",
+        ["bytes", "bytes=", "bytes=-", "bytes=a-b", "bytes=5", "bytes=1.5-2", "items=0-9"],
+    )
+    def test_malformed_is_ignored(self, header):
+        assert parse_byte_range(header, 100) is None
+
+    def test_reversed_range_is_ignored(self):
+        assert parse_byte_range("bytes=20-10", 100) is None
+
+    def test_unit_is_case_insensitive(self):
+        assert parse_byte_range("Bytes=0-0", 100) == (0, 0)
+
+
+class TestEtagMatches:
+    def test_missing_header(self):
+        assert not etag_matches(None, '"abc"')
+
+    def test_exact_match(self):
+        assert etag_matches('"abc"', '"abc"')
+
+    def test_list_match(self):
+        assert etag_matches('"x", "abc" ,"y"', '"abc"')
+
+    def test_wildcard(self):
+        assert etag_matches("*", '"abc"')
+
+    def test_weak_comparison(self):
+        assert etag_matches('W/"abc"', '"abc"')
+
+    def test_mismatch(self):
+        assert not etag_matches('"abd"', '"abc"')
+
+
+class TestIfRangeMatches:
+    def test_missing_header(self):
+        assert if_range_matches(None, '"abc"')
+
+    def test_exact_match(self):
+        assert if_range_matches(' "abc" ', '"abc"')
+
+    def test_weak_tag_never_matches(self):
+        assert not if_range_matches('W/"abc"', '"abc"')
+
+    def test_date_never_matches(self):
+        assert not if_range_matches("Wed, 21 Oct 2015 07:28:00 GMT", '"abc"')
+
+    def test_mismatch(self):
+        assert not if_range_matches('"abd"', '"abc"')
+
+
+class TestPayloadResponse:
+    def test_full_response(self):
+        response = _payload_response(make_request(), PAYLOAD, {}, ETAG)
+        assert response.status_code == 200
+        assert response.body == PAYLOAD
+        assert response.headers["Accept-Ranges"] == "bytes"
+        assert response.headers["Content-Length"] == "100"
+
+    def test_range(self):
+        response = _payload_response(make_request(range="bytes=-10"), PAYLOAD, {}, ETAG)
+        assert response.status_code == 206
+        assert response.body == PAYLOAD[90:]
+        assert response.headers["Content-Range"] == "bytes 90-99/100"
+
+    @pytest.mark.parametrize("if_range", [ETAG, ETAG.removeprefix("W/"), '"stale"'])
+    def test_range_with_if_range_gets_the_full_body(self, if_range):
+        # The validator is weak, and If-Range only accepts strong ones.
+        request = make_request(range="bytes=0-9", if_range=if_range)
+        response = _payload_response(request, PAYLOAD, {}, ETAG)
+        assert response.status_code == 200
+        assert response.body == PAYLOAD
+
+    def test_head_ignores_ranges(self):
+        response = _payload_response(make_request("HEAD", range="bytes=0-9"), PAYLOAD, {}, ETAG)
+        assert response.status_code == 200
+        assert "Accept-Ranges" not in response.headers
+
+
+class TestConversionEtag:
+    def test_weak_and_stable(self):
+        etag = _conversion_etag(EMOTE_URL, 1024)
+        assert etag.startswith('W/"')
+        assert etag == _conversion_etag(EMOTE_URL, 1024)
+
+    def test_follows_the_conversion(self, monkeypatch):
+        etag = _conversion_etag(EMOTE_URL, 1024)
+        assert etag != _conversion_etag(EMOTE_URL, 2048)
+        assert etag != _conversion_etag("https://cdn.7tv.app/emote/2/4x.gif", 1024)
+        monkeypatch.setattr(settings, "encoder_profile", "fast")
+        assert etag != _conversion_etag(EMOTE_URL, 1024)
+
+
+class TestStreamResponse:
+    @pytest.fixture
+    def conversions(self, monkeypatch):
+        conversions: list[str] = []
+
+        class Jobs:
+            def submit(self, emote_url, track):
+                conversions.append(emote_url)
+                return emote_url
+
+            async def wait(self, job):
+                return PAYLOAD
+
+        class Streams:
+            async def subscribe(self, key, factory) -> AsyncIterator[bytes]:
+                conversions.append(key)
+                yield PAYLOAD[:50]
+                yield PAYLOAD[50:]
+
+        monkeypatch.setattr(emotes, "job_store", Jobs())
+        monkeypatch.setattr(emotes, "conversion_streams", Streams())
+        monkeypatch.setattr(emotes, "cached_payload", lambda emote_url, max_output_bytes: None)
+        return conversions
+
+    async def respond(self, request: Request):
+        return await _stream_response(request, EMOTE_URL, "attachment")
+
+    async def test_if_none_match_is_answered_before_converting(self, conversions):
+        etag = _conversion_etag(EMOTE_URL, settings.max_webm_size_bytes)
+        response = await self.respond(make_request(if_none_match=etag))
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert conversions == []
+
+    async def test_capped_response_carries_the_etag(self, conversions):
+        response = await self.respond(make_request())
+        assert response.body == PAYLOAD
+        assert response.headers["ETag"] == _conversion_etag(EMOTE_URL, settings.max_webm_size_bytes)
+        assert conversions == [EMOTE_URL]
+
+    async def test_streamed_response_carries_the_etag(self, conversions, monkeypatch):
+        monkeypatch.setattr(settings, "max_webm_size_bytes", None)
+        etag = _conversion_etag(EMOTE_URL, None)
+        response = await self.respond(make_request())
+        assert response.headers["ETag"] == etag
+        assert b"".join([chunk async for chunk in response.body_iterator]) == PAYLOAD
+
+        response = await self.respond(make_request(if_none_match=etag))
+        assert response.status_code == 304
+        assert len(conversions) == 1
+
+    async def test_post_has_no_validator(self, conversions):
+        response = await self.respond(make_request("POST"))
+        assert response.body == PAYLOAD
+        assert "ETag" not in response.headers
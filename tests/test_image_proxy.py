@@ -0,0 +1,128 @@
+import hashlib
+
+import pytest
+import requests
+
+from o7tv.config.config import settings
+from o7tv.services import image_proxy
+from o7tv.services.cache import DiskCache
+from o7tv.services.image_proxy import ProxiedImage, StreamedImage, fetch_image
+
+URL = "https://cdn.7tv.app/emote/1/4x.webp"
+BODY = [b"RIFF", b"....", b"WEBP"]
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, chunks=(), headers=None, error=None):
+        self.status_code = status_code
+        self.headers = {"Content-Type": "image/webp", "ETag": '"up"'} | (headers or {})
+        self.chunks = list(chunks)
+        self.error = error
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        yield from self.chunks
+        if self.error is not None:
+            raise self.error
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}")
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = DiskCache(tmp_path / "images", max_bytes=1024, suffix=".img")
+    monkeypatch.setattr(image_proxy, "image_cache", cache)
+    monkeypatch.setattr(settings, "image_cache_enabled", True)
+    return cache
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    responses = []
+    requests_seen = []
+
+    def request(method, url, **kwargs):
+        requests_seen.append(kwargs)
+        return responses.pop(0)
+
+    monkeypatch.setattr(image_proxy.http_client, "request", request)
+    return responses, requests_seen
+
+
+async def drain(image: StreamedImage) -> bytes:
+    return b"".join([chunk async for chunk in image.chunks])
+
+
+def test_entry_round_trip():
+    image = ProxiedImage(b"a\nb\n", "image/gif", '"e"', None, 1.0)
+    assert ProxiedImage.from_bytes(image.to_bytes()) == image
+    assert ProxiedImage.from_bytes(b"no trailer") is None
+    assert ProxiedImage.from_bytes(b"content\nnot json") is None
+
+
+async def test_miss_is_streamed_and_cached(cache, upstream):
+    responses, requests_seen = upstream
+    response = FakeResponse(chunks=BODY, headers={"Cache-Control": "max-age=60"})
+    responses.append(response)
+
+    image = await fetch_image(URL)
+    assert isinstance(image, StreamedImage)
+    assert requests_seen[0]["stream"] is True
+    assert image.max_age == 60
+    assert await drain(image) == b"".join(BODY)
+    assert response.closed
+
+    cached = await fetch_image(URL)
+    assert isinstance(cached, ProxiedImage)
+    assert cached.content == b"".join(BODY)
+    assert cached.etag == f'"{hashlib.sha256(b"".join(BODY)).hexdigest()[:32]}"'
+    assert cached.upstream_etag == '"up"'
+    assert len(requests_seen) == 1
+
+
+async def test_interrupted_download_is_not_cached(cache, upstream):
+    responses, _ = upstream
+    error = requests.ConnectionError("reset")
+    responses.append(FakeResponse(chunks=BODY[:1], error=error))
+
+    image = await fetch_image(URL)
+    with pytest.raises(requests.ConnectionError):
+        await drain(image)
+    assert not list(cache.directory.rglob("*.img"))
+
+
+async def test_no_store_is_not_cached(cache, upstream):
+    responses, _ = upstream
+    responses.append(FakeResponse(chunks=BODY, headers={"Cache-Control": "no-store"}))
+
+    assert await drain(await fetch_image(URL)) == b"".join(BODY)
+    assert not list(cache.directory.rglob("*.img"))
+
+
+async def test_expired_entry_is_revalidated(cache, upstream):
+    responses, requests_seen = upstream
+    key = DiskCache.make_key(url=URL, version=image_proxy.CACHE_FORMAT_VERSION)
+    cache.put(key, ProxiedImage(b"old", "image/webp", '"e"', '"up"', 0.0).to_bytes())
+    responses.append(FakeResponse(status_code=304, headers={"Cache-Control": "max-age=60"}))
+
+    image = await fetch_image(URL)
+    assert isinstance(image, ProxiedImage)
+    assert image.content == b"old"
+    assert image.max_age > 0
+    assert requests_seen[0]["headers"] == {"If-None-Match": '"up"'}
+    assert responses == []
+
+
+async def test_upstream_error_is_raised(cache, upstream):
+    responses, _ = upstream
+    response = FakeResponse(status_code=404)
+    responses.append(response)
+
+    with pytest.raises(requests.HTTPError):
+        await fetch_image(URL)
+    assert response.closed
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+
+import pytest
+
+from o7tv.config.config import settings
+from o7tv.exceptions.conversion_exceptions import ConversionQueueFullError
+from o7tv.exceptions.ffmpeg_exceptions import FfmpegConversionError
+from o7tv.services import jobs
+from o7tv.services.jobs import ConversionJob, JobStatus, JobStore
+from o7tv.services.pool import ConversionPool, Priority
+from o7tv.services.singleflight import SingleFlight
+
+
+@pytest.fixture
+def release():
+    release = threading.Event()
+    yield release
+    release.set()
+
+
+@pytest.fixture
+def started():
+    return []
+
+
+@pytest.fixture
+def pool(monkeypatch, release, started):
+    pool = ConversionPool(max_workers=1, max_queue=2)
+
+    def convert_and_cache(emote_url, max_output_bytes, options):
+        started.append(emote_url)
+        release.wait(5)
+        if emote_url == "broken":
+            raise FfmpegConversionError("Corrupted input.")
+        return emote_url.encode()
+
+    monkeypatch.setattr(settings, "conversion_cache_enabled", False)
+    monkeypatch.setattr(jobs, "conversion_pool", pool)
+    monkeypatch.setattr(jobs, "conversion_flights", SingleFlight())
+    monkeypatch.setattr(jobs, "convert_and_cache", convert_and_cache)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def store():
+    return JobStore(retention_seconds=60, max_jobs=10)
+
+
+async def wait_started(started: list[str], count: int) -> None:
+    while len(started) < count:
+        await asyncio.sleep(0.01)
+
+
+async def test_job_lifecycle(pool, store, release, started):
+    job = store.submit("a")
+    await asyncio.wait_for(wait_started(started, 1), 5)
+    await asyncio.sleep(0)
+    assert (await store.get(job.job_id)).status is JobStatus.RUNNING
+
+    release.set()
+    assert await store.wait(job) == b"a"
+    assert job.status is JobStatus.DONE
+    assert job.size_bytes == 1
+    assert store.payload(job) == b"a"
+    assert await store.get("unknown") is None
+
+
+async def test_failed_job_reports_the_error(pool, store, release):
+    release.set()
+    job = store.submit("broken")
+    with pytest.raises(FfmpegConversionError):
+        await store.wait(job)
+    assert job.status is JobStatus.FAILED
+    assert job.error == "Corrupted input."
+    assert store.payload(job) is None
+
+
+async def test_watch_follows_status_changes(pool, store, release, started):
+    job = store.submit("a")
+    statuses = []
+
+    async def watch() -> None:
+        async for update in store.watch(job.job_id, keepalive=5):
+            statuses.append(update.status)
+
+    watcher = asyncio.create_task(watch())
+    await asyncio.wait_for(wait_started(started, 1), 5)
+    release.set()
+    await asyncio.wait_for(watcher, 5)
+    assert statuses[-1] is JobStatus.DONE
+    assert statuses == sorted(set(statuses), key=list(JobStatus).index)
+
+
+async def test_identical_jobs_share_one_conversion(pool, store, release, started):
+    first = store.submit("a")
+    second = store.submit("a", priority=Priority.BULK)
+    release.set()
+    assert await store.wait(first) == await store.wait(second) == b"a"
+    assert started == ["a"]
+
+
+async def test_urgent_job_promotes_a_queued_conversion(pool, store, release, started):
+    running = store.submit("running")
+    await asyncio.wait_for(wait_started(started, 1), 5)
+    bulk = store.submit("bulk", priority=Priority.BULK)
+    background = store.submit("background", priority=Priority.BACKGROUND)
+    urgent = store.submit("background", priority=Priority.INTERACTIVE)
+
+    release.set()
+    await asyncio.gather(*(store.wait(job) for job in (running, bulk, background, urgent)))
+    assert started == ["running", "background", "bulk"]
+    assert (background.priority, urgent.priority) == (Priority.BACKGROUND, Priority.INTERACTIVE)
+
+
+async def test_submit_when_ready_waits_for_capacity(pool, store, release):
+    submitted = [store.submit(url) for url in ("a", "b", "c")]
+    with pytest.raises(ConversionQueueFullError):
+        store.submit("d")
+
+    waiting = asyncio.create_task(store.submit_when_ready("d"))
+    await asyncio.sleep(0.05)
+    assert not waiting.done()
+
+    release.set()
+    submitted.append(await asyncio.wait_for(waiting, 5))
+    assert len(store) == 3
+    assert [await store.wait(job) for job in submitted] == [b"a", b"b", b"c", b"d"]
+
+
+def test_record_round_trip():
+    job = ConversionJob("id", "https://cdn.7tv.app/emote/1/4x.gif", "pog", Priority.BULK, "key")
+    job.status, job.size_bytes = JobStatus.DONE, 1234
+    assert ConversionJob.from_bytes(job.to_bytes()) == job
+    with pytest.raises(ValueError):
+        ConversionJob.from_bytes(b"{}")
@@ -0,0 +1,69 @@
+from o7tv.services.metrics import (
+    MetricsRegistry,
+    collect_request_timings,
+    record_timing,
+    server_timing_header,
+    timed,
+)
+
+
+def test_counter_renders_per_label_values():
+    registry = MetricsRegistry()
+    errors = registry.counter("errors", "Failures.", ("error",))
+    errors.inc(error="Timeout")
+    errors.inc(2, error='Bad "input"')
+    errors.inc(error="Timeout")
+
+    assert registry.render().splitlines() == [
+        "# HELP errors Failures.",
+        "# TYPE errors counter",
+        'errors_total{error="Bad \\"input\\""} 2.0',
+        'errors_total{error="Timeout"} 2.0',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    sizes = registry.histogram("sizes", "Sizes.", buckets=(10, 1))
+    for value in (0.5, 5, 50):
+        sizes.observe(value)
+
+    assert sizes.snapshot() == (3, 55.5)
+    assert registry.render().splitlines()[2:] == [
+        'sizes_bucket{le="1.0"} 1',
+        'sizes_bucket{le="10.0"} 2',
+        'sizes_bucket{le="+Inf"} 3',
+        "sizes_sum 55.5",
+        "sizes_count 3",
+    ]
+
+
+def test_histogram_snapshot_without_observations():
+    histogram = MetricsRegistry().histogram("empty", "Empty.", ("stage",))
+    assert histogram.snapshot(stage="encode") == (0, 0.0)
+
+
+def test_gauge_reads_its_callback_at_render_time():
+    registry = MetricsRegistry()
+    depth = [3]
+    registry.gauge("depth", "Depth.", lambda: depth[0])
+    depth[0] = 7
+    assert registry.render().splitlines()[-1] == "depth 7.0"
+
+
+def test_timings_are_collected_only_inside_a_request():
+    histogram = MetricsRegistry().histogram("stage", "Stage.")
+    record_timing("ignored", 1.0)
+    with collect_request_timings() as timings:
+        with timed("encode", histogram):
+            pass
+        record_timing("fetch", 0.25)
+    record_timing("ignored", 1.0)
+
+    assert [stage for stage, _ in timings] == ["encode", "fetch"]
+    assert histogram.snapshot()[0] == 1
+
+
+def test_server_timing_header_sums_repeated_stages():
+    timings = [("fetch", 0.01), ("encode", 0.2), ("encode", 0.1)]
+    assert server_timing_header(timings) == "fetch;dur=10.0, encode;dur=300.0"
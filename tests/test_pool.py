@@ -0,0 +1,156 @@
+import asyncio
+import threading
+
+import pytest
+
+from o7tv.exceptions.conversion_exceptions import ConversionQueueFullError
+from o7tv.services.pool import ConversionPool, Priority
+
+
+@pytest.fixture
+def pool():
+    pool = ConversionPool(max_workers=1, max_queue=4)
+    yield pool
+    pool.shutdown()
+
+
+def occupy(pool: ConversionPool) -> tuple[threading.Event, asyncio.Future]:
+    """Block the pool's only worker until the returned event is set."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def block() -> None:
+        started.set()
+        release.wait(5)
+
+    future = pool.submit(block)
+    assert started.wait(5)
+    return release, future
+
+
+async def test_rejects_work_beyond_workers_and_queue(pool):
+    release, blocker = occupy(pool)
+    queued = [pool.submit(lambda: None) for _ in range(4)]
+    assert pool.pending == 5
+    assert pool.queue_depth == 4
+
+    with pytest.raises(ConversionQueueFullError):
+        pool.submit(lambda: None)
+
+    release.set()
+    await asyncio.gather(blocker, *queued)
+    assert pool.pending == 0
+    assert await pool.run(lambda: "ok") == "ok"
+
+
+async def test_runs_waiting_work_in_priority_order(pool):
+    order: list[str] = []
+    release, blocker = occupy(pool)
+    futures = [
+        pool.submit(order.append, "background", priority=Priority.BACKGROUND),
+        pool.submit(order.append, "bulk 1", priority=Priority.BULK),
+        pool.submit(order.append, "interactive", priority=Priority.INTERACTIVE),
+        pool.submit(order.append, "bulk 2", priority=Priority.BULK),
+    ]
+    release.set()
+    await asyncio.gather(blocker, *futures)
+    assert order == ["interactive", "bulk 1", "bulk 2", "background"]
+
+
+async def test_promote_moves_waiting_work_up(pool):
+    order: list[str] = []
+    release, blocker = occupy(pool)
+    first = pool.submit(order.append, "bulk 1", priority=Priority.BULK)
+    promoted = pool.submit(order.append, "promoted", priority=Priority.BACKGROUND)
+    last = pool.submit(order.append, "bulk 2", priority=Priority.BULK)
+
+    assert not pool.promote(promoted, Priority.BACKGROUND)
+    assert pool.promote(promoted, Priority.BULK)
+    assert not pool.promote(blocker, Priority.INTERACTIVE)
+
+    release.set()
+    await asyncio.gather(blocker, first, promoted, last)
+    # Promoted work keeps its submission order within the new priority.
+    assert order == ["bulk 1", "promoted", "bulk 2"]
+    assert not pool.promote(promoted, Priority.INTERACTIVE)
+
+
+async def test_wait_for_capacity(pool):
+    release, blocker = occupy(pool)
+    queued = [pool.submit(lambda: None) for _ in range(4)]
+    waiter = asyncio.create_task(pool.wait_for_capacity())
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+
+    release.set()
+    await asyncio.wait_for(waiter, 5)
+    await asyncio.gather(blocker, *queued)
+
+
+async def test_wait_for_capacity_returns_with_room(pool):
+    await asyncio.wait_for(pool.wait_for_capacity(), 1)
+
+
+async def test_rejects_work_after_shutdown(pool):
+    pool.shutdown()
+    with pytest.raises(RuntimeError):
+        pool.submit(lambda: None)
+
+
+async def test_stream_yields_every_item(pool):
+    def numbers():
+        yield from range(20)
+
+    assert [item async for item in pool.stream(numbers, max_buffered=2)] == list(range(20))
+    assert pool.pending == 0
+
+
+async def test_stream_error_reaches_the_consumer(pool):
+    def failing():
+        yield 1
+        raise ValueError("encoder crashed")
+
+    stream = pool.stream(failing)
+    assert await anext(stream) == 1
+    with pytest.raises(ValueError):
+        await anext(stream)
+
+
+async def test_stream_closes_the_iterator_when_the_consumer_stops(pool):
+    closed = threading.Event()
+
+    def endless():
+        try:
+            while True:
+                yield b"chunk"
+        finally:
+            closed.set()
+
+    stream = pool.stream(endless, max_buffered=1)
+    assert await anext(stream) == b"chunk"
+    await stream.aclose()
+    assert await asyncio.to_thread(closed.wait, 5)
+
+
+async def test_stream_withdraws_queued_work_when_the_consumer_leaves(pool):
+    started = threading.Event()
+
+    def source():
+        started.set()
+        yield b"chunk"
+
+    release, blocker = occupy(pool)
+    consumer = asyncio.create_task(anext(pool.stream(source)))
+    await asyncio.sleep(0.05)
+    assert pool.pending == 2
+
+    consumer.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await consumer
+    assert pool.pending == 1
+    assert pool._queue.qsize() == 0
+
+    release.set()
+    await blocker
+    await pool.run(lambda: None)
+    assert not started.is_set()
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+import requests
+
+from o7tv.config.config import settings
+from o7tv.services import prefetch
+from o7tv.services.prefetch import Prefetcher, prefetch_search_page
+from o7tv.services.seventv import (
+    DEFAULT_PER_PAGE,
+    DEFAULT_SORT_BY,
+    DEFAULT_SORT_ORDER,
+    search_cache_key,
+)
+from o7tv.services.ttl_cache import TtlCache
+
+
+def key(query: str, page: int) -> str:
+    return search_cache_key(query, page, DEFAULT_PER_PAGE, DEFAULT_SORT_BY, DEFAULT_SORT_ORDER)
+
+
+async def test_duplicate_and_excess_loads_are_skipped():
+    prefetcher = Prefetcher(max_concurrent=2, timeout=5)
+    release = asyncio.Event()
+
+    async def load() -> None:
+        await release.wait()
+
+    assert prefetcher.schedule("a", load)
+    assert not prefetcher.schedule("a", load)
+    assert prefetcher.schedule("b", load)
+    assert not prefetcher.schedule("c", load)
+    assert "a" in prefetcher
+
+    release.set()
+    await asyncio.sleep(0.01)
+    assert "a" not in prefetcher
+    assert prefetcher.schedule("c", load)
+    await prefetcher.cancel_all()
+
+
+async def test_slow_and_failing_loads_are_dropped():
+    prefetcher = Prefetcher(max_concurrent=4, timeout=0.05)
+
+    async def failing() -> None:
+        raise requests.ConnectionError("upstream down")
+
+    prefetcher.schedule("slow", lambda: asyncio.sleep(60))
+    prefetcher.schedule("failing", failing)
+    await asyncio.sleep(0.1)
+    assert "slow" not in prefetcher
+    assert "failing" not in prefetcher
+
+
+async def test_cancel_all():
+    prefetcher = Prefetcher(max_concurrent=4, timeout=60)
+    prefetcher.schedule("a", lambda: asyncio.sleep(60))
+    await prefetcher.cancel_all()
+    assert "a" not in prefetcher
+
+
+class TestPrefetchSearchPage:
+    @pytest.fixture
+    def cache(self, monkeypatch):
+        cache: TtlCache[object] = TtlCache(ttl=60, stale_ttl=60, max_entries=8)
+        monkeypatch.setattr(prefetch, "search_cache", cache)
+        monkeypatch.setattr(prefetch, "search_prefetcher", Prefetcher(4, timeout=5))
+        monkeypatch.setattr(settings, "search_prefetch_enabled", True)
+        monkeypatch.setattr(settings, "search_cache_enabled", True)
+        return cache
+
+    @pytest.fixture
+    def searches(self, monkeypatch, cache):
+        searches: list[tuple[str, int]] = []
+
+        async def search_emotes(query, page):
+            searches.append((query, page))
+            return await cache.get_or_load(key(query, page), lambda: asyncio.sleep(0, "results"))
+
+        monkeypatch.setattr(prefetch, "search_emotes", search_emotes)
+        return searches
+
+    async def test_loads_the_page_into_the_cache(self, cache, searches):
+        assert prefetch_search_page("pog", 2)
+        await asyncio.sleep(0.01)
+        assert searches == [("pog", 2)]
+        assert cache.peek(key("pog", 2)) == "results"
+
+        assert not prefetch_search_page("pog", 2)
+        assert searches == [("pog", 2)]
+
+    async def test_disabled(self, cache, searches, monkeypatch):
+        monkeypatch.setattr(settings, "search_prefetch_enabled", False)
+        assert not prefetch_search_page("pog", 2)
+        await asyncio.sleep(0.01)
+        assert searches == []
@@ -0,0 +1,108 @@
+import json
+import subprocess
+from pathlib import Path
+
+import pytest
+from helpers import CORPUS_DIR, decoded_frames, played_seconds, requires_ffmpeg
+
+from o7tv.config.config import Settings, settings
+from o7tv.services import conversion
+from o7tv.services.conversion import (
+    EncoderOptions,
+    _final_frames_start,
+    encoder_fingerprint,
+    preprocessing_enabled,
+    render_webm_bytes,
+)
+from o7tv.services.probe import SourceProbe
+
+FAST = EncoderOptions(profile="fast")
+
+
+def make_probe(duration: float = 3.0, frame_rate: float = 10.0) -> SourceProbe:
+    return SourceProbe("gif", "gif", 64, 64, duration, frame_rate, 30, True, 4096)
+
+
+@pytest.fixture
+def preprocessing(monkeypatch):
+    monkeypatch.setattr(settings, "max_frame_rate", 30.0)
+    monkeypatch.setattr(settings, "drop_duplicate_frames", True)
+
+
+@pytest.fixture
+def hold_gif(tmp_path) -> Path:
+    """A 3 s, 10 fps GIF: one second of motion, then the last frame held for two."""
+    path = tmp_path / "hold.gif"
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-v",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            "testsrc=size=64x64:rate=10:duration=1,tpad=stop_mode=clone:stop_duration=2",
+            str(path),
+        ],
+        check=True,
+    )
+    return path
+
+
+def test_preprocessing_is_off_by_default():
+    assert Settings.model_fields["max_frame_rate"].default is None
+    assert Settings.model_fields["drop_duplicate_frames"].default is False
+
+
+def test_fingerprint_only_includes_enabled_preprocessing(monkeypatch):
+    monkeypatch.setattr(settings, "max_frame_rate", None)
+    monkeypatch.setattr(settings, "drop_duplicate_frames", False)
+    assert not preprocessing_enabled()
+    plain = json.loads(encoder_fingerprint("fast"))
+    assert "max_frame_rate" not in plain
+    assert "duplicate_frames" not in plain
+
+    monkeypatch.setattr(settings, "drop_duplicate_frames", True)
+    assert json.loads(encoder_fingerprint("fast"))["duplicate_frames"][:3] == [768, 320, 0.33]
+
+
+def test_final_frames_start():
+    assert _final_frames_start(make_probe()) == pytest.approx(2.85)
+    # Longer sources are cut at the output duration.
+    assert _final_frames_start(make_probe(duration=10.0)) == pytest.approx(2.85)
+    assert _final_frames_start(make_probe(duration=1.0, frame_rate=20.0)) == pytest.approx(0.925)
+    assert _final_frames_start(make_probe(duration=0.0)) is None
+    assert _final_frames_start(make_probe(frame_rate=0.0)) is None
+    assert _final_frames_start(make_probe(duration=0.1)) is None
+    assert _final_frames_start(None) is None
+
+
+@requires_ffmpeg
+def test_trailing_hold_keeps_the_source_duration(preprocessing, hold_gif, tmp_path, monkeypatch):
+    monkeypatch.setattr(conversion, "probe_source", lambda path: make_probe())
+    frames = decoded_frames(render_webm_bytes(str(hold_gif), None, FAST), tmp_path)
+
+    # The held frames are dropped, except the last one, which carries the hold to the end.
+    assert len(frames) == 11
+    assert played_seconds(frames) == pytest.approx(3.0, abs=0.05)
+
+
+@requires_ffmpeg
+def test_duplicates_are_kept_without_a_probe(preprocessing, hold_gif, tmp_path, monkeypatch):
+    monkeypatch.setattr(conversion, "probe_source", lambda path: None)
+    frames = decoded_frames(render_webm_bytes(str(hold_gif), None, FAST), tmp_path)
+
+    assert len(frames) == 30
+    assert played_seconds(frames) == pytest.approx(3.0, abs=0.05)
+
+
+@requires_ffmpeg
+def test_frame_rate_cap_keeps_the_playback_speed(preprocessing, tmp_path, monkeypatch):
+    monkeypatch.setattr(conversion, "probe_source", lambda path: None)
+    frames = decoded_frames(
+        render_webm_bytes(str(CORPUS_DIR / "many_frames.gif"), None, FAST), tmp_path
+    )
+
+    # The 50 fps source is cut to 3 s and loses every other frame.
+    assert len(frames) == 75
+    assert played_seconds(frames) == pytest.approx(3.0, abs=0.05)
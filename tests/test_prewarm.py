@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+import requests
+
+from o7tv.config.config import settings
+from o7tv.exceptions.ffmpeg_exceptions import FfmpegConversionError
+from o7tv.models.emotes import EmoteImage, EmoteResult, EmoteSearchResponse
+from o7tv.services import prewarm
+from o7tv.services.pool import ConversionPool
+from o7tv.services.prewarm import prewarm_once
+from o7tv.services.singleflight import SingleFlight
+
+
+def emote(emote_id: str, animated: bool = True) -> EmoteResult:
+    image = EmoteImage(f"https://cdn.7tv.app/emote/{emote_id}/4x.gif", "image/gif", 128, 128, 1, 4)
+    return EmoteResult(emote_id, emote_id, image, None, animated)
+
+
+@pytest.fixture
+def listings(monkeypatch):
+    listings: dict[str, list[EmoteResult] | Exception] = {
+        "TRENDING_DAILY": [emote("a"), emote("static", animated=False), emote("b")],
+        "TOP_ALL_TIME": [emote("b"), emote("c")],
+    }
+
+    async def search_emotes(query, per_page, sort_by, with_counts):
+        listing = listings[sort_by]
+        if isinstance(listing, Exception):
+            raise listing
+        return EmoteSearchResponse(listing, 1, len(listing))
+
+    monkeypatch.setattr(prewarm, "search_emotes", search_emotes)
+    return listings
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = ConversionPool(max_workers=1, max_queue=4)
+    monkeypatch.setattr(prewarm, "conversion_pool", pool)
+    monkeypatch.setattr(prewarm, "conversion_flights", SingleFlight())
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def failing():
+    return set()
+
+
+@pytest.fixture
+def converted(monkeypatch, failing):
+    converted: list[str] = []
+
+    def convert_and_cache(emote_url, max_output_bytes, options):
+        assert options.nice == settings.prewarm_nice
+        if emote_url in failing:
+            raise FfmpegConversionError("Corrupted input.")
+        converted.append(emote_url.split("/")[-2])
+        return b"webm"
+
+    monkeypatch.setattr(prewarm, "convert_and_cache", convert_and_cache)
+    monkeypatch.setattr(prewarm, "cached_profile", lambda emote_url, max_output_bytes: None)
+    monkeypatch.setattr(settings, "prewarm_max_per_cycle", 10)
+    return converted
+
+
+async def test_converts_each_uncached_animated_emote_once(listings, pool, converted):
+    assert await prewarm_once() == 3
+    assert converted == ["a", "b", "c"]
+
+
+async def test_skips_cached_emotes(listings, pool, converted, monkeypatch):
+    monkeypatch.setattr(
+        prewarm, "cached_profile", lambda url, max_output_bytes: "fast" if "/b/" in url else None
+    )
+    assert await prewarm_once() == 2
+    assert converted == ["a", "c"]
+
+
+async def test_stops_at_the_cycle_limit(listings, pool, converted, monkeypatch):
+    monkeypatch.setattr(settings, "prewarm_max_per_cycle", 2)
+    assert await prewarm_once() == 2
+    assert converted == ["a", "b"]
+
+
+async def test_yields_to_pending_user_conversions(listings, pool, converted):
+    release = threading.Event()
+    blocker = pool.submit(release.wait, 5)
+    try:
+        assert await prewarm_once() == 0
+    finally:
+        release.set()
+        await blocker
+    assert converted == []
+
+
+async def test_continues_past_failures(listings, pool, converted, failing):
+    listings["TRENDING_DAILY"] = requests.ConnectionError("upstream down")
+    failing.add(emote("b").image.url)
+    assert await prewarm_once() == 1
+    assert converted == ["c"]
@@ -0,0 +1,120 @@
+import ffmpeg
+import pytest
+
+from o7tv.services import probe
+from o7tv.services.conversion import MAX_SIDE, is_compliant
+from o7tv.services.probe import SourceProbe, probe_source
+
+
+def fake_probe(monkeypatch, info: dict | Exception) -> None:
+    def run_probe(path, **kwargs):
+        assert kwargs == {"select_streams": "v:0"}
+        if isinstance(info, Exception):
+            raise info
+        return info
+
+    monkeypatch.setattr(probe.ffmpeg, "probe", run_probe)
+
+
+def webm(**overrides: object) -> SourceProbe:
+    fields: dict = {
+        "format_name": "matroska,webm",
+        "codec": "vp9",
+        "width": 512,
+        "height": 384,
+        "duration": 3.0,
+        "frame_rate": 30.0,
+        "frame_count": 90,
+        "has_alpha": True,
+        "size_bytes": 100_000,
+    }
+    return SourceProbe(**(fields | overrides))
+
+
+def test_reads_stream_properties(monkeypatch, tmp_path):
+    fake_probe(
+        monkeypatch,
+        {
+            "streams": [
+                {
+                    "codec_name": "vp9",
+                    "width": 512,
+                    "height": 384,
+                    "avg_frame_rate": "30000/1001",
+                    "nb_frames": "89",
+                    "pix_fmt": "yuv420p",
+                    "tags": {"alpha_mode": "1"},
+                }
+            ],
+            "format": {"format_name": "matroska,webm", "duration": "2.970", "size": "4096"},
+        },
+    )
+    assert probe_source(str(tmp_path / "source")) == SourceProbe(
+        format_name="matroska,webm",
+        codec="vp9",
+        width=512,
+        height=384,
+        duration=2.97,
+        frame_rate=pytest.approx(29.97, abs=0.001),
+        frame_count=89,
+        has_alpha=True,
+        size_bytes=4096,
+    )
+
+
+def test_estimates_missing_values(monkeypatch, tmp_path):
+    source = tmp_path / "source"
+    source.write_bytes(b"x" * 10)
+    fake_probe(
+        monkeypatch,
+        {
+            "streams": [
+                {
+                    "codec_name": "gif",
+                    "width": 64,
+                    "height": 64,
+                    "avg_frame_rate": "0/0",
+                    "r_frame_rate": "20/1",
+                    "pix_fmt": "bgra",
+                }
+            ],
+            "format": {"format_name": "gif", "duration": "1.5"},
+        },
+    )
+    result = probe_source(str(source))
+    assert result is not None
+    assert (result.duration, result.frame_rate, result.frame_count) == (1.5, 20.0, 30)
+    assert result.has_alpha
+    assert result.size_bytes == 10
+
+
+@pytest.mark.parametrize(
+    "info", [ffmpeg.Error("ffprobe", b"", b"invalid data"), OSError("missing"), {"streams": []}]
+)
+def test_unreadable_sources(monkeypatch, tmp_path, info):
+    fake_probe(monkeypatch, info)
+    assert probe_source(str(tmp_path / "source")) is None
+
+
+class TestIsCompliant:
+    def test_fitting_vp9_webm(self):
+        assert is_compliant(webm(), 256 * 1024)
+        assert is_compliant(webm(), None)
+
+    @pytest.mark.parametrize(
+        "overrides",
+        [
+            {"codec": "vp8"},
+            {"format_name": "gif"},
+            {"width": MAX_SIDE + 2},
+            {"width": 0, "height": 0},
+            {"duration": 10.0},
+            {"duration": 0.0},
+            {"size_bytes": 300 * 1024},
+        ],
+    )
+    def test_needs_encoding(self, overrides):
+        assert not is_compliant(webm(**overrides), 256 * 1024)
+
+    def test_variant_box(self):
+        assert not is_compliant(webm(), None, max_side=128)
@@ -0,0 +1,105 @@
+import pytest
+from helpers import CORPUS_DIR, decoded_frames, played_seconds, requires_ffmpeg
+
+from o7tv.config.config import settings
+from o7tv.services.conversion import (
+    CRF_HALVING_STEP,
+    INITIAL_CRF,
+    MAX_CRF,
+    EncoderOptions,
+    _predict_crf,
+    _seed_crf,
+    render_webm_bytes,
+)
+from o7tv.services.probe import SourceProbe
+
+
+def make_probe(**overrides: object) -> SourceProbe:
+    fields: dict = {
+        "format_name": "gif",
+        "codec": "gif",
+        "width": 512,
+        "height": 512,
+        "duration": 3.0,
+        "frame_rate": 30.0,
+        "frame_count": 90,
+        "has_alpha": False,
+        "size_bytes": 1_000_000,
+    }
+    return SourceProbe(**(fields | overrides))
+
+
+class TestPredictCrf:
+    def test_default_slope_halves_every_step(self):
+        # 1.9 times the target size needs just under one halving step.
+        assert _predict_crf([(32, 190_000)], 100_000) == 32 + CRF_HALVING_STEP
+
+    def test_measured_slope(self):
+        # Size halved over 4 CRF steps, so just over a quarter of it needs 8 more.
+        assert _predict_crf([(30, 400_000), (34, 200_000)], 55_000) == 42
+
+    def test_non_decreasing_measurement_falls_back_to_default(self):
+        samples = [(30, 190_000), (34, 190_000)]
+        assert _predict_crf(samples, 100_000) == 34 + CRF_HALVING_STEP
+
+    def test_always_raises_the_crf(self):
+        assert _predict_crf([(32, 100_001)], 100_000) == 33
+
+    def test_capped_at_max_crf(self):
+        assert _predict_crf([(60, 10_000_000)], 1_000) == MAX_CRF
+
+
+class TestSeedCrf:
+    @pytest.fixture(autouse=True)
+    def frame_rate_cap(self, monkeypatch):
+        monkeypatch.setattr(settings, "max_frame_rate", 30.0)
+
+    def test_without_probe(self):
+        assert _seed_crf(None, 100_000) == INITIAL_CRF
+
+    def test_without_size_limit(self):
+        assert _seed_crf(make_probe(), None) == INITIAL_CRF
+
+    def test_unknown_dimensions(self):
+        assert _seed_crf(make_probe(width=0), 100_000) == INITIAL_CRF
+
+    def test_unknown_frame_count(self, monkeypatch):
+        monkeypatch.setattr(settings, "max_frame_rate", None)
+        assert _seed_crf(make_probe(frame_rate=0.0, frame_count=0), 100_000) == INITIAL_CRF
+
+    def test_still_image_starts_at_initial_crf(self):
+        assert _seed_crf(make_probe(frame_rate=0.0, frame_count=1), 256_000) == INITIAL_CRF
+
+    def test_large_source_skips_ahead(self):
+        assert _seed_crf(make_probe(), 64 * 1024) > INITIAL_CRF
+
+    def test_tighter_limit_raises_the_seed(self):
+        probe = make_probe()
+        assert _seed_crf(probe, 32 * 1024) > _seed_crf(probe, 128 * 1024)
+
+    def test_smaller_variant_lowers_the_seed(self):
+        probe = make_probe()
+        assert _seed_crf(probe, 64 * 1024, max_side=128) < _seed_crf(probe, 64 * 1024)
+
+    def test_frames_past_the_output_duration_are_ignored(self):
+        short = make_probe()
+        long = make_probe(duration=30.0, frame_count=900)
+        assert _seed_crf(long, 64 * 1024) == _seed_crf(short, 64 * 1024)
+
+    def test_capped_at_max_crf(self):
+        assert _seed_crf(make_probe(), 1) == MAX_CRF
+
+
+@requires_ffmpeg
+@pytest.mark.parametrize("profile", ["fast", "balanced"])
+def test_size_capped_output_keeps_every_frame(profile, tmp_path):
+    # 10 s at 15 fps; the output keeps the first 3 s, which no longer fit at INITIAL_CRF.
+    max_output_bytes = 32 * 1024
+    payload = render_webm_bytes(
+        str(CORPUS_DIR / "long.gif"), max_output_bytes, EncoderOptions(profile=profile)
+    )
+    assert len(payload) <= max_output_bytes
+
+    frames = decoded_frames(payload, tmp_path)
+    assert len(frames) == 45
+    assert played_seconds(frames) == pytest.approx(3.0, abs=0.05)
@@ -0,0 +1,66 @@
+from o7tv.models.emotes import EmoteSearchResponse
+from o7tv.services.conversion import MAX_SIDE
+from o7tv.services.seventv import _parse_emote
+
+
+def image(mime: str, scale: int, side: int, frames: int = 1) -> dict:
+    return {
+        "url": f"https://cdn.7tv.app/emote/1/{scale}x.{mime.split('/')[1]}",
+        "mime": mime,
+        "width": side,
+        "height": side,
+        "frameCount": frames,
+        "scale": scale,
+    }
+
+
+def emote(*images: dict) -> dict:
+    return {"id": "1", "defaultName": "pog", "images": list(images)}
+
+
+def test_animated_gif_filling_the_box_is_the_preview():
+    result = _parse_emote(
+        emote(
+            image("image/webp", 4, 2 * MAX_SIDE, frames=30),
+            image("image/gif", 1, MAX_SIDE // 4, frames=30),
+            image("image/gif", 2, MAX_SIDE, frames=30),
+            image("image/gif", 4, 2 * MAX_SIDE, frames=30),
+            image("image/png", 4, 2 * MAX_SIDE),
+        )
+    )
+    assert result.is_animated
+    assert (result.image.mime, result.image.scale) == ("image/gif", 2)
+    assert result.image.frame_count == 30
+
+
+def test_largest_variant_wins_below_the_box():
+    result = _parse_emote(
+        emote(image("image/gif", 1, 32, frames=5), image("image/gif", 2, 64, frames=5))
+    )
+    assert result.image.scale == 2
+
+
+def test_static_emote():
+    result = _parse_emote(
+        emote(image("image/webp", 4, 128), image("image/png", 1, 32), image("image/png", 4, 128))
+    )
+    assert not result.is_animated
+    assert result.static_image.scale == 4
+    assert result.static_image.url.endswith("4x.png")
+
+
+def test_widest_png_without_an_x4_variant():
+    result = _parse_emote(emote(image("image/png", 1, 32), image("image/png", 2, 64)))
+    assert result.static_image.scale == 2
+
+
+def test_missing_images():
+    result = _parse_emote(emote({"mime": "image/gif", "width": 1, "height": 1}))
+    assert (result.image, result.static_image, result.is_animated) == (None, None, False)
+    assert (result.emote_id, result.name) == ("1", "pog")
+
+
+def test_search_response_round_trip():
+    result = _parse_emote(emote(image("image/gif", 2, 64, frames=5), image("image/png", 4, 128)))
+    response = EmoteSearchResponse([result], page_count=3, total_count=61)
+    assert EmoteSearchResponse.from_bytes(response.to_bytes()) == response
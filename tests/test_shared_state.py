@@ -0,0 +1,102 @@
+import threading
+import time
+from contextlib import nullcontext
+
+import pytest
+
+from o7tv.config.config import settings
+from o7tv.services.shared_state import (
+    ProcessSlots,
+    SharedEntries,
+    SharedStore,
+    inflight_lock,
+    try_lock_file,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SharedStore(tmp_path / "state.sqlite3")
+
+
+def test_try_lock_file_is_exclusive(tmp_path):
+    path = tmp_path / "locks" / "leader.lock"
+    holder = try_lock_file(path)
+    assert holder is not None
+    assert try_lock_file(path) is None
+
+    holder.close()
+    again = try_lock_file(path)
+    assert again is not None
+    again.close()
+
+
+def test_inflight_lock_is_a_no_op_without_shared_state(monkeypatch):
+    monkeypatch.setattr(settings, "shared_state_enabled", False)
+    assert isinstance(inflight_lock("ab" * 32), nullcontext)
+
+
+def test_process_slots_limit_concurrent_holders(tmp_path):
+    slots = ProcessSlots(tmp_path / "slots", count=2)
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+
+    def hold() -> None:
+        nonlocal running, peak
+        with slots.acquire():
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+
+    threads = [threading.Thread(target=hold) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert peak == 2
+
+
+def test_process_slots_without_limit(tmp_path):
+    slots = ProcessSlots(tmp_path / "slots", count=0)
+    with slots.acquire(), slots.acquire():
+        pass
+    assert not (tmp_path / "slots").exists()
+
+
+def test_store_round_trip_and_expiry(store):
+    store.put("search", "old", b"1", max_age=60)
+    assert store.get("search", "old")[1] == b"1"
+    assert store.get("search", "missing") is None
+
+    # Writes drop entries of the same namespace that are older than max_age.
+    time.sleep(0.02)
+    store.put("search", "new", b"2", max_age=0.01)
+    store.put("jobs", "other", b"3", max_age=0.01)
+    assert store.get("search", "old") is None
+    assert store.get("search", "new")[1] == b"2"
+    assert store.get("jobs", "other")[1] == b"3"
+
+
+def test_counters(store):
+    assert store.add("size", 10) is None
+    store.reset("size", 100)
+    assert store.add("size", 10) == 110
+    assert store.add("size", -30) == 80
+
+
+async def test_entries_skip_unreadable_values(store):
+    def loads(data: bytes) -> int:
+        return int(data)
+
+    entries = SharedEntries(store, "numbers", dumps=lambda value: str(value).encode(), loads=loads)
+    await entries.aput("a", 7, max_age=60)
+    store.put("numbers", "b", b"not a number", max_age=60)
+
+    age, value = await entries.aget("a")
+    assert value == 7
+    assert age >= 0
+    assert entries.get("b") is None
@@ -0,0 +1,191 @@
+import asyncio
+
+import pytest
+
+from o7tv.services.singleflight import SingleFlight, StreamFlight
+
+
+class Boom(Exception):
+    pass
+
+
+async def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    calls = 0
+    gate = asyncio.Event()
+
+    async def work() -> int:
+        nonlocal calls
+        calls += 1
+        await gate.wait()
+        return 42
+
+    waiters = [asyncio.create_task(flights.do("key", work)) for _ in range(3)]
+    await asyncio.sleep(0)
+    gate.set()
+    assert await asyncio.gather(*waiters) == [42, 42, 42]
+    assert calls == 1
+    assert "key" not in flights
+
+
+async def test_error_reaches_every_caller():
+    flights = SingleFlight()
+    gate = asyncio.Event()
+
+    async def work() -> None:
+        await gate.wait()
+        raise Boom("upstream failed")
+
+    waiters = [asyncio.create_task(flights.do("key", work)) for _ in range(3)]
+    await asyncio.sleep(0)
+    gate.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(result, Boom) for result in results)
+    assert "key" not in flights
+
+
+async def test_error_is_not_cached():
+    flights = SingleFlight()
+    attempts = 0
+
+    async def work() -> str:
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise Boom
+        return "ok"
+
+    with pytest.raises(Boom):
+        await flights.do("key", work)
+    assert await flights.do("key", work) == "ok"
+
+
+async def test_start_error_propagates_without_registering():
+    flights = SingleFlight()
+
+    def work():
+        raise Boom
+
+    with pytest.raises(Boom):
+        flights.start("key", work)
+    assert "key" not in flights
+
+
+async def test_cancelled_caller_does_not_cancel_the_work():
+    flights = SingleFlight()
+    gate = asyncio.Event()
+
+    async def work() -> str:
+        await gate.wait()
+        return "done"
+
+    first = asyncio.create_task(flights.do("key", work))
+    second = asyncio.create_task(flights.do("key", work))
+    await asyncio.sleep(0)
+    first.cancel()
+    gate.set()
+    assert await second == "done"
+
+
+async def collect(stream) -> list:
+    return [item async for item in stream]
+
+
+async def test_stream_early_subscriber_sees_every_item():
+    streams = StreamFlight()
+    gate = asyncio.Event()
+
+    async def source():
+        yield 1
+        await gate.wait()
+        yield 2
+
+    first = streams.subscribe("key", source)
+    assert await anext(first) == 1
+    late = asyncio.create_task(collect(streams.subscribe("key", source)))
+    await asyncio.sleep(0)
+    gate.set()
+    assert [item async for item in first] == [2]
+    assert await late == [1, 2]
+    assert "key" not in streams
+
+
+async def test_stream_error_reaches_every_subscriber():
+    streams = StreamFlight()
+    gate = asyncio.Event()
+
+    async def source():
+        yield 1
+        await gate.wait()
+        raise Boom("encoder crashed")
+
+    subscribers = [asyncio.create_task(collect(streams.subscribe("key", source))) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    gate.set()
+    results = await asyncio.gather(*subscribers, return_exceptions=True)
+    assert all(isinstance(result, Boom) for result in results)
+    assert "key" not in streams
+
+
+async def test_stream_waits_for_the_slowest_subscriber():
+    streams = StreamFlight(max_buffered=3)
+    produced = 0
+
+    async def source():
+        nonlocal produced
+        for item in range(20):
+            produced += 1
+            yield item
+
+    fast = asyncio.create_task(collect(streams.subscribe("key", source)))
+    slow = streams.subscribe("key", source)
+    assert await anext(slow) == 0
+    await asyncio.sleep(0.01)
+    assert not fast.done()
+    assert produced <= 1 + 3
+
+    assert [item async for item in slow] == list(range(1, 20))
+    assert await fast == list(range(20))
+
+
+async def test_stream_cannot_be_joined_once_its_start_is_dropped():
+    streams = StreamFlight(max_buffered=2)
+    starts = 0
+    gate = asyncio.Event()
+
+    async def source():
+        nonlocal starts
+        starts += 1
+        for item in range(5):
+            yield item
+        await gate.wait()
+
+    first = streams.subscribe("key", source)
+    assert [await anext(first) for _ in range(4)] == [0, 1, 2, 3]
+    assert "key" not in streams
+
+    second = asyncio.create_task(collect(streams.subscribe("key", source)))
+    await asyncio.sleep(0.01)
+    gate.set()
+    assert await second == [0, 1, 2, 3, 4]
+    assert [item async for item in first] == [4]
+    assert starts == 2
+
+
+async def test_stream_source_is_closed_when_every_subscriber_leaves():
+    streams = StreamFlight()
+    closed = asyncio.Event()
+
+    async def source():
+        try:
+            while True:
+                yield b"chunk"
+                await asyncio.sleep(0)
+        finally:
+            closed.set()
+
+    stream = streams.subscribe("key", source)
+    assert await anext(stream) == b"chunk"
+    await stream.aclose()
+    await asyncio.wait_for(closed.wait(), 1)
+    assert "key" not in streams
@@ -0,0 +1,75 @@
+import asyncio
+
+from o7tv.services.ttl_cache import TtlCache
+
+
+class Loader:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def __call__(self) -> int:
+        self.calls += 1
+        return self.calls
+
+
+async def test_fresh_entry_is_served_without_loading():
+    cache: TtlCache[int] = TtlCache(ttl=60, stale_ttl=60, max_entries=8)
+    loader = Loader()
+    assert await cache.get_or_load("key", loader) == 1
+    assert await cache.get_or_load("key", loader) == 1
+    assert loader.calls == 1
+    assert cache.peek("key") == 1
+
+
+async def test_stale_entry_is_served_while_refreshing():
+    cache: TtlCache[int] = TtlCache(ttl=0.05, stale_ttl=60, max_entries=8)
+    loader = Loader()
+    await cache.get_or_load("key", loader)
+    await asyncio.sleep(0.06)
+    assert cache.peek("key") is None
+
+    # The stale value comes back at once; a single background task refreshes it.
+    assert await cache.get_or_load("key", loader) == 1
+    assert await cache.get_or_load("key", loader) == 1
+    await asyncio.gather(*cache._background)
+    assert loader.calls == 2
+    assert await cache.get_or_load("key", loader) == 2
+
+
+async def test_failed_refresh_keeps_the_stale_entry():
+    cache: TtlCache[int] = TtlCache(ttl=0.05, stale_ttl=60, max_entries=8)
+    await cache.get_or_load("key", Loader())
+    await asyncio.sleep(0.06)
+
+    async def failing() -> int:
+        raise RuntimeError("upstream down")
+
+    assert await cache.get_or_load("key", failing) == 1
+    await asyncio.gather(*cache._background)
+    assert await cache.get_or_load("key", failing) == 1
+
+
+async def test_expired_entry_is_reloaded_inline():
+    cache: TtlCache[int] = TtlCache(ttl=0.02, stale_ttl=0.02, max_entries=8)
+    loader = Loader()
+    await cache.get_or_load("key", loader)
+    await asyncio.sleep(0.05)
+    assert await cache.get_or_load("key", loader) == 2
+
+
+async def test_concurrent_misses_load_once():
+    cache: TtlCache[int] = TtlCache(ttl=60, stale_ttl=60, max_entries=8)
+    loader = Loader()
+    results = await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(5)))
+    assert results == [1] * 5
+    assert loader.calls == 1
+
+
+async def test_least_recently_used_entry_is_evicted():
+    cache: TtlCache[int] = TtlCache(ttl=60, stale_ttl=60, max_entries=2)
+    for key in ("a", "b"):
+        await cache.get_or_load(key, Loader())
+    await cache.get_or_load("a", Loader())
+    await cache.get_or_load("c", Loader())
+    assert cache.peek("a") is not None
+    assert cache.peek("b") is None
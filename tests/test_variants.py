@@ -0,0 +1,78 @@
+import re
+import subprocess
+from pathlib import Path
+
+import pytest
+from helpers import CORPUS_DIR, decoded_frames, played_seconds, requires_ffmpeg
+
+from o7tv.services import conversion
+from o7tv.services.cache import conversion_cache_key
+from o7tv.services.conversion import (
+    MAX_SIDE,
+    EncoderOptions,
+    OutputVariant,
+    render_webm_bytes,
+    render_webm_variants,
+)
+from o7tv.services.probe import SourceProbe
+
+FAST = EncoderOptions(profile="fast")
+
+
+def frame_size(data: bytes, tmp_path: Path) -> tuple[int, int]:
+    path = tmp_path / "variant.webm"
+    path.write_bytes(data)
+    stderr = subprocess.run(["ffmpeg", "-i", str(path)], capture_output=True, text=True).stderr
+    match = re.search(r"Video: .*?, (\d+)x(\d+)", stderr)
+    assert match is not None, stderr
+    return int(match.group(1)), int(match.group(2))
+
+
+def test_variants_have_their_own_cache_keys():
+    url = "https://cdn.7tv.app/emote/1/4x.gif"
+    keys = {
+        conversion_cache_key(url, 1024),
+        conversion_cache_key(url, 1024, max_side=MAX_SIDE),
+        conversion_cache_key(url, 1024, max_side=128),
+        conversion_cache_key(url, 2048, max_side=128),
+    }
+    assert len(keys) == 4
+
+
+@requires_ffmpeg
+def test_variants_fit_their_boxes_and_limits(tmp_path):
+    variants = [OutputVariant(MAX_SIDE), OutputVariant(128, 8192), OutputVariant(64, 4096)]
+    payloads = render_webm_variants(str(CORPUS_DIR / "wide.gif"), variants, FAST)
+
+    # wide.gif is 640x96; every box keeps its aspect ratio with even dimensions.
+    sizes = [frame_size(payload, tmp_path) for payload in payloads]
+    assert sizes == [(512, 76), (128, 18), (64, 8)]
+    assert all(len(payload) <= 8192 for payload in payloads[1:])
+    frame_counts = {len(decoded_frames(payload, tmp_path)) for payload in payloads}
+    assert len(frame_counts) == 1
+
+
+@requires_ffmpeg
+def test_oversized_variant_is_corrected_without_dropping_frames(tmp_path):
+    variants = [OutputVariant(MAX_SIDE), OutputVariant(256, 16 * 1024)]
+    full, small = render_webm_variants(str(CORPUS_DIR / "long.gif"), variants, FAST)
+
+    assert len(small) <= 16 * 1024
+    assert frame_size(small, tmp_path) == (256, 256)
+    frames = decoded_frames(small, tmp_path)
+    assert len(frames) == len(decoded_frames(full, tmp_path)) == 45
+    assert played_seconds(frames) == pytest.approx(3.0, abs=0.05)
+
+
+@requires_ffmpeg
+def test_compliant_source_is_served_as_is(tmp_path, monkeypatch):
+    source = tmp_path / "source.webm"
+    source.write_bytes(render_webm_bytes(str(CORPUS_DIR / "small.gif"), None, FAST))
+    compliant = SourceProbe("matroska,webm", "vp9", 512, 512, 3.0, 30.0, 90, False, 1024)
+    monkeypatch.setattr(conversion, "probe_source", lambda path: compliant)
+
+    same, smaller = render_webm_variants(
+        str(source), [OutputVariant(MAX_SIDE), OutputVariant(64)], FAST
+    )
+    assert same == source.read_bytes()
+    assert frame_size(smaller, tmp_path) == (64, 64)